@@ -0,0 +1,91 @@
+"""Cadence adaptative et bande morte (web.core.adaptive_sampling).
+
+Une heure simulée (cycles beat de 5 s) sur 50 nœuds au repos, dont un
+qui part en incident 5 min (CPU à ~90 % et qui bouge) et un qui exécute
+un job 5 min: scrapes et points d'historique vs cadence fixe, résolution
+pendant l'incident. Puis un cycle réel collect_metrics: les nœuds pas à
+échéance ne sont pas scrapés, un nœud avec un job l'est toujours.
+"""
+
+import random
+
+import pytest
+
+from web.config.metrics_config import ADAPTIVE_SAMPLING_CONFIG
+from web.core.adaptive_sampling import AdaptiveCadence, DeadBand
+from web.tasks import monitoring
+
+NODES = [f"bench-node{i:03d}" for i in range(50)]
+BEAT_S = 5.0
+STEPS = 720
+INCIDENT = range(300, 360)
+JOB = range(400, 460)
+
+
+def _metrics(rng, node, step):
+    cpu = 8.0 + rng.gauss(0, 0.4)
+    if node == NODES[0] and step in INCIDENT:
+        cpu = 90.0 + rng.gauss(0, 6.0)
+    return {"cpu_usage": cpu, "memory_usage": 41.0 + rng.gauss(0, 0.1), "disk_usage": 42.0,
+            "temperature": 50.0 + rng.gauss(0, 0.2), "load1": 0.3 + rng.gauss(0, 0.02)}
+
+
+def _simulate():
+    rng = random.Random(7)
+    cadence = AdaptiveCadence(**ADAPTIVE_SAMPLING_CONFIG)
+    dead_band = DeadBand(**ADAPTIVE_SAMPLING_CONFIG)
+    counts = {"scrapes": 0, "stored": 0, "incident_scrapes": 0, "incident_stored": 0, "job_scrapes": 0}
+    for step in range(STEPS):
+        now = step * BEAT_S
+        for node in NODES:
+            busy = node == NODES[1] and step in JOB
+            if not (busy or cadence.is_due(node, now, tolerance_s=BEAT_S / 2)):
+                continue
+            metrics = _metrics(rng, node, step)
+            cadence.observe(node, metrics, busy=busy, now=now)
+            stored = dead_band.should_store(node, metrics, now=now)
+            counts["scrapes"] += 1
+            counts["stored"] += stored
+            if node == NODES[0] and step in INCIDENT:
+                counts["incident_scrapes"] += 1
+                counts["incident_stored"] += stored
+            if busy:
+                counts["job_scrapes"] += 1
+    return counts
+
+
+def test_adaptive_sampling_hour(benchmark):
+    counts = benchmark.pedantic(_simulate, rounds=3, iterations=1)
+
+    fixed = len(NODES) * STEPS
+    benchmark.extra_info["scrapes_vs_fixed"] = round(counts["scrapes"] / fixed, 3)
+    benchmark.extra_info["history_points_vs_fixed"] = round(counts["stored"] / fixed, 3)
+    benchmark.extra_info["incident_scrapes"] = f"{counts['incident_scrapes']}/{len(INCIDENT)}"
+    assert counts["scrapes"] < fixed / 5
+    assert counts["stored"] < fixed / 20
+    # Incident détecté en un intervalle max au plus, puis pleine résolution
+    detection_steps = ADAPTIVE_SAMPLING_CONFIG["max_interval_s"] / BEAT_S
+    assert counts["incident_scrapes"] >= len(INCIDENT) - detection_steps
+    # Bande morte: seuls les points à moins de 2 % du précédent écrit sont sautés
+    assert counts["incident_stored"] >= 0.9 * counts["incident_scrapes"]
+    assert counts["job_scrapes"] == len(JOB)
+
+
+def test_adaptive_collect_cycle(benchmark, redis_db, node_exporter_fleet, monkeypatch):
+    """Cycles beat réels: après le premier, seuls les nœuds à échéance (ou avec un job) sont scrapés."""
+    fleet = node_exporter_fleet(50, adaptive=True)
+    busy = {fleet.nodes[0]}
+
+    async def running():
+        return busy
+
+    monkeypatch.setattr(monitoring, "busy_nodes", running)
+    first = monitoring.collect_metrics()
+
+    result = benchmark.pedantic(monitoring.collect_metrics, rounds=5, iterations=1)
+
+    assert first["nodes_processed"] == 50
+    assert result["nodes_processed"] == 1
+    assert result["nodes_skipped"] == 49
+    benchmark.extra_info["requests"] = fleet.requests
+    assert fleet.requests == 50 + 5
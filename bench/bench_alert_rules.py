@@ -0,0 +1,113 @@
+"""Moteur d'alertes déclaratif (web.core.alert_rules).
+
+Exactitude des machines à états: for_s, variation par minute, absence
+de données, règle cluster sur un percentile, reprise après redémarrage
+sans second firing. Puis coût d'évaluation d'un point avec les règles
+par défaut, et cycles collect_metrics réels: cluster:alerts n'est
+publié qu'au changement d'état (l'ancien code publiait à chaque cycle).
+"""
+
+import json
+
+import pytest
+import redis
+
+from web.config.metrics_config import MONITORING_CONFIG
+from web.core.alert_rules import AlertEngine
+from web.tasks import monitoring
+
+RULES = [
+    {"name": "hot", "metric": "temperature", "op": ">", "value": 80, "for_s": 30, "severity": "critical"},
+    {"name": "mem_climb", "type": "rate", "metric": "memory_usage", "op": ">", "value": 5, "for_s": 0},
+    {"name": "silent", "type": "absent", "for_s": 60},
+    {"name": "p90_cpu", "scope": "cluster", "metric": "distribution.cpu_usage.p90", "op": ">=", "value": 80},
+]
+
+
+def _states(transitions):
+    return [(alert["id"], alert["state"]) for alert in transitions]
+
+
+def test_alert_state_machines():
+    engine = AlertEngine(RULES)
+
+    # Seuil + for_s: pending sans publication, firing après 30 s, une seule fois
+    assert engine.observe("n1", {"temperature": 85.0, "memory_usage": 40.0}, now=0.0) == []
+    assert engine.observe("n1", {"temperature": 86.0, "memory_usage": 40.0}, now=20.0) == []
+    assert _states(engine.observe("n1", {"temperature": 87.0, "memory_usage": 40.0}, now=30.0)) == [("hot:n1", "firing")]
+    assert engine.observe("n1", {"temperature": 88.0, "memory_usage": 40.0}, now=40.0) == []
+    assert [alert["id"] for alert in engine.active()] == ["hot:n1"]
+    assert _states(engine.observe("n1", {"temperature": 70.0, "memory_usage": 40.0}, now=50.0)) == [("hot:n1", "resolved")]
+    # Retombé avant for_s: rien n'est publié
+    engine.observe("n1", {"temperature": 90.0, "memory_usage": 40.0}, now=60.0)
+    assert engine.observe("n1", {"temperature": 60.0, "memory_usage": 40.0}, now=70.0) == []
+
+    # Variation: +6 points en 30 s = 12 %/min
+    transitions = engine.observe("n1", {"temperature": 60.0, "memory_usage": 46.0}, now=100.0)
+    assert _states(transitions) == [("mem_climb:n1", "firing")]
+    assert transitions[0]["value"] == pytest.approx(12.0)
+
+    # Absence: n2 jamais vu compte à partir du premier check
+    assert engine.check_absent(["n1", "n2"], now=100.0) == []
+    assert _states(engine.check_absent(["n1", "n2"], now=161.0)) == [("silent:n1", "firing"), ("silent:n2", "firing")]
+    assert _states(engine.observe("n2", {"memory_usage": 10.0}, now=170.0)) == []
+    assert _states(engine.check_absent(["n1", "n2"], now=171.0)) == [("silent:n2", "resolved")]
+
+    # Règle cluster sur un chemin pointé
+    stats = {"distribution": {"cpu_usage": {"p90": 85.0}}}
+    assert _states(engine.observe_cluster(stats, now=200.0)) == [("p90_cpu", "firing")]
+
+    # Redémarrage: les alertes publiées sont reprises, pas redéclenchées
+    restarted = AlertEngine(RULES)
+    restarted.restore(json.loads(json.dumps(engine.active())), now=300.0)
+    assert restarted.observe_cluster(stats, now=301.0) == []
+    assert restarted.check_absent(["n1"], now=301.0) == []
+    assert _states(restarted.observe_cluster({"distribution": {}}, now=302.0)) == [("p90_cpu", "resolved")]
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        AlertEngine([{"name": "x", "metric": "cpu_usage", "op": "~"}])
+    with pytest.raises(ValueError):
+        AlertEngine([{"name": "x", "type": "absent", "scope": "cluster"}])
+    with pytest.raises(ValueError):
+        AlertEngine([{"name": "x", "metric": "cpu_usage"}, {"name": "x", "metric": "memory_usage"}])
+
+
+def test_alert_observe_1000_nodes(benchmark):
+    """Règles par défaut sur un point de chacun de 1000 nœuds (aucune transition)."""
+    engine = AlertEngine(MONITORING_CONFIG["alert_rules"])
+    nodes = [f"bench-node{i:04d}" for i in range(1000)]
+    metrics = {"cpu_usage": 20.0, "memory_usage": 40.0, "disk_usage": 42.0, "temperature": 50.0}
+    clock = iter(range(10 ** 9))
+
+    def round_():
+        now = float(next(clock))
+        return sum(len(engine.observe(node, metrics, now=now)) for node in nodes)
+
+    assert benchmark(round_) == 0
+    benchmark.extra_info["us_per_node"] = round(benchmark.stats.stats.mean * 1e6 / len(nodes), 2)
+
+
+def test_alerts_published_on_transition_only(redis_db, node_exporter_fleet, monkeypatch):
+    """10 cycles sur 20 nœuds: un message au premier firing, puis silence tant que rien ne change."""
+    fleet = node_exporter_fleet(20)
+    # Température du payload (> 0) en alerte sur tous les nœuds
+    monkeypatch.setattr(monitoring, "alert_engine",
+                        AlertEngine([{"name": "warm", "metric": "temperature", "op": ">", "value": 0}]))
+    events = redis.Redis().pubsub()
+    events.subscribe("cluster:alerts")
+    events.get_message(timeout=1.0)
+
+    for _ in range(10):
+        monitoring.collect_metrics()
+
+    messages = []
+    while (message := events.get_message(ignore_subscribe_messages=True, timeout=0.1)) is not None:
+        messages.append(json.loads(message["data"]))
+    events.close()
+
+    assert len(messages) == 1
+    assert messages[0]["alert_count"] == len(fleet.nodes)
+    assert {alert["state"] for alert in messages[0]["transitions"]} == {"firing"}
+    assert redis_db.hlen(MONITORING_CONFIG["alerts_key"]) == len(fleet.nodes)
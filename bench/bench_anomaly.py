@@ -0,0 +1,109 @@
+"""Règles anomaly (web.core.anomaly, MONITORING_CONFIG["alert_rules"]).
+
+Nœud simulé, un point toutes les 30 s: bruit, cycle jour/nuit de la
+température, job de 8 min toutes les 2 h (+6 °C, +15 % de mémoire).
+Aucune alerte sur 48 h de fonctionnement normal (premier jour compris,
+pendant que la base apprend le cycle); après un jour d'historique, une
+dérive (Pi qui chauffe, fuite mémoire) est signalée au moins 2 h avant
+les seuils fixes high_temp / high_memory (minutes après le début de la
+dérive dans extra_info). Puis coût d'un point par série.
+"""
+
+import math
+import random
+
+import pytest
+
+from web.config.metrics_config import MONITORING_CONFIG
+from web.core.alert_rules import AlertEngine
+from web.core.anomaly import MadScore
+
+STEP_S = 30
+# Dérive après un jour d'historique (cycle jour/nuit appris)
+DRIFT_AT = 30 * 3600
+JOBS = [(hour * 3600 + 1800, 8 * 60) for hour in range(1, 200, 2)]
+
+
+def _job_load(t):
+    """Charge 0..1 des jobs à l'instant t (montée et descente thermiques de 3 min)."""
+    load = 0.0
+    for start, duration in JOBS:
+        if start <= t < start + duration:
+            load += 1 - math.exp(-(t - start) / 180)
+        elif t >= start + duration:
+            load += (1 - math.exp(-duration / 180)) * math.exp(-(t - start - duration) / 180)
+    return load
+
+
+def _samples(hours, seed, metric=None, slope=0.0):
+    """Points (t, métriques) d'un nœud; slope: dérive de metric par minute à partir de DRIFT_AT."""
+    rng = random.Random(seed)
+    for i in range(int(hours * 3600 / STEP_S)):
+        t = i * STEP_S
+        job = _job_load(t)
+        metrics = {
+            "temperature": 50 + 3 * math.sin(2 * math.pi * t / 86400) + 6 * job + rng.gauss(0, 0.3),
+            "memory_usage": 40 + 15 * job + rng.gauss(0, 0.5),
+        }
+        if metric and t >= DRIFT_AT:
+            metrics[metric] = min(100.0, metrics[metric] + slope * (t - DRIFT_AT) / 60)
+        yield t, metrics
+
+
+def _first_firing(hours, seed, metric=None, slope=0.0, stop=None):
+    """Instant du premier firing de chaque règle (jusqu'au firing de stop)."""
+    engine = AlertEngine(MONITORING_CONFIG["alert_rules"])
+    fired = {}
+    for t, metrics in _samples(hours, seed, metric, slope):
+        for alert in engine.observe("pi", metrics, now=float(t)):
+            if alert["state"] == "firing":
+                fired.setdefault(alert["rule"], t)
+        if stop in fired:
+            break
+    return fired
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_stable_node_no_alert(seed):
+    assert _first_firing(48, seed) == {}
+
+
+@pytest.mark.parametrize("metric,slope,anomaly_rule,static_rule", [
+    ("temperature", 0.1, "temperature_drift", "high_temp"),
+    ("temperature", 0.05, "temperature_drift", "high_temp"),
+    ("memory_usage", 0.05, "memory_drift", "high_memory"),
+    ("memory_usage", 0.01, "memory_drift", "high_memory"),
+])
+def test_drift_detected_before_threshold(benchmark, metric, slope, anomaly_rule, static_rule):
+    fired = benchmark.pedantic(_first_firing, args=(150, 0, metric, slope, static_rule), rounds=1, iterations=1)
+
+    assert anomaly_rule in fired and static_rule in fired
+    assert fired[anomaly_rule] > DRIFT_AT
+    # Au moins 2 h d'avance sur le seuil fixe
+    assert fired[static_rule] - fired[anomaly_rule] >= 2 * 3600
+    benchmark.extra_info["anomaly_min"] = (fired[anomaly_rule] - DRIFT_AT) / 60
+    benchmark.extra_info["threshold_min"] = (fired[static_rule] - DRIFT_AT) / 60
+
+
+def test_flat_series_mad_floor():
+    """Série constante: le MAD descend jusqu'à 0 sans passer dessous, score nul."""
+    detector = MadScore(min_std=0.5)
+    scores = [detector.update(42.0, float(t)) for t in range(0, 86400, STEP_S)]
+    assert detector.mad == 0.0
+    assert scores[-1] == 0.0
+
+
+def test_score_update_1000_series(benchmark):
+    """Un point sur chacune de 1000 séries (état: cinq nombres par série)."""
+    rng = random.Random(0)
+    detectors = [MadScore(min_std=0.5) for _ in range(1000)]
+    values = [50 + rng.gauss(0, 0.3) for _ in range(1000)]
+    clock = iter(range(0, 10 ** 9, STEP_S))
+
+    def round_():
+        now = float(next(clock))
+        for detector, value in zip(detectors, values):
+            detector.update(value, now)
+
+    benchmark(round_)
+    benchmark.extra_info["us_per_series"] = round(benchmark.stats.stats.mean * 1e6 / len(detectors), 2)
@@ -0,0 +1,80 @@
+"""Débit de tâches Celery selon le profil de worker.
+
+Charge: une collecte lente (1 s, file monitoring) puis 200 tâches de
+scraping de 20 ms d'attente réseau (file scraping), broker en mémoire,
+workers dans le process. On mesure le temps jusqu'au dernier résultat de
+scraping.
+
+- solo: l'ancien worker unique (pool solo, concurrence 1, toutes les files);
+- io+monitoring: profil io (threads) sur scraping, collecte sur son worker.
+
+prefork ne partage pas le broker en mémoire: hors banc.
+"""
+
+import time
+from contextlib import ExitStack
+
+import pytest
+from celery.contrib.testing.worker import start_worker
+
+from web.celery_app import celery_app
+from web.config.metrics_config import CELERY_QUEUES, celery_worker_profile
+
+SCRAPES = 200
+SCRAPE_WAIT_S = 0.02
+COLLECT_S = 1.0
+
+
+@celery_app.task(name="web.tasks.scraping.bench_scrape")
+def bench_scrape(i):
+    time.sleep(SCRAPE_WAIT_S)
+    return i
+
+
+@celery_app.task(name="web.tasks.monitoring.bench_collect")
+def bench_collect():
+    time.sleep(COLLECT_S)
+    return "collected"
+
+
+def _workers(mode):
+    if mode == "solo":
+        return [{"pool": "solo", "concurrency": 1, "queues": list(CELERY_QUEUES.values())}]
+    io = celery_worker_profile("io")
+    if io["pool"] not in ("threads", "solo"):
+        # gevent/eventlet demandent un process patché
+        io["pool"] = "threads"
+    # prefork -> threads à 1: une collecte à la fois, dans le même process
+    return [io, {"pool": "threads", "concurrency": 1, "queues": [CELERY_QUEUES["monitoring"]]}]
+
+
+@pytest.fixture
+def memory_broker(monkeypatch):
+    # Transport mémoire: relève la file toutes les 10 ms au lieu de 1 s
+    monkeypatch.setitem(celery_app.conf, "broker_transport_options",
+                        {**celery_app.conf.broker_transport_options, "polling_interval": 0.01})
+    # Sans boucle événementielle (synloop), un worker dont la fenêtre de prefetch
+    # est pleine attend jusqu'à 2 s avant de reprendre: fenêtre élargie au lot
+    monkeypatch.setitem(celery_app.conf, "worker_prefetch_multiplier", 8)
+
+
+@pytest.mark.parametrize("mode", ["solo", "io+monitoring"])
+def test_celery_profile_throughput(benchmark, memory_broker, mode):
+    with ExitStack() as stack:
+        for worker in _workers(mode):
+            stack.enter_context(start_worker(celery_app, pool=worker["pool"], concurrency=worker["concurrency"],
+                                             queues=worker["queues"], perform_ping_check=False,
+                                             shutdown_timeout=30))
+
+        def run():
+            bench_collect.delay()
+            started = time.perf_counter()
+            results = [bench_scrape.delay(i) for i in range(SCRAPES)]
+            assert [r.get(timeout=60, interval=0.005) for r in results] == list(range(SCRAPES))
+            return time.perf_counter() - started
+
+        elapsed = benchmark.pedantic(run, rounds=1, iterations=1)
+        # Laisser finir la collecte avant l'arrêt des workers
+        time.sleep(COLLECT_S)
+
+    benchmark.extra_info["tasks_per_s"] = round(SCRAPES / elapsed)
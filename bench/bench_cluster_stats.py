@@ -0,0 +1,84 @@
+"""Agrégat du cluster en mémoire (web.core.cluster_stats).
+
+Exactitude: nœud expiré hors ligne, premier scrape (cpu_usage à 0 sans
+taux) et température absente ignorés dans les moyennes, p50/p90/max.
+Puis publication cluster:metrics pour 50 à 1000 nœuds: plus aucune
+lecture metrics:<nœud>, un seul aller-retour Redis.
+"""
+
+import json
+
+import pytest
+
+from web.core.cluster_stats import ClusterSnapshot
+from web.tasks import monitoring
+
+
+def _metrics(i):
+    return {"cpu_usage": float(i % 100), "cpu_cores": 4, "memory_usage": 40.0 + i % 20,
+            "disk_usage": 42.0, "temperature": 45.0 + i % 30, "net_usage": 5.0, "load_per_core": 0.2}
+
+
+def test_cluster_stats_accuracy():
+    snapshot = ClusterSnapshot(ttl_s=30.0)
+    nodes = [f"n{i}" for i in range(13)]
+    for i, node in enumerate(nodes[:10]):
+        snapshot.update(node, {"cpu_usage": 10.0 * (i + 1), "cpu_cores": 4, "memory_usage": 50.0,
+                               "temperature": None if i % 2 else 60.0}, now=100.0)
+    # Premier scrape: cpu_usage à 0 sans taux, en ligne mais hors des stats CPU
+    snapshot.update(nodes[10], {"cpu_usage": 0, "memory_usage": 50.0, "temperature": None}, now=100.0)
+    # Point trop vieux: hors ligne
+    snapshot.update(nodes[11], {"cpu_usage": 99.0, "cpu_cores": 4, "memory_usage": 99.0}, now=60.0)
+
+    aggregated = snapshot.aggregate(nodes, now=100.0)
+    stats = aggregated["cluster_stats"]
+
+    assert stats["total_nodes"] == 13
+    assert stats["online_nodes"] == 11
+    assert sorted(aggregated["nodes"]) == sorted(nodes[:11])
+    assert stats["avg_cpu"] == pytest.approx(55.0)
+    assert stats["distribution"]["cpu_usage"]["p50"] == pytest.approx(55.0)
+    assert stats["distribution"]["cpu_usage"]["p90"] == pytest.approx(91.0)
+    assert stats["distribution"]["cpu_usage"]["max"] == pytest.approx(100.0)
+    assert stats["avg_memory"] == pytest.approx(50.0)
+    # Température: 5 sondes à 60 °C, les nœuds sans sonde ne comptent pas pour 0
+    assert stats["avg_temperature"] == pytest.approx(60.0)
+    assert "disk_usage" not in stats["distribution"]
+
+
+@pytest.mark.parametrize("size", [50, 200, 1000])
+def test_publish_aggregate(benchmark, redis_db, monkeypatch, size):
+    """Agrégat + santé + alertes publiés depuis la mémoire (aucun GET/MGET par cycle)."""
+    nodes = [f"bench-node{i:04d}" for i in range(size)]
+    monkeypatch.setattr(monitoring, "NODES", nodes)
+    monitoring.cluster_snapshot.clear()
+    for i, node in enumerate(nodes):
+        monitoring.cluster_snapshot.update(node, _metrics(i))
+    monitoring.cluster_snapshot.seeded = True
+
+    def no_reread(*args, **kwargs):
+        raise AssertionError("metrics:<nœud> relu")
+
+    monkeypatch.setattr(monitoring.redis_client, "get", no_reread)
+    monkeypatch.setattr(monitoring.redis_client, "mget", no_reread)
+
+    benchmark(monitoring._update_aggregated_metrics)
+
+    aggregated = json.loads(redis_db.get("cluster:metrics"))
+    assert aggregated["cluster_stats"]["online_nodes"] == size
+    assert aggregated["cluster_stats"]["distribution"]["cpu_usage"]["max"] == min(size - 1, 99)
+    benchmark.extra_info["us_per_node"] = round(benchmark.stats.stats.mean * 1e6 / size, 1)
+    monitoring.cluster_snapshot.clear()
+
+
+def test_seed_after_restart(redis_db, node_exporter_fleet):
+    """Processus neuf: les nœuds pas encore scrapés ici sont repris une fois du cache."""
+    fleet = node_exporter_fleet(20)
+    monitoring.collect_metrics()
+    monitoring.cluster_snapshot.clear()
+
+    monitoring._update_aggregated_metrics()
+
+    aggregated = json.loads(redis_db.get("cluster:metrics"))
+    assert aggregated["cluster_stats"]["online_nodes"] == len(fleet.nodes)
+    assert monitoring.cluster_snapshot.seeded
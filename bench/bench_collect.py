@@ -0,0 +1,86 @@
+"""Cycle de collecte complet contre une flotte node_exporter simulée."""
+
+import pytest
+
+from conftest import load_payload
+from web.tasks import monitoring
+
+
+@pytest.mark.parametrize("size", [10, 50, 200])
+def test_collect_cycle(benchmark, redis_db, node_exporter_fleet, size):
+    fleet = node_exporter_fleet(size)
+    # Premier cycle hors mesure: amorce le cache CPU
+    monitoring.collect_metrics()
+
+    result = benchmark(monitoring.collect_metrics)
+
+    assert result["status"] == "collected"
+    assert result["nodes_processed"] == size
+    assert fleet.requests > 0
+    benchmark.extra_info["nodes"] = size
+
+
+def test_collect_cycle_with_latency(benchmark, redis_db, node_exporter_fleet):
+    """50 nœuds à 20 ms: mesure le recouvrement des requêtes."""
+    node_exporter_fleet(50, latency_s=0.02)
+    monitoring.collect_metrics()
+
+    result = benchmark.pedantic(monitoring.collect_metrics, rounds=5, iterations=1)
+
+    assert result["nodes_processed"] == 50
+
+
+@pytest.mark.parametrize("mode", ["fresh", "keepalive"])
+def test_collect_cycle_fleet_100(benchmark, redis_db, node_exporter_fleet, mode):
+    """100 nœuds, 20 ms de réponse, 30 ms par nouvelle connexion.
+
+    fresh: nouveau client à chaque cycle (connexions refaites, ancien
+    comportement); keepalive: client persistant du collecteur.
+    """
+    fleet = node_exporter_fleet(100, latency_s=0.02, connect_s=0.03)
+    monitoring.collect_metrics()
+
+    def cycle():
+        if mode == "fresh":
+            monitoring.collector_loop.reset()
+        return monitoring.collect_metrics()
+
+    result = benchmark.pedantic(cycle, rounds=5, iterations=1)
+
+    assert result["nodes_processed"] == 100
+    benchmark.extra_info["cycle_ms"] = result["cycle_ms"]
+    benchmark.extra_info["fetch_ms"] = result["fetch_ms"]
+    benchmark.extra_info["connections"] = fleet.connections
+    benchmark.extra_info["requests_per_node"] = fleet.requests / 100 / 6
+
+
+def test_collect_cycle_dead_nodes(benchmark, redis_db, node_exporter_fleet, monkeypatch):
+    """100 nœuds dont 2 qui ne répondent plus: le cycle s'arrête à la deadline."""
+    monkeypatch.setitem(monitoring.COLLECTOR_CONFIG, "cycle_deadline_s", 0.5)
+    node_exporter_fleet(100, latency_s=0.02, hanging=2)
+
+    result = benchmark.pedantic(monitoring.collect_metrics, rounds=3, iterations=1)
+
+    assert result["nodes_processed"] == 98
+    assert result["nodes_timed_out"] == 2
+    benchmark.extra_info["cycle_ms"] = result["cycle_ms"]
+    benchmark.extra_info["fetch_ms"] = result["fetch_ms"]
+
+
+def test_parse_node_exporter(benchmark):
+    payload = load_payload()
+    monitoring.cpu_rates.clear()
+
+    metrics = benchmark(monitoring._parse_node_exporter_metrics, payload, "bench-node000")
+
+    assert metrics["memory_total"] > 0
+    assert metrics["temperature"] is not None
+
+
+def test_update_aggregated_metrics(benchmark, redis_db, node_exporter_fleet):
+    node_exporter_fleet(200)
+    monitoring.collect_metrics()
+
+    benchmark(monitoring._update_aggregated_metrics)
+
+    assert redis_db.get("cluster:metrics")
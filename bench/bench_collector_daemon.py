@@ -0,0 +1,69 @@
+"""Service de collecte (web.collector) contre 100 nœuds simulés.
+
+Deux services dans le process: un seul prend le bail et collecte, chaque
+nœud sur son minuteur (1 s ici, +/- 10 %), écritures par lots de
+250 ms. Puis bascule: le leader s'arrête, l'autre reprend avec l'état
+CPU rechargé depuis Redis (cpu_usage calculé dès son premier scrape).
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from web.core.collector_daemon import CollectorDaemon
+from web.tasks import monitoring
+
+NODES = 100
+CONFIG = {"interval_s": 1.0, "flush_interval_s": 0.25, "leader_ttl_s": 0.5, "cpu_state": "redis"}
+RUN_S = 3.0
+
+
+def _daemons(nodes):
+    daemons = [CollectorDaemon(nodes=nodes, config=CONFIG, sampling={"enabled": False}) for _ in range(2)]
+    for i, daemon in enumerate(daemons):
+        # Même process: deux propriétaires distincts
+        daemon.lease.owner = f"bench-collector{i}"
+    return daemons
+
+
+def test_collector_daemon(benchmark, redis_db, node_exporter_fleet):
+    fleet = node_exporter_fleet(NODES, latency_s=0.02)
+    loop = asyncio.new_event_loop()
+    daemons = _daemons(fleet.nodes)
+    stops = [asyncio.Event() for _ in daemons]
+
+    async def run():
+        runs = [asyncio.create_task(d.run(s)) for d, s in zip(daemons, stops)]
+        await asyncio.sleep(RUN_S)
+        return runs
+
+    runs = benchmark.pedantic(lambda: loop.run_until_complete(run()), rounds=1, iterations=1)
+    leaders = [d for d in daemons if d.scraping]
+    requests_as_leader = fleet.requests
+    leader = leaders[0]
+
+    # Bascule: arrêt du leader, process "neuf" pour le suivant
+    follower = next(d for d in daemons if d is not leader)
+    stops[daemons.index(leader)].set()
+    loop.run_until_complete(runs[daemons.index(leader)])
+    monitoring.cpu_rates.clear()
+    redis_db.delete(*[f"metrics:{node}" for node in fleet.nodes])
+
+    async def failover():
+        while not follower.stats["flushes"]:
+            await asyncio.sleep(0.01)
+
+    loop.run_until_complete(asyncio.wait_for(failover(), timeout=5))
+    first = json.loads(redis_db.get(f"metrics:{fleet.nodes[0]}"))
+    stops[daemons.index(follower)].set()
+    loop.run_until_complete(runs[daemons.index(follower)])
+    loop.close()
+
+    expected = NODES * RUN_S / CONFIG["interval_s"]
+    benchmark.extra_info["scrapes_per_s"] = round(leader.stats["scrapes"] / RUN_S)
+    benchmark.extra_info["flushes"] = leader.stats["flushes"]
+    benchmark.extra_info["requests_vs_single_leader"] = round(requests_as_leader / expected, 2)
+    assert len(leaders) == 1
+    assert requests_as_leader <= expected * 1.2
+    assert first["cpu_usage"] > 0
@@ -0,0 +1,112 @@
+"""Taux CPU multi-cœurs (web.core.cpu_counters) sur des scrapes node_exporter.
+
+Exactitude d'abord: un cœur saturé sur quatre donne 25 % (l'ancien
+parseur ne gardait que le dernier cœur), iowait et steal sont isolés, un
+reboot ne produit pas de taux négatif, une interface qui apparaît ou
+repart de 0 ne fausse pas le débit réseau. Puis débit: parse + taux d'un
+scrape RPi, et d'un nœud 64 cœurs.
+"""
+
+import pytest
+
+from web.core.cpu_counters import MODES, CounterRateEngine, CpuRateEngine, parse_cpu_sample
+from web.tasks import monitoring
+
+from conftest import load_payload
+
+
+def _scrape(per_core):
+    """Texte node_cpu_seconds_total pour [{mode: secondes}, ...] (un dict par cœur)."""
+    return "\n".join(
+        f'node_cpu_seconds_total{{cpu="{cpu}",mode="{mode}"}} {counters.get(mode, 0.0):.2f}'
+        for cpu, counters in enumerate(per_core) for mode in MODES
+    )
+
+
+def _samples(text):
+    return [parse_cpu_sample(line) for line in text.splitlines()]
+
+
+def _advance(per_core, steps):
+    return [{mode: counters.get(mode, 0.0) + step.get(mode, 0.0) for mode in MODES}
+            for counters, step in zip(per_core, steps)]
+
+
+def test_cpu_rates_accuracy():
+    engine = CpuRateEngine(saturation_pct=90.0)
+    base = [{"user": 1000.0 * (i + 1), "idle": 50000.0, "iowait": 10.0} for i in range(4)]
+    # Cœur 3 saturé, cœur 1 en attente disque, 5 % de steal sur le cœur 0
+    steps = [{"user": 0.5, "idle": 4.0, "steal": 0.5}, {"iowait": 2.5, "idle": 2.5},
+             {"idle": 5.0}, {"user": 4.0, "system": 1.0}]
+    assert engine.update("n", _samples(_scrape(base))) is None
+    rates = engine.update("n", _samples(_scrape(_advance(base, steps))))
+
+    assert rates["cpu_usage"] == pytest.approx((1.0 + 5.0) / 20 * 100)
+    assert rates["cpu_iowait"] == pytest.approx(2.5 / 20 * 100)
+    assert rates["cpu_steal"] == pytest.approx(0.5 / 20 * 100)
+    assert rates["cpu_core_max"] == pytest.approx(100.0)
+    assert rates["cpu_cores_saturated"] == 1
+    assert not rates["cpu_counter_reset"]
+
+    # Reboot: compteurs repartis de 0, le delta est la valeur courante
+    rebooted = [{"user": 3.0, "idle": 7.0}] * 4
+    rates = engine.update("n", _samples(_scrape(rebooted)))
+    assert rates["cpu_counter_reset"]
+    assert rates["cpu_usage"] == pytest.approx(30.0)
+
+    # Hotplug: autre nombre de cœurs, l'état repart
+    assert engine.update("n", _samples(_scrape(rebooted[:2]))) is None
+
+
+def _net_scrape(rx_by_device):
+    """Texte node_network_receive_bytes_total pour {device: octets}."""
+    return "\n".join(f'node_network_receive_bytes_total{{device="{device}"}} {rx:.1f}'
+                     for device, rx in rx_by_device.items())
+
+
+def test_counter_rates_per_device(monkeypatch):
+    """Débit par interface puis somme: ni une interface nouvelle ni un compteur remis à 0 ne font de pic."""
+    monkeypatch.setattr(monitoring, "node_rates", CounterRateEngine())
+    clock = iter(range(0, 1000, 10))
+    monkeypatch.setattr("web.core.cpu_counters.time.monotonic", lambda: float(next(clock)))
+    parse = monitoring._parse_node_exporter_metrics
+
+    parse(_net_scrape({"eth0": 1e9}), "n")
+    assert parse(_net_scrape({"eth0": 1e9 + 1e4}), "n")["net_rx_bps"] == pytest.approx(1e3)
+    # wlan0 apparaît avec 5 Go déjà comptés: pas de débit pour elle au premier point
+    metrics = parse(_net_scrape({"eth0": 1e9 + 2e4, "wlan0": 5e9}), "n")
+    assert metrics["net_rx_bps"] == pytest.approx(1e3)
+    # eth0 repart de 0 (pilote rechargé): sa valeur courante sur l'intervalle
+    metrics = parse(_net_scrape({"eth0": 3e4, "wlan0": 5e9 + 2e4}), "n")
+    assert metrics["net_rx_bps"] == pytest.approx(3e3 + 2e3)
+
+
+def test_cpu_rates_parse_rpi(benchmark):
+    """Parse complet d'un scrape RPi 4 cœurs avec calcul des taux."""
+    payload = load_payload()
+    later = payload.replace('mode="user"} 8', 'mode="user"} 9')
+
+    def setup():
+        monitoring.cpu_rates.clear()
+        monitoring._parse_node_exporter_metrics(payload, "bench-node000")
+        return (later, "bench-node000"), {}
+
+    metrics = benchmark.pedantic(monitoring._parse_node_exporter_metrics, setup=setup, rounds=500)
+
+    assert metrics["cpu_cores"] == 4
+    assert metrics["cpu_usage"] > 0
+
+
+def test_cpu_rates_64_cores(benchmark):
+    """Taux d'un nœud 64 cœurs x 8 modes (échantillons déjà parsés)."""
+    engine = CpuRateEngine()
+    base = [{mode: 100.0 * (i + 1) for mode in MODES} for i in range(64)]
+    scrapes = [_samples(_scrape(_advance(base, [{"user": t, "idle": 2 * t}] * 64))) for t in range(2)]
+
+    def setup():
+        engine.update("n", scrapes[0])
+        return ("n", scrapes[1]), {}
+
+    rates = benchmark.pedantic(engine.update, setup=setup, rounds=500)
+    assert rates["cpu_cores"] == 64
+    assert rates["cpu_usage"] == pytest.approx(100 / 3)
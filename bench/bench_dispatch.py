@@ -0,0 +1,154 @@
+"""Débit du dispatcher et opérations de la TaskQueue (sans exécution réelle)."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from web.core.dispatcher import Dispatcher
+from web.core.task_queue import Task, TaskPriority, TaskQueue
+from web.core.worker_registry import WorkerRegistry, WorkerStatus
+
+PRIORITIES = list(TaskPriority)
+HOSTS = [f"bench-node{i:03d}" for i in range(20)]
+
+
+def _make_tasks(count):
+    return [Task({"kind": "bench", "n": i}, priority=PRIORITIES[i % len(PRIORITIES)]) for i in range(count)]
+
+
+def _make_registry():
+    registry = WorkerRegistry()
+    for i, host in enumerate(HOSTS):
+        registry.register(host)
+        registry.heartbeat(host)
+        registry.get(host).update_metrics(cpu_usage=10 + i % 60, memory_usage=40.0, disk_usage=50.0)
+    return registry
+
+
+async def _instant_send(task, target):
+    return {"task_id": task.id, "result": "ok", "timestamp": datetime.now().isoformat()}
+
+
+@pytest.mark.parametrize("tasks", [100, 1000])
+def test_dispatch_throughput(benchmark, tasks):
+    registry = _make_registry()
+    queue = TaskQueue()
+    dispatcher = Dispatcher(registry, queue)
+    for host in HOSTS:
+        dispatcher.fault_tolerance.health_checker.update_health(host, True)
+    # Mesure le coût du dispatcher lui-même, pas le délai simulé du worker
+    dispatcher._send_task_to_worker = _instant_send
+
+    def setup():
+        for task in _make_tasks(tasks):
+            queue.push(task)
+        return (), {}
+
+    async def drain():
+        done = 0
+        while await dispatcher.dispatch_once() is not None:
+            done += 1
+        return done
+
+    done = benchmark.pedantic(lambda: asyncio.run(drain()), setup=setup, rounds=5, iterations=1)
+
+    assert done == tasks
+    benchmark.extra_info["tasks"] = tasks
+
+
+@pytest.mark.parametrize("size", [100, 1000])
+def test_task_queue_push(benchmark, size):
+    def setup():
+        return (TaskQueue(), _make_tasks(size)), {}
+
+    def push_all(queue, tasks):
+        for task in tasks:
+            queue.push(task)
+        return queue
+
+    queue = benchmark.pedantic(push_all, setup=setup, rounds=5, iterations=1)
+
+    assert len(queue) == size
+
+
+def test_task_queue_lifecycle(benchmark):
+    """push -> pop -> running -> completed, puis lecture des stats."""
+    queue = TaskQueue()
+
+    def cycle():
+        task = Task({"kind": "bench"})
+        queue.push(task)
+        popped = queue.pop()
+        queue.mark_running(popped, "bench-node000")
+        queue.mark_completed(popped.id, {"ok": True})
+        queue.get_task(popped.id)
+        return queue.get_stats()
+
+    stats = benchmark(cycle)
+
+    assert stats["pending"] == 0
+
+
+@pytest.mark.parametrize("strategy", ["round_robin", "network_headroom"])
+def test_dispatch_scraping_network(benchmark, strategy):
+    """Jobs de scraping, la moitié des nœuds a le réseau saturé (CPU quasi libre)."""
+    registry = WorkerRegistry()
+    saturated = set(HOSTS[::2])
+    for host in HOSTS:
+        registry.register(host, ["cpu", "scraping"])
+        registry.set_metrics(host, {"cpu_usage": 5.0 if host in saturated else 40.0, "memory_usage": 40.0,
+                                    "disk_usage": 50.0, "net_usage": 95.0 if host in saturated else 10.0,
+                                    "psi_io": 2.0})
+    queue = TaskQueue()
+    dispatcher = Dispatcher(registry, queue)
+    for host in HOSTS:
+        dispatcher.fault_tolerance.health_checker.update_health(host, True)
+    dispatcher._send_task_to_worker = _instant_send
+    if strategy == "round_robin":
+        dispatcher._strategy_for = lambda task: "round_robin"
+    targets = []
+
+    def setup():
+        for i in range(200):
+            queue.push(Task({"kind": "scrape", "n": i}, requires=["scraping"]))
+        return (), {}
+
+    async def drain():
+        while True:
+            result = await dispatcher.dispatch_once()
+            if result is None:
+                return
+            targets.append(result["target"])
+
+    benchmark.pedantic(lambda: asyncio.run(drain()), setup=setup, rounds=3, iterations=1)
+
+    on_saturated = sum(target in saturated for target in targets) / len(targets)
+    # Répartition: nœuds équivalents départagés en round-robin, pas tout sur le premier
+    max_share = max(targets.count(host) for host in set(targets)) / len(targets)
+    benchmark.extra_info["share_on_saturated_nodes"] = round(on_saturated, 2)
+    benchmark.extra_info["max_share_per_node"] = round(max_share, 3)
+    if strategy == "network_headroom":
+        assert on_saturated == 0
+        assert max_share <= 1.5 / (len(HOSTS) - len(saturated))
+    else:
+        assert on_saturated == pytest.approx(0.5, abs=0.05)
+        assert max_share <= 1.5 / len(HOSTS)
+
+
+def test_network_headroom_in_flight():
+    """Jobs en cours comptés dans le score: le nœud le plus libre cède sa place une fois chargé."""
+    registry = WorkerRegistry()
+    for host, net_usage in (("idle", 5.0), ("busier", 20.0)):
+        registry.register(host, ["scraping"])
+        registry.set_metrics(host, {"cpu_usage": 10.0, "memory_usage": 40.0, "net_usage": net_usage})
+    dispatcher = Dispatcher(registry, TaskQueue())
+    for host in ("idle", "busier"):
+        dispatcher.fault_tolerance.health_checker.update_health(host, True)
+
+    assert dispatcher._pick_target(["scraping"], strategy="network_headroom") == "idle"
+    registry.record_job_start("idle")
+    registry.set_status("idle", WorkerStatus.READY)
+    assert dispatcher._pick_target(["scraping"], strategy="network_headroom") == "busier"
+    registry.record_job_result("idle", True)
+    assert registry.get("idle").active_jobs == 0
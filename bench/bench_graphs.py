@@ -0,0 +1,35 @@
+"""Endpoints /api/graphs via le vrai routeur FastAPI."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import seed_history, seed_node_metrics
+from web.api import graphs
+from web.core.metrics_history import history_manager
+
+NODES = [f"bench-node{i:03d}" for i in range(10)]
+
+
+@pytest.fixture
+def client(redis_db, monkeypatch):
+    monkeypatch.setattr(history_manager, "redis_client", redis_db)
+    monkeypatch.setattr("web.config.metrics_config.NODES", NODES)
+    seed_history(redis_db, NODES, 720)
+    seed_node_metrics(redis_db, NODES)
+    app = FastAPI()
+    app.include_router(graphs.router)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize("path", [
+    "/api/graphs/cpu-history?hours=12",
+    "/api/graphs/cpu-history?hours=12&node=bench-node000",
+    "/api/graphs/combined-history?hours=12",
+    "/api/graphs/realtime-data",
+])
+def test_graphs_endpoint(benchmark, client, path):
+    response = benchmark(client.get, path)
+
+    assert response.status_code == 200
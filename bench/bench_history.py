@@ -0,0 +1,37 @@
+"""Écriture et lecture de l'historique Redis (history:{node})."""
+
+import pytest
+
+from conftest import seed_history
+from web.core.metrics_history import history_manager
+
+NODES = [f"bench-node{i:03d}" for i in range(10)]
+SAMPLE = {"cpu_usage": 42.0, "memory_usage": 61.5, "disk_usage": 55.0, "temperature": 51.2}
+
+
+@pytest.fixture
+def history_client(redis_db, monkeypatch):
+    monkeypatch.setattr(history_manager, "redis_client", redis_db)
+    return redis_db
+
+
+def test_store_metrics_point(benchmark, history_client):
+    assert benchmark(history_manager.store_metrics_point, "bench-node000", SAMPLE)
+
+
+@pytest.mark.parametrize("points", [360, 1440])
+def test_get_node_history(benchmark, history_client, points):
+    seed_history(history_client, NODES[:1], points)
+
+    history = benchmark(history_manager.get_node_history, NODES[0], 24)
+
+    assert len(history) == points
+
+
+def test_get_aggregated_history(benchmark, history_client):
+    # 10 nœuds, 24 h à 1 point/min
+    seed_history(history_client, NODES, 1440)
+
+    history = benchmark(history_manager.get_aggregated_history, 24, 5)
+
+    assert history
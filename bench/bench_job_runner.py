@@ -0,0 +1,88 @@
+"""Latence de l'API pendant que 100 jobs locaux s'exécutent.
+
+100 jobs "generic" soumis par POST /api/jobs/, travail simulé réduit à
+100 ms par job. Pendant leur exécution un client interroge l'API toutes
+les 5 ms. Latences (POST et GET) dans extra_info: avec des processeurs qui bloquent la boucle (ancien time.sleep)
+les requêtes attendent la fin de chaque job, avec le JobRunner elles
+restent à la milliseconde.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from web.config.metrics_config import JOB_RUNNER_CONFIG
+from web.core.job_runner import JobRunner
+from web.core.job_store import JobStore, JobUpdateBuffer
+
+JOBS = 100
+WORK_SCALE = 0.1
+
+
+@pytest.fixture
+def jobs_api(tmp_path, monkeypatch):
+    from web.api import jobs
+
+    store = JobStore(str(tmp_path / "cluster.db"), pool_size=4)
+    store.migrate()
+    monkeypatch.setattr(jobs, "job_store", store)
+    monkeypatch.setattr(jobs, "job_updates", JobUpdateBuffer(store, flush_interval_ms=50))
+    monkeypatch.setattr(jobs, "job_runner", JobRunner(**JOB_RUNNER_CONFIG))
+    app = FastAPI()
+    app.include_router(jobs.router)
+    yield jobs, app, store
+    store.close()
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+@pytest.mark.parametrize("mode", ["blocking", "runner"])
+def test_jobs_api_latency_under_load(benchmark, jobs_api, monkeypatch, mode):
+    jobs, app, store = jobs_api
+    real_simulate = jobs.simulate_work
+
+    async def blocking_work(job_id, seconds, steps=4):
+        # Comportement d'origine: time.sleep dans la coroutine
+        time.sleep(seconds * WORK_SCALE)
+
+    async def pooled_work(job_id, seconds, steps=4):
+        await real_simulate(job_id, seconds * WORK_SCALE, steps)
+
+    monkeypatch.setattr(jobs, "simulate_work", blocking_work if mode == "blocking" else pooled_work)
+    loop = asyncio.new_event_loop()
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            ids, latencies = [], []
+            for i in range(JOBS):
+                started = time.perf_counter()
+                response = await client.post("/api/jobs/", json={"name": f"bench {i}", "job_type": "generic",
+                                                                  "parameters": {}})
+                latencies.append(time.perf_counter() - started)
+                ids.append(response.json()["id"])
+            while True:
+                started = time.perf_counter()
+                response = await client.get(f"/api/jobs/{ids[-1]}")
+                latencies.append(time.perf_counter() - started)
+                if response.json()["status"] == "completed":
+                    break
+                await asyncio.sleep(0.005)
+            await jobs.job_updates.stop()
+            return latencies
+
+    latencies = benchmark.pedantic(lambda: loop.run_until_complete(run()), rounds=1, iterations=1)
+    loop.run_until_complete(jobs.job_runner.stop())
+    loop.close()
+    benchmark.extra_info["requests"] = len(latencies)
+    benchmark.extra_info["p50_ms"] = round(_percentile(latencies, 0.5) * 1000, 2)
+    benchmark.extra_info["p99_ms"] = round(_percentile(latencies, 0.99) * 1000, 2)
+    benchmark.extra_info["max_ms"] = round(max(latencies) * 1000, 2)
+    if mode == "runner":
+        assert _percentile(latencies, 0.99) < 0.05
@@ -0,0 +1,181 @@
+"""Store SQLite des jobs sur une base de 1M jobs (BENCH_JOBS pour réduire).
+
+Latence des listes filtrées (avec et sans index), lecture par id, mise à
+jour de statut, listes concurrentes servies par le pool de connexions,
+débit des mises à jour de progression directes vs write-behind, pages
+profondes OFFSET vs curseur, projection et export complet.
+"""
+
+import asyncio
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from web.core.job_store import JobStore, JobUpdateBuffer, _SELECT_JOBS, encode_cursor, parse_fields
+
+BENCH_JOBS = int(os.getenv("BENCH_JOBS", "1000000"))
+STATUSES = ["pending", "running", "completed", "completed", "completed", "failed", "cancelled"]
+JOB_TYPES = ["scraping", "processing", "generic", "report"]
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("jobs") / "cluster.db")
+    store = JobStore(path, pool_size=4)
+    store.migrate()
+
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    params = json.dumps({"start_url": "http://example.lan", "max_pages": 10})
+    conn = store.connect()
+    with conn:
+        conn.executemany(
+            "INSERT INTO jobs (id, name, job_type, parameters, status, progress, priority, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (f"job_{i:08d}", f"bench {i}", rng.choice(JOB_TYPES), params, rng.choice(STATUSES),
+                 100.0, 1 + i % 3, (start + timedelta(seconds=i * 3)).isoformat())
+                for i in range(BENCH_JOBS)
+            ),
+        )
+    conn.execute("ANALYZE")
+    conn.close()
+    yield store
+    store.close()
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.mark.parametrize("filters", [{}, {"status": "pending"}, {"job_type": "report"},
+                                     {"status": "failed", "job_type": "scraping"}],
+                         ids=["all", "status", "type", "status+type"])
+def test_jobs_list(benchmark, store, loop, filters):
+    jobs = benchmark(lambda: loop.run_until_complete(store.list_jobs(limit=50, **filters)))
+    assert len(jobs) == 50
+
+
+def test_jobs_list_without_index(benchmark, store, loop):
+    """Même liste que [status], index interdit: l'ancien coût (scan + tri)."""
+    sql = _SELECT_JOBS.replace("FROM jobs", "FROM jobs NOT INDEXED") + \
+        " WHERE status = ? ORDER BY created_at DESC LIMIT 50"
+
+    def query():
+        return loop.run_until_complete(store.run(lambda conn: conn.execute(sql, ("pending",)).fetchall()))
+
+    rows = benchmark.pedantic(query, rounds=3, iterations=1)
+    assert len(rows) == 50
+
+
+def test_jobs_get(benchmark, store, loop):
+    rng = random.Random(1)
+    job = benchmark(lambda: loop.run_until_complete(store.get_job(f"job_{rng.randrange(BENCH_JOBS):08d}")))
+    assert job is not None
+
+
+def test_jobs_update_status(benchmark, store, loop):
+    rng = random.Random(2)
+
+    def update():
+        job_id = f"job_{rng.randrange(BENCH_JOBS):08d}"
+        return loop.run_until_complete(store.update_status(job_id, "running", 10.0, node="bench-node001"))
+
+    assert benchmark(update)
+
+
+def test_jobs_list_concurrent(benchmark, store, loop):
+    """32 listes simultanées: réparties sur les connexions du pool."""
+    async def burst():
+        return await asyncio.gather(*(store.list_jobs(status=STATUSES[i % len(STATUSES)], limit=50)
+                                      for i in range(32)))
+
+    results = benchmark(lambda: loop.run_until_complete(burst()))
+    assert all(len(jobs) == 50 for jobs in results)
+
+
+@pytest.mark.parametrize("mode", ["direct", "buffered"])
+def test_jobs_progress_updates(benchmark, store, loop, mode):
+    """2000 mises à jour de progression sur 50 jobs scraping en cours."""
+    updates = [(f"job_{i % 50:08d}", (i // 50) * 2.5) for i in range(2000)]
+    buffer = JobUpdateBuffer(store, flush_interval_ms=50, max_pending=500)
+
+    async def direct():
+        for job_id, progress in updates:
+            await store.update_status(job_id, "running", progress)
+
+    async def buffered():
+        for job_id, progress in updates:
+            buffer.update_status(job_id, "running", progress)
+            # Rythme d'un processeur de jobs: rend la main à la boucle
+            await asyncio.sleep(0)
+        await buffer.stop()
+
+    run = direct if mode == "direct" else buffered
+    benchmark.pedantic(lambda: loop.run_until_complete(run()), rounds=3, iterations=1)
+    benchmark.extra_info["updates_per_s"] = round(len(updates) / benchmark.stats.stats.min)
+    if mode == "buffered":
+        benchmark.extra_info["flushes"] = buffer.stats["flushes"]
+    job = loop.run_until_complete(store.get_job("job_00000049"))
+    assert job["progress"] == 97.5
+
+
+def test_jobs_buffer_poison_row(store, loop):
+    """Un result non encodable ne bloque pas le lot: les autres passent, lui est abandonné."""
+    buffer = JobUpdateBuffer(store, flush_interval_ms=10, max_attempts=3)
+
+    async def run():
+        buffer.update_status("job_00000001", "completed", 100.0, result={"pages": {1, 2}})
+        buffer.update_status("job_00000002", "running", 42.0)
+        for _ in range(3):
+            await buffer.flush()
+        await buffer.stop()
+
+    loop.run_until_complete(run())
+    assert buffer.get_stats()["pending"] == 0
+    assert buffer.stats["dropped"] == 1 and buffer.stats["rows"] == 1
+    assert loop.run_until_complete(store.get_job("job_00000002"))["progress"] == 42.0
+
+
+@pytest.mark.parametrize("mode", ["offset", "keyset"])
+def test_jobs_deep_page(benchmark, store, loop, mode):
+    """Page de 50 à mi-parcours de la liste complète."""
+    depth = BENCH_JOBS // 2
+    # Le job juste avant la page: job_{n-1-depth+1} en tri décroissant
+    anchor = BENCH_JOBS - depth
+    created_at = (datetime(2024, 1, 1) + timedelta(seconds=anchor * 3)).isoformat()
+    cursor = encode_cursor(created_at, f"job_{anchor:08d}")
+
+    def page():
+        if mode == "offset":
+            return loop.run_until_complete(store.list_jobs(limit=50, offset=depth))
+        return loop.run_until_complete(store.list_page(limit=50, cursor=cursor))[0]
+
+    jobs = benchmark.pedantic(page, rounds=5, iterations=1)
+    assert jobs[0]["id"] == f"job_{anchor - 1:08d}"
+
+
+@pytest.mark.parametrize("fields", [None, "name,status,progress"], ids=["all", "projection"])
+def test_jobs_page_projection(benchmark, store, loop, fields):
+    columns = parse_fields(fields)
+    jobs, _ = benchmark(lambda: loop.run_until_complete(store.list_page(limit=1000, columns=columns)))
+    assert len(jobs) == 1000
+
+
+def test_jobs_export(benchmark, store, loop):
+    """Parcours complet par pages de 1000 (export NDJSON sans sérialisation)."""
+    async def export():
+        count = 0
+        async for jobs in store.iter_jobs(columns=parse_fields("name,status,progress")):
+            count += len(jobs)
+        return count
+
+    count = benchmark.pedantic(lambda: loop.run_until_complete(export()), rounds=1, iterations=1)
+    benchmark.extra_info["rows_per_s"] = round(count / benchmark.stats.stats.min)
+    assert count == BENCH_JOBS
@@ -0,0 +1,71 @@
+"""Soumission de 10k jobs: un POST par job vs un POST /api/jobs/bulk.
+
+Store SQLite neuf et broker Celery en mémoire: on mesure l'insertion,
+l'envoi des tâches scraping et le streaming des ids acceptés.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from web.core.job_store import JobStore
+
+JOBS = 10000
+
+
+def _job(i: int) -> dict:
+    return {"name": f"bench {i}", "job_type": "scraping",
+            "parameters": {"start_url": f"http://site{i % 50}.lan", "max_pages": 5}, "priority": 1 + i % 3}
+
+
+@pytest.fixture
+def jobs_api(tmp_path, monkeypatch):
+    from web.api import jobs
+
+    store = JobStore(str(tmp_path / "cluster.db"), pool_size=4)
+    store.migrate()
+    monkeypatch.setattr(jobs, "job_store", store)
+
+    async def no_processing(job_id, job_request):
+        pass
+
+    # Coût de la soumission seule: pas d'exécution des jobs locaux
+    monkeypatch.setattr(jobs, "process_job", no_processing)
+    app = FastAPI()
+    app.include_router(jobs.router)
+    yield jobs, app, store
+    store.close()
+
+
+async def _count(store: JobStore) -> int:
+    return await store.run(lambda conn: conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0])
+
+
+@pytest.mark.parametrize("mode", ["single", "bulk"])
+def test_jobs_submit(benchmark, jobs_api, mode):
+    jobs, app, store = jobs_api
+    body = "\n".join(json.dumps(_job(i)) for i in range(JOBS)).encode()
+    loop = asyncio.new_event_loop()
+
+    async def submit():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if mode == "single":
+                for i in range(JOBS):
+                    response = await client.post("/api/jobs/", json=_job(i))
+                    assert response.status_code == 200
+                return JOBS
+            response = await client.post("/api/jobs/bulk", content=body,
+                                         headers={"Content-Type": "application/x-ndjson"})
+            lines = response.text.splitlines()
+            return json.loads(lines[-1])["accepted"]
+
+    accepted = benchmark.pedantic(lambda: loop.run_until_complete(submit()), rounds=1, iterations=1)
+    total = loop.run_until_complete(_count(store))
+    loop.run_until_complete(jobs.job_runner.stop())
+    loop.close()
+    benchmark.extra_info["jobs_per_s"] = round(JOBS / benchmark.stats.stats.min)
+    assert accepted == JOBS and total == JOBS
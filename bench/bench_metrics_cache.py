@@ -0,0 +1,108 @@
+"""Endpoints /api/metrics adossés au cache Redis: lecture directe vs Celery.
+
+- lecture de /cluster: ancien chemin (get_cached_metrics.delay().get(),
+  aller-retour broker + worker) vs lecture async directe;
+- rafraîchissement de 50 nœuds: ancien POST bloquant (collect_metrics
+  .delay().get()) vs POST qui rend un task_id, fin reçue sur celery:tasks.
+
+Broker et backend Celery en mémoire, worker (threads) dans le process.
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import redis.asyncio as aioredis
+from celery.contrib.testing.worker import start_worker
+from fastapi import FastAPI
+
+from web.celery_app import celery_app
+from web.tasks import monitoring
+
+# Client de l'API capturé avant que la flotte simulée ne remplace httpx.AsyncClient
+ApiClient = httpx.AsyncClient
+
+AGGREGATED = json.dumps({
+    "timestamp": "2024-01-01T00:00:00",
+    "nodes": {f"bench-node{i:03d}": {"cpu_usage": 12.5, "memory_usage": 48.0, "temperature": 51.2}
+              for i in range(50)},
+    "cluster_stats": {"total_nodes": 50, "online_nodes": 50, "avg_cpu": 12.5},
+})
+
+
+@pytest.fixture
+def celery_worker(monkeypatch):
+    # Transport mémoire: relève la file toutes les 10 ms au lieu de 1 s
+    monkeypatch.setitem(celery_app.conf, "broker_transport_options",
+                        {**celery_app.conf.broker_transport_options, "polling_interval": 0.01})
+    with start_worker(celery_app, pool="threads", concurrency=4, perform_ping_check=False, shutdown_timeout=30):
+        yield
+
+
+@pytest.fixture
+def metrics_api():
+    from web.api import metrics_cache
+
+    app = FastAPI()
+    app.include_router(metrics_cache.router)
+    return app
+
+
+def _legacy_cluster_read():
+    """Ancien GET /api/metrics/cluster."""
+    return monitoring.get_cached_metrics.delay().get(timeout=5, interval=0.005)
+
+
+@pytest.mark.parametrize("mode", ["celery", "direct"])
+def test_metrics_cluster_read(benchmark, redis_db, celery_worker, metrics_api, mode):
+    redis_db.set("cluster:metrics", AGGREGATED)
+    loop = asyncio.new_event_loop()
+    client = ApiClient(transport=httpx.ASGITransport(app=metrics_api), base_url="http://bench")
+
+    def direct():
+        response = loop.run_until_complete(client.get("/api/metrics/cluster"))
+        return response.json()["data"]
+
+    data = benchmark(_legacy_cluster_read if mode == "celery" else direct)
+    loop.run_until_complete(client.aclose())
+    loop.close()
+    assert data["cluster_stats"]["online_nodes"] == 50
+
+
+@pytest.mark.parametrize("mode", ["blocking", "async"])
+def test_metrics_refresh(benchmark, redis_db, celery_worker, metrics_api, node_exporter_fleet, mode):
+    """Durée mesurée: jusqu'à la fin de la collecte. extra_info: attente du client HTTP (response_ms)."""
+    node_exporter_fleet(50, latency_s=0.02)
+    loop = asyncio.new_event_loop()
+    client = ApiClient(transport=httpx.ASGITransport(app=metrics_api), base_url="http://bench")
+    events = aioredis.Redis().pubsub()
+    loop.run_until_complete(events.subscribe(monitoring.TASK_EVENTS_CHANNEL))
+    completions = []
+
+    async def refresh_async():
+        started = time.perf_counter()
+        response = await client.post("/api/metrics/refresh")
+        responded = time.perf_counter() - started
+        task_id = response.json()["task_id"]
+        while True:
+            message = await events.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message and json.loads(message["data"])["task_id"] == task_id:
+                completions.append(time.perf_counter() - started)
+                return responded
+
+    def run():
+        if mode == "blocking":
+            started = time.perf_counter()
+            assert monitoring.collect_metrics.delay().get(timeout=30, interval=0.005)["status"] == "collected"
+            return time.perf_counter() - started
+        return loop.run_until_complete(refresh_async())
+
+    responded = benchmark.pedantic(run, rounds=3, iterations=1)
+    loop.run_until_complete(events.aclose())
+    loop.run_until_complete(client.aclose())
+    loop.close()
+    benchmark.extra_info["response_ms"] = round(responded * 1000, 1)
+    if completions:
+        benchmark.extra_info["completed_event_ms"] = round(min(completions) * 1000, 1)
@@ -0,0 +1,145 @@
+"""Agent de nœud poussé (scripts/monitoring/node_agent.py) et sa réception.
+
+Trame de l'agent vs scrape node_exporter: taille, et décodage vs parse
+du scrape RPi. Puis plusieurs agents (le /proc de la machine sous des
+noms de nœuds différents) poussent dans le Stream Redis et en UDP: le
+cycle collect_metrics prend leurs trames et ne scrape que les nœuds sans
+agent.
+"""
+
+import asyncio
+import importlib.util
+import time
+from pathlib import Path
+
+import pytest
+import redis
+
+from web.core.agent_ingest import AGENT_FIELDS, AgentIngest, decode_frame
+from web.tasks import monitoring
+
+from conftest import load_payload
+
+pytest.importorskip("msgpack")
+if not Path("/proc/stat").exists():
+    pytest.skip("agent de nœud: /proc requis (Linux)", allow_module_level=True)
+
+AGENT_PATH = Path(__file__).resolve().parent.parent / "scripts" / "monitoring" / "node_agent.py"
+
+
+def _load_agent_module():
+    spec = importlib.util.spec_from_file_location("node_agent", AGENT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+node_agent = _load_agent_module()
+
+
+def _primed_agent(node):
+    agent = node_agent.NodeAgent(node)
+    agent.sample()
+    # Au moins un tick de /proc/stat entre deux échantillons
+    time.sleep(0.02)
+    return agent
+
+
+def test_agent_frame(benchmark):
+    """Lecture de /proc + taux + trame msgpack, côté nœud."""
+    assert node_agent.FIELDS == AGENT_FIELDS
+    agent = _primed_agent("bench-node000")
+
+    frame = benchmark(agent.frame)
+
+    node, metrics = decode_frame(frame)
+    assert node == "bench-node000"
+    assert metrics["cpu_cores"] >= 1
+    assert 0 <= metrics["memory_usage"] <= 100
+    assert "net_rx_bps" in metrics and "load1" in metrics
+    exporter_bytes = len(load_payload().encode())
+    benchmark.extra_info["frame_bytes"] = len(frame)
+    benchmark.extra_info["exporter_bytes"] = exporter_bytes
+    assert len(frame) < 200
+
+
+def test_agent_frame_decode(benchmark):
+    """Réception d'une trame (décodage + dernière trame du nœud), côté collecteur."""
+    frame = _primed_agent("bench-node000").frame()
+    ingest = AgentIngest({"enabled": True}, known_nodes=lambda: ("bench-node000",))
+
+    assert benchmark(ingest.receive, frame)
+
+    # Même nœud en node_exporter: parse du scrape RPi (compteurs CPU amorcés)
+    payload = load_payload()
+    monitoring.cpu_rates.clear()
+    monitoring._parse_node_exporter_metrics(payload, "bench-node000")
+    started = time.perf_counter()
+    for _ in range(100):
+        monitoring._parse_node_exporter_metrics(payload, "bench-node000")
+    parse_us = (time.perf_counter() - started) / 100 * 1e6
+    benchmark.extra_info["exporter_parse_us"] = round(parse_us, 1)
+    benchmark.extra_info["decode_speedup"] = round(parse_us / (benchmark.stats.stats.mean * 1e6), 1)
+    assert benchmark.stats.stats.mean * 1e6 < parse_us
+
+
+def test_agents_redis_stream(benchmark, redis_db, node_exporter_fleet, monkeypatch):
+    """6 agents sur 10 nœuds poussent dans le Stream: le cycle ne scrape que les 4 autres."""
+    fleet = node_exporter_fleet(10)
+    monkeypatch.setattr(monitoring, "agent_ingest", AgentIngest({"enabled": True}, known_nodes=lambda: monitoring.NODES))
+    sender = node_agent.RedisSender(redis.Redis(decode_responses=False))
+    agents = [_primed_agent(node) for node in fleet.nodes[:6]]
+    # Agent d'un nœud hors inventaire: trame ignorée
+    agents.append(_primed_agent("intrus"))
+
+    def push():
+        for agent in agents:
+            sender.send(agent.frame())
+        return (), {}
+
+    push()
+    first = monitoring.collect_metrics()
+    result = benchmark.pedantic(monitoring.collect_metrics, setup=push, rounds=5, iterations=1)
+
+    assert first["nodes_pushed"] == 6 and first["nodes_processed"] == 10
+    assert result["nodes_pushed"] == 6 and result["nodes_processed"] == 10
+    assert fleet.requests == 4 * 6
+    assert monitoring.agent_ingest.stats["unknown_node"] == 6
+    cached = redis_db.get(f"metrics:{fleet.nodes[0]}")
+    assert cached and '"agent_ts"' in cached
+    benchmark.extra_info["exporter_requests"] = fleet.requests
+
+
+def test_agents_udp():
+    """Trames UDP de 20 agents reçues par l'écoute du service de collecte.
+
+    Les noms se résolvent en 127.0.0.1, sauf bench-node020 (autre hôte):
+    sa trame, émise depuis 127.0.0.1, est rejetée comme usurpée.
+    """
+    nodes = [f"bench-node{i:03d}" for i in range(20)]
+    addresses = {node: ("127.0.0.1",) for node in nodes}
+    addresses["bench-node020"] = ("192.0.2.20",)
+    ingest = AgentIngest({"enabled": True, "udp_host": "127.0.0.1", "udp_port": 0},
+                         known_nodes=lambda: addresses, resolve=addresses.get)
+    agents = [_primed_agent(node) for node in nodes]
+    spoofed = _primed_agent("bench-node020")
+
+    async def scenario():
+        await ingest.start_udp()
+        port = ingest._transport.get_extra_info("sockname")[1]
+        sender = node_agent.UdpSender("127.0.0.1", port)
+        sender.send(spoofed.frame())
+        for agent in agents:
+            sender.send(agent.frame())
+        for _ in range(100):
+            if ingest.stats["frames"] == len(nodes) and ingest.stats["spoofed"] == 1:
+                break
+            await asyncio.sleep(0.01)
+        await ingest.close()
+
+    asyncio.run(scenario())
+
+    received = ingest.drain()
+    assert sorted(received) == nodes
+    assert all(ingest.is_live(node) for node in nodes)
+    assert ingest.stats["spoofed"] == 1 and not ingest.is_live("bench-node020")
@@ -0,0 +1,75 @@
+"""Relais pub/sub Redis -> WebSocket: débit (messages/s) et lag de la boucle.
+
+Un publisher envoie une rafale sur cluster:metrics pendant qu'une sonde
+mesure le retard de la boucle asyncio. Le banc s'arrête quand chaque
+message a été diffusé ou jeté par la file bornée.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+import redis.asyncio as aioredis
+
+from conftest import connect_ws_clients
+
+PAYLOAD = json.dumps({
+    "nodes": {f"bench-node{i:03d}": {"cpu_usage": 12.5, "memory_usage": 48.0} for i in range(20)},
+    "cluster_stats": {"online_nodes": 20},
+})
+
+
+async def _lag_probe(stop: asyncio.Event, tick_s: float = 0.005) -> float:
+    """Retard maximal (ms) d'un sleep de tick_s pendant la rafale."""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + tick_s
+        await asyncio.sleep(tick_s)
+        worst = max(worst, (time.perf_counter() - expected) * 1000.0)
+    return worst
+
+
+async def _relay_burst(manager, count: int):
+    await manager.start_redis_subscriber()
+    while manager.pubsub is None or not manager.pubsub.subscribed:
+        await asyncio.sleep(0.001)
+
+    publisher = aioredis.Redis()
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_lag_probe(stop))
+    stats = manager.pubsub_stats
+    target = stats["dispatched"] + stats["dropped"] + count
+
+    started = time.perf_counter()
+    for _ in range(count):
+        await publisher.publish("cluster:metrics", PAYLOAD)
+    while stats["dispatched"] + stats["dropped"] < target:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    max_lag_ms = await probe
+    await manager.stop_redis_subscriber()
+    return elapsed, max_lag_ms
+
+
+@pytest.mark.parametrize("clients", [0, 100])
+def test_pubsub_relay_throughput(benchmark, ws_manager, clients):
+    count = 2000
+    loop = asyncio.new_event_loop()
+    connect_ws_clients(ws_manager, clients, loop)
+    runs = []
+
+    def burst():
+        runs.append(loop.run_until_complete(_relay_burst(ws_manager, count)))
+
+    benchmark.pedantic(burst, rounds=3, iterations=1)
+    loop.close()
+
+    best_elapsed = min(elapsed for elapsed, _ in runs)
+    benchmark.extra_info["messages_per_s"] = round(count / best_elapsed)
+    benchmark.extra_info["max_loop_lag_ms"] = round(max(lag for _, lag in runs), 2)
+    benchmark.extra_info["dropped"] = ws_manager.pubsub_stats["dropped"]
+    assert ws_manager.pubsub_stats["restarts"] == 0
+    assert ws_manager.pubsub_stats["dispatched"] > 0
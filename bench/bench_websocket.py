@@ -0,0 +1,114 @@
+"""Fan-out WebSocket d'un message pub/sub vers N clients socket.io.
+
+Les clients sont enregistrés directement dans le manager socket.io et
+l'envoi engine.io est neutralisé: on mesure décodage, encodage des paquets
+et boucle d'émission, pas le réseau.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from conftest import connect_ws_clients
+
+
+@pytest.mark.parametrize("clients", [10, 100, 500])
+def test_ws_fanout_cluster_metrics(benchmark, ws_manager, clients):
+    loop = asyncio.new_event_loop()
+    connect_ws_clients(ws_manager, clients, loop)
+    nodes = {f"bench-node{i:03d}": {"cpu_usage": 12.5, "memory_usage": 48.0, "temperature": 51.0} for i in range(20)}
+    message = {
+        "type": "message",
+        "channel": "cluster:metrics",
+        "data": json.dumps({"nodes": nodes, "cluster_stats": {"online_nodes": 20}}),
+    }
+
+    benchmark(lambda: loop.run_until_complete(ws_manager._dispatch_message(message)))
+    loop.close()
+
+    # Event global + namespace /monitoring pour chaque client
+    assert ws_manager.sent["packets"] >= 2 * clients
+    benchmark.extra_info["clients"] = clients
+
+
+def _cycle_payload(cycle, nodes=20):
+    """Agrégat réaliste: CPU, mémoire et température bougent, les totaux non."""
+    return json.dumps({
+        "timestamp": f"2024-01-01T00:00:{cycle % 60:02d}",
+        "cluster_stats": {"total_nodes": nodes, "online_nodes": nodes, "avg_cpu": 20.0 + cycle % 7},
+        "nodes": {
+            f"bench-node{i:03d}": {
+                "cpu_usage": round(10 + (cycle * 7 + i) % 80 + 0.123, 3),
+                "memory_usage": round(40 + (cycle + i) % 5 + 0.5, 3),
+                "memory_total": 970000000.0,
+                "memory_available": 580000000.0 - (cycle % 5) * 1e6,
+                "disk_usage": 58.2,
+                "disk_total": 31000000000.0,
+                "disk_available": 13000000000.0,
+                "temperature": 50.0 + (cycle // 3) % 4,
+            }
+            for i in range(nodes)
+        },
+    })
+
+
+@pytest.mark.parametrize("mode", ["full", "delta"])
+def test_ws_cluster_metrics_push(benchmark, ws_manager, mode):
+    """300 dashboards: payload complet historique vs push différentiel.
+
+    En mode delta, un tiers des clients ne suit qu'un nœud (page détail).
+    """
+    clients = 300
+    loop = asyncio.new_event_loop()
+    sids = connect_ws_clients(ws_manager, clients, loop)
+    push = ws_manager.metrics_push
+    if mode == "delta":
+        for i, sid in enumerate(sids):
+            nodes = [f"bench-node{i % 20:03d}"] if i % 3 == 0 else None
+            loop.run_until_complete(push.subscribe(sid, nodes=nodes))
+    cycle = {"n": 0}
+
+    def one_cycle():
+        cycle["n"] += 1
+        message = {"type": "message", "channel": "cluster:metrics", "data": _cycle_payload(cycle["n"])}
+        loop.run_until_complete(ws_manager._dispatch_message(message))
+        # Les clients acquittent aussitôt
+        for sid in push.subscribers:
+            push.ack(sid, push.seq)
+
+    one_cycle()
+    ws_manager.sent.update(packets=0, bytes=0)
+    benchmark(one_cycle)
+    loop.close()
+
+    cycles = max(1, cycle["n"] - 1)
+    benchmark.extra_info["bytes_per_cycle"] = ws_manager.sent["bytes"] // cycles
+    benchmark.extra_info["packets_per_cycle"] = ws_manager.sent["packets"] // cycles
+    assert ws_manager.sent["packets"] > 0
+
+
+def test_ws_fanout_slow_clients(benchmark, ws_manager):
+    """200 clients dont la moitié ne lit plus: ils sont sautés, pas empilés."""
+    from types import SimpleNamespace
+
+    clients = 200
+    loop = asyncio.new_event_loop()
+    connect_ws_clients(ws_manager, clients, loop)
+    backlog = ws_manager.broadcaster.max_backlog
+    sockets = {}
+    for i in range(0, clients, 2):
+        queue = asyncio.Queue()
+        for _ in range(backlog):
+            queue.put_nowait(None)
+        sockets[f"eio-{i}"] = SimpleNamespace(queue=queue)
+    ws_manager.sio.eio.sockets = sockets
+    message = {"type": "message", "channel": "cluster:health", "data": _cycle_payload(1)}
+
+    benchmark(lambda: loop.run_until_complete(ws_manager._dispatch_message(message)))
+    loop.close()
+
+    stats = ws_manager.broadcaster.get_stats()
+    benchmark.extra_info["coalesced_per_frame"] = stats["coalesced"] // max(1, stats["frames"])
+    assert stats["coalesced"] > 0
+    assert ws_manager.sent["packets"] <= stats["sent"]
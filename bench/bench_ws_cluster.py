@@ -0,0 +1,86 @@
+"""Mode multi-workers: deux WebSocketManager dans le même processus.
+
+Chacun a son manager socket.io Redis et ses clients; un seul obtient le
+bail et écoute cluster:*, l'autre reçoit les messages relayés. On mesure
+le temps pour qu'une rafale atteigne les clients des deux workers.
+"""
+
+import asyncio
+import json
+
+import pytest
+import redis.asyncio as aioredis
+
+from conftest import connect_ws_clients, make_ws_manager
+
+PAYLOAD = json.dumps({
+    "nodes": {f"bench-node{i:03d}": {"cpu_usage": 12.5, "memory_usage": 48.0} for i in range(20)},
+    "cluster_stats": {"online_nodes": 20},
+})
+
+
+@pytest.fixture
+def ws_workers(redis_db, monkeypatch):
+    from web.config.metrics_config import WS_CLUSTER_CONFIG
+
+    monkeypatch.setitem(WS_CLUSTER_CONFIG, "enabled", True)
+    monkeypatch.setitem(WS_CLUSTER_CONFIG, "heartbeat_s", 0.05)
+    managers = [make_ws_manager(), make_ws_manager()]
+    for i, manager in enumerate(managers):
+        # Même processus: distinguer les deux "workers"
+        manager.worker_id = manager.lease.owner = f"bench-worker{i}"
+        manager.presence.key = f"{manager.presence.prefix}bench-worker{i}"
+    return managers
+
+
+async def _start(managers):
+    for manager in managers:
+        manager.sio.manager.initialize()
+        await manager.start_redis_subscriber()
+    while sum(m.lease.is_leader for m in managers) != 1 or not any(m.pubsub and m.pubsub.subscribed for m in managers):
+        await asyncio.sleep(0.01)
+    # Laisser les listeners du manager socket.io s'abonner
+    await asyncio.sleep(0.05)
+
+
+async def _stop(managers):
+    for manager in managers:
+        await manager.stop_redis_subscriber()
+        manager.sio.manager.thread.cancel()
+
+
+async def _burst(managers, count: int):
+    publisher = aioredis.Redis()
+    targets = [m.pubsub_stats["dispatched"] + m.pubsub_stats["dropped"] + count for m in managers]
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(count):
+        await publisher.publish("cluster:metrics", PAYLOAD)
+    while any(m.pubsub_stats["dispatched"] + m.pubsub_stats["dropped"] < t for m, t in zip(managers, targets)):
+        await asyncio.sleep(0.001)
+    return loop.time() - started
+
+
+def test_ws_cluster_relay(benchmark, ws_workers):
+    count, clients = 500, 100
+    loop = asyncio.new_event_loop()
+    for manager in ws_workers:
+        # Présence: un sid par client (normalement posé par le handler connect)
+        manager.presence.local.update(connect_ws_clients(manager, clients, loop))
+    loop.run_until_complete(_start(ws_workers))
+    runs = []
+
+    benchmark.pedantic(lambda: runs.append(loop.run_until_complete(_burst(ws_workers, count))),
+                       rounds=3, iterations=1)
+
+    leader = next(m for m in ws_workers if m.lease.is_leader)
+    follower = next(m for m in ws_workers if not m.lease.is_leader)
+    total_clients = loop.run_until_complete(leader.count_connected_clients())
+    loop.run_until_complete(_stop(ws_workers))
+    loop.close()
+
+    benchmark.extra_info["messages_per_s"] = round(count / min(runs))
+    benchmark.extra_info["relayed"] = follower.sio.manager.relay_stats["received"]
+    assert follower.pubsub is None
+    assert follower.sent["packets"] > 0 and leader.sent["packets"] > 0
+    assert total_clients == 2 * clients
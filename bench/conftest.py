@@ -0,0 +1,280 @@
+"""Fixtures communes des benchmarks.
+
+Redis: fakeredis en mémoire par défaut, ou un vrai serveur via
+BENCH_REDIS_URL (ex: redis://localhost:6379/15). La base est vidée avant
+chaque benchmark, utiliser une base dédiée.
+
+Les modules web créent leurs clients Redis à l'import: redis.Redis est
+remplacé ici avant tout import de web.*.
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+# Dépendances du banc (requirements-dev.txt): sans elles le dossier est ignoré
+httpx = pytest.importorskip("httpx")
+redis = pytest.importorskip("redis")
+pytest.importorskip("redis.asyncio")
+pytest.importorskip("pytest_benchmark")
+
+# Celery sans serveur: broker et backend en mémoire (avant l'import de web.celery_app)
+os.environ.setdefault("CELERY_BROKER_URL", "memory://")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "cache+memory://")
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+PAYLOADS_DIR = Path(__file__).resolve().parent / "payloads"
+BENCH_REDIS_URL = os.getenv("BENCH_REDIS_URL")
+
+_RealRedis = redis.Redis
+_RealAsyncRedis = redis.asyncio.Redis
+
+# Classes substituées à redis.Redis / redis.asyncio.Redis: mêmes arguments que
+# les vraies (decode_responses de REDIS_CONFIG respecté), connexion redirigée
+# vers une seule base (celle de BENCH_REDIS_URL, ou la base 0 de fakeredis)
+if BENCH_REDIS_URL:
+    _URL_KWARGS = redis.connection.parse_url(BENCH_REDIS_URL)
+
+    class _BenchRedis(_RealRedis):
+        def __init__(self, *args, **kwargs):
+            super().__init__(**{**kwargs, **_URL_KWARGS})
+
+        @classmethod
+        def from_url(cls, url=None, **kwargs):
+            return cls(**kwargs)
+
+    class _BenchAsyncRedis(_RealAsyncRedis):
+        def __init__(self, *args, **kwargs):
+            super().__init__(**{**kwargs, **_URL_KWARGS})
+
+        @classmethod
+        def from_url(cls, url=None, **kwargs):
+            return cls(**kwargs)
+else:
+    fakeredis = pytest.importorskip("fakeredis")
+
+    _fake_server = fakeredis.FakeServer()
+
+    class _BenchRedis(fakeredis.FakeRedis):
+        def __init__(self, *args, **kwargs):
+            kwargs.pop("db", None)
+            super().__init__(server=_fake_server, **kwargs)
+
+        # fakeredis lit ses arguments dans la signature de redis.Redis.__init__ (cette
+        # classe une fois substituée): sans celle de la vraie, decode_responses serait perdu
+        __init__.__signature__ = inspect.signature(_RealRedis.__init__)
+
+        @classmethod
+        def from_url(cls, url=None, **kwargs):
+            return cls(**kwargs)
+
+    class _BenchAsyncRedis(fakeredis.FakeAsyncRedis):
+        def __init__(self, *args, **kwargs):
+            kwargs.pop("db", None)
+            super().__init__(server=_fake_server, **kwargs)
+
+        @classmethod
+        def from_url(cls, url=None, **kwargs):
+            return cls(**kwargs)
+
+
+redis.Redis = _BenchRedis
+redis.asyncio.Redis = _BenchAsyncRedis
+
+
+def load_payload(name: str = "node_exporter_rpi.prom") -> str:
+    return (PAYLOADS_DIR / name).read_text()
+
+
+@pytest.fixture
+def redis_db():
+    """Client Redis sur une base vide."""
+    client = _BenchRedis(decode_responses=True)
+    client.flushdb()
+    yield client
+    client.flushdb()
+
+
+class FakeNodeExporterFleet:
+    """Flotte de node_exporters en mémoire servant un payload enregistré.
+
+    Branchée sur httpx via MockTransport: pas de socket, mais le vrai
+    client httpx (requêtes, réponses, décodage) est exercé. Les compteurs
+    CPU avancent à chaque scrape pour que le calcul d'utilisation tourne.
+
+    connect_s: coût de la première requête vers un nœud pour un client
+    donné (connexion TCP), payé de nouveau par chaque nouveau client.
+    hanging: nombre de nœuds (les derniers) qui ne répondent jamais.
+    """
+
+    # Secondes ajoutées par scrape et par mode (idle domine, comme sur un RPi peu chargé)
+    CPU_STEP = {"user": 0.9, "system": 0.3, "idle": 3.6, "iowait": 0.05, "softirq": 0.02}
+    _MODE_RE = re.compile(r'mode="([a-z]+)"')
+
+    def __init__(self, size: int, payload: str = None, latency_s: float = 0.0, connect_s: float = 0.0,
+                 hanging: int = 0) -> None:
+        self.nodes: List[str] = [f"bench-node{i:03d}" for i in range(size)]
+        self._known = set(self.nodes)
+        self._hanging = set(self.nodes[size - hanging:]) if hanging else set()
+        self.latency_s = latency_s
+        self.connect_s = connect_s
+        self.connections = 0
+        self._lines = (payload or load_payload()).splitlines()
+        self._cpu_lines = []
+        for idx, line in enumerate(self._lines):
+            if line.startswith("node_cpu_seconds_total"):
+                name, value = line.rsplit(" ", 1)
+                mode = self._MODE_RE.search(name).group(1)
+                self._cpu_lines.append((idx, name, float(value), self.CPU_STEP.get(mode, 0.0)))
+        self._ticks: Dict[str, int] = {}
+        self.requests = 0
+
+    def render(self, node: str) -> str:
+        tick = self._ticks[node] = self._ticks.get(node, 0) + 1
+        lines = list(self._lines)
+        for idx, name, value, step in self._cpu_lines:
+            lines[idx] = f"{name} {value + tick * step:.2f}"
+        return "\n".join(lines) + "\n"
+
+    async def handle(self, request: httpx.Request, connected: set = None) -> httpx.Response:
+        self.requests += 1
+        host = request.url.host
+        if host in self._hanging:
+            await asyncio.sleep(3600)
+        if connected is not None and host not in connected:
+            connected.add(host)
+            self.connections += 1
+            if self.connect_s:
+                await asyncio.sleep(self.connect_s)
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if host not in self._known:
+            raise httpx.ConnectError(f"Nœud inconnu: {host}", request=request)
+        if request.url.path == "/metrics":
+            return httpx.Response(200, text=self.render(host),
+                                  headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+        return httpx.Response(200, text="<html><head><title>Node Exporter</title></head></html>")
+
+    def transport(self) -> httpx.MockTransport:
+        """Transport d'un client: ses connexions ouvertes ne servent qu'à lui."""
+        connected = set()
+        return httpx.MockTransport(lambda request: self.handle(request, connected))
+
+
+@pytest.fixture
+def node_exporter_fleet(monkeypatch):
+    """Fabrique: make(size, latency_s=0.0, ...) installe une flotte pour le collecteur."""
+    from web.tasks import monitoring
+
+    def make(size: int, latency_s: float = 0.0, adaptive: bool = False, **options) -> FakeNodeExporterFleet:
+        fleet = FakeNodeExporterFleet(size, latency_s=latency_s, **options)
+        real_client = httpx.AsyncClient
+
+        class _FleetClient(real_client):
+            def __init__(self, *args, **kwargs):
+                kwargs["transport"] = fleet.transport()
+                super().__init__(*args, **kwargs)
+
+        monkeypatch.setattr(httpx, "AsyncClient", _FleetClient)
+        monkeypatch.setattr(monitoring, "NODES", fleet.nodes)
+        monitoring.cpu_rates.clear()
+        # adaptive=False: cadence fixe et historique complet, chaque cycle scrape et écrit tout
+        monkeypatch.setattr(monitoring.cadence, "enabled", adaptive)
+        monkeypatch.setattr(monitoring.dead_band, "enabled", adaptive)
+        # Pas de lecture du store des jobs (base SQLite par défaut)
+        monkeypatch.setitem(monitoring.ADAPTIVE_SAMPLING_CONFIG, "busy_from_jobs", False)
+        monitoring.cadence.clear()
+        monitoring.dead_band.clear()
+        monitoring.cluster_snapshot.clear()
+        monitoring.alert_engine.clear()
+        # Client persistant du collecteur: recréé sur la flotte
+        monitoring.collector_loop.reset()
+        return fleet
+
+    yield make
+    monitoring.collector_loop.reset()
+
+
+def make_ws_manager():
+    """WebSocketManager dont l'envoi engine.io est neutralisé (compte les paquets)."""
+    from web.core.websocket_manager import WebSocketManager
+
+    manager = WebSocketManager()
+    manager._setup_namespaces()
+    sent = {"packets": 0, "bytes": 0}
+
+    async def _send(eio_sid, packet):
+        sent["packets"] += 1
+        data = getattr(packet, "data", packet)
+        sent["bytes"] += len(data) if isinstance(data, (str, bytes)) else 0
+
+    # send: paquet encodé par client, send_packet: paquet pré-encodé (socket.io >= 5.9)
+    manager.sio.eio.send = _send
+    manager.sio.eio.send_packet = _send
+    manager.sent = sent
+    return manager
+
+
+@pytest.fixture
+def ws_manager(redis_db):
+    return make_ws_manager()
+
+
+def connect_ws_clients(manager, count: int, loop) -> List[str]:
+    """Enregistre `count` clients sur / et /monitoring sans transport réel.
+
+    Retourne les sid du namespace /monitoring.
+    """
+    monitoring_sids = []
+    for i in range(count):
+        eio_sid = f"eio-{i}"
+        for namespace in ("/", "/monitoring"):
+            sid = manager.sio.manager.connect(eio_sid, namespace)
+            if asyncio.iscoroutine(sid):
+                sid = loop.run_until_complete(sid)
+            loop.run_until_complete(manager.metrics_push.join_full(sid, namespace))
+            if namespace == "/monitoring":
+                monitoring_sids.append(sid)
+    return monitoring_sids
+
+
+def seed_history(client, nodes: List[str], points: int, step_s: int = 60) -> None:
+    """Remplit history:{node} avec des points espacés de step_s (format MetricsHistoryManager)."""
+    now = datetime.utcnow()
+    for n, node in enumerate(nodes):
+        pipe = client.pipeline(transaction=False)
+        for i in range(points):
+            ts = now - timedelta(seconds=i * step_s)
+            pipe.rpush(f"history:{node}", json.dumps({
+                "timestamp": ts.isoformat(),
+                "metrics": {
+                    "cpu_usage": (i * 7 + n) % 100,
+                    "memory_usage": 40 + (i + n) % 30,
+                    "disk_usage": 55.0,
+                    "temperature": 45 + (i % 10),
+                },
+            }))
+        pipe.execute()
+
+
+def seed_node_metrics(client, nodes: List[str]) -> None:
+    """Pose metrics:{node} comme le ferait un cycle de collecte."""
+    for n, node in enumerate(nodes):
+        client.set(f"metrics:{node}", json.dumps({
+            "cpu_usage": 20 + n % 50,
+            "memory_usage": 45.0,
+            "disk_usage": 55.0,
+            "temperature": 50.0,
+            "last_update": datetime.now().isoformat(),
+        }))
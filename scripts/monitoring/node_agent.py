@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Agent de métriques d'un nœud worker, poussées au collecteur (alternative
+au scrape de node_exporter).
+
+Lit /proc et /sys directement, calcule seulement les champs utilisés par
+DispyCluster et les pousse toutes les --interval secondes en trames
+msgpack compactes (~150 octets), par UDP ou dans un Stream Redis:
+
+    python3 node_agent.py --collector 192.168.1.10
+    python3 node_agent.py --redis redis://192.168.1.10:6379/1
+
+Côté collecteur: AGENT_INGEST=1 (web/core/agent_ingest.py). Trame v1:
+[1, nœud, timestamp ms, v0, v1, ...] dans l'ordre de FIELDS, None pour
+un champ absent. L'ordre est partagé avec AGENT_FIELDS du collecteur:
+le modifier impose une nouvelle version de trame.
+
+Dépendances: msgpack, et redis pour --redis.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FRAME_VERSION = 1
+FIELDS = (
+    "cpu_usage", "cpu_iowait", "cpu_steal", "cpu_cores", "cpu_core_max", "cpu_cores_saturated",
+    "memory_usage", "memory_total", "memory_available",
+    "disk_usage", "disk_total", "disk_available", "temperature",
+    "load1", "load5", "load15", "load_per_core",
+    "net_rx_bps", "net_tx_bps", "net_usage", "disk_read_bps", "disk_write_bps",
+    "psi_cpu", "psi_memory", "psi_io",
+)
+
+# Mêmes exclusions que NODE_METRICS_CONFIG côté collecteur
+NET_EXCLUDE = ("lo", "veth", "docker", "br-", "virbr", "cni", "flannel", "tun", "wg")
+DISK_EXCLUDE = ("loop", "ram", "zram", "dm-", "md")
+
+# Colonnes de /proc/stat (cpuN): user nice system idle iowait irq softirq steal
+_IDLE, _IOWAIT, _STEAL = 3, 4, 7
+
+
+class NodeAgent:
+    """Lecture de /proc et calcul des taux entre deux échantillons."""
+
+    def __init__(self, node: str, proc: str = "/proc", sys_root: str = "/sys", root_fs: str = "/",
+                 net_capacity_mbps: float = 100.0, saturation_pct: float = 90.0) -> None:
+        self.node = node
+        self.proc = proc
+        self.sys_root = sys_root
+        self.root_fs = root_fs
+        self.net_capacity_bps = net_capacity_mbps * 1_000_000 / 8
+        self.saturation_pct = saturation_pct
+        self._prev_cpu: Optional[List[List[int]]] = None
+        self._prev_counters: Optional[Dict[str, float]] = None
+        self._prev_at = 0.0
+        # Disque entier (pas une partition) par nom de périphérique
+        self._whole_disk: Dict[str, bool] = {}
+
+    def sample(self) -> Dict[str, float]:
+        """Métriques du nœud; taux absents au premier appel (pas de delta)."""
+        metrics: Dict[str, float] = {}
+        metrics.update(self._cpu())
+        metrics.update(self._memory())
+        metrics.update(self._disk_usage())
+        metrics.update(self._load())
+        temperature = self._temperature()
+        if temperature is not None:
+            metrics["temperature"] = temperature
+        if "load1" in metrics and metrics.get("cpu_cores"):
+            metrics["load_per_core"] = metrics["load1"] / metrics["cpu_cores"]
+
+        counters, net_speed = self._net_counters()
+        counters.update(self._disk_counters())
+        counters.update(self._psi_counters())
+        rates = self._rates(counters)
+        if rates:
+            metrics.update(rates)
+            capacity = net_speed or self.net_capacity_bps
+            busiest = max(rates.get("net_rx_bps", 0.0), rates.get("net_tx_bps", 0.0))
+            metrics["net_usage"] = min(100.0, busiest / capacity * 100) if capacity > 0 else 0.0
+        return metrics
+
+    def frame(self) -> bytes:
+        """Trame msgpack de l'échantillon courant (flottants en simple précision)."""
+        metrics = self.sample()
+        frame = [FRAME_VERSION, self.node, int(time.time() * 1000)]
+        frame.extend(metrics.get(field) for field in FIELDS)
+        return msgpack.packb(frame, use_single_float=True)
+
+    def _read(self, path: str) -> str:
+        with open(path) as f:
+            return f.read()
+
+    def _cpu(self) -> Dict[str, float]:
+        cores = []
+        for line in self._read(f"{self.proc}/stat").splitlines():
+            if not line.startswith("cpu"):
+                break
+            name, *values = line.split()
+            if name != "cpu":
+                cores.append([int(value) for value in values[:8]])
+        prev, self._prev_cpu = self._prev_cpu, cores
+        metrics = {"cpu_cores": len(cores)}
+        if prev is None or len(prev) != len(cores):
+            return metrics
+        total = busy = iowait = steal = 0
+        per_core = []
+        for counters, old in zip(cores, prev):
+            # Compteur qui recule (remise à zéro): repart de 0
+            delta = [value if value < before else value - before for value, before in zip(counters, old)]
+            core_total = sum(delta)
+            core_busy = core_total - delta[_IDLE] - delta[_IOWAIT]
+            total += core_total
+            busy += core_busy
+            iowait += delta[_IOWAIT]
+            steal += delta[_STEAL]
+            per_core.append(core_busy / core_total * 100 if core_total > 0 else 0.0)
+        if total <= 0:
+            return metrics
+        metrics.update({
+            "cpu_usage": busy / total * 100,
+            "cpu_iowait": iowait / total * 100,
+            "cpu_steal": steal / total * 100,
+            "cpu_core_max": max(per_core),
+            "cpu_cores_saturated": sum(1 for pct in per_core if pct >= self.saturation_pct),
+        })
+        return metrics
+
+    def _memory(self) -> Dict[str, float]:
+        values = {}
+        for line in self._read(f"{self.proc}/meminfo").splitlines():
+            key, _, rest = line.partition(":")
+            if key in ("MemTotal", "MemAvailable"):
+                values[key] = float(rest.split()[0]) * 1024
+        if "MemTotal" not in values or "MemAvailable" not in values or values["MemTotal"] <= 0:
+            return {}
+        total, available = values["MemTotal"], values["MemAvailable"]
+        return {"memory_total": total, "memory_available": available,
+                "memory_usage": (total - available) / total * 100}
+
+    def _disk_usage(self) -> Dict[str, float]:
+        stat = os.statvfs(self.root_fs)
+        total = stat.f_blocks * stat.f_frsize
+        available = stat.f_bavail * stat.f_frsize
+        if total <= 0:
+            return {}
+        return {"disk_total": float(total), "disk_available": float(available),
+                "disk_usage": (total - available) / total * 100}
+
+    def _load(self) -> Dict[str, float]:
+        load1, load5, load15 = self._read(f"{self.proc}/loadavg").split()[:3]
+        return {"load1": float(load1), "load5": float(load5), "load15": float(load15)}
+
+    def _temperature(self) -> Optional[float]:
+        try:
+            value = float(self._read(f"{self.sys_root}/class/thermal/thermal_zone0/temp")) / 1000
+        except (OSError, ValueError):
+            return None
+        return value if value > 0 else None
+
+    def _net_counters(self) -> Tuple[Dict[str, float], float]:
+        """Octets reçus/émis cumulés et débit nominal (octets/s) des interfaces retenues."""
+        rx = tx = speed = 0.0
+        for line in self._read(f"{self.proc}/net/dev").splitlines()[2:]:
+            device, _, values = line.partition(":")
+            device = device.strip()
+            if device.startswith(NET_EXCLUDE):
+                continue
+            fields = values.split()
+            rx += float(fields[0])
+            tx += float(fields[8])
+            try:
+                # Mb/s, -1 si inconnu (wifi, lien tombé)
+                speed += max(0.0, float(self._read(f"{self.sys_root}/class/net/{device}/speed")))
+            except (OSError, ValueError):
+                pass
+        return {"net_rx_bps": rx, "net_tx_bps": tx}, speed * 1_000_000 / 8
+
+    def _disk_counters(self) -> Dict[str, float]:
+        read = written = 0.0
+        for line in self._read(f"{self.proc}/diskstats").splitlines():
+            fields = line.split()
+            if len(fields) < 10 or fields[2].startswith(DISK_EXCLUDE):
+                continue
+            device = fields[2]
+            whole = self._whole_disk.get(device)
+            if whole is None:
+                whole = self._whole_disk[device] = os.path.exists(f"{self.sys_root}/block/{device}")
+            if whole:
+                # Secteurs de 512 octets
+                read += float(fields[5]) * 512
+                written += float(fields[9]) * 512
+        return {"disk_read_bps": read, "disk_write_bps": written}
+
+    def _psi_counters(self) -> Dict[str, float]:
+        counters = {}
+        for resource in ("cpu", "memory", "io"):
+            try:
+                text = self._read(f"{self.proc}/pressure/{resource}")
+            except OSError:
+                # Noyau sans PSI
+                continue
+            for line in text.splitlines():
+                if line.startswith("some "):
+                    total_us = float(line.rpartition("total=")[2])
+                    # Secondes d'attente par seconde, en % du temps
+                    counters[f"psi_{resource}"] = total_us / 1_000_000 * 100
+        return counters
+
+    def _rates(self, counters: Dict[str, float]) -> Optional[Dict[str, float]]:
+        now = time.monotonic()
+        prev, prev_at = self._prev_counters, self._prev_at
+        self._prev_counters, self._prev_at = counters, now
+        if prev is None or now <= prev_at:
+            return None
+        elapsed = now - prev_at
+        return {name: (value if value < prev[name] else value - prev[name]) / elapsed
+                for name, value in counters.items() if name in prev}
+
+
+class UdpSender:
+    """Une trame par datagramme, sans accusé de réception."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, frame: bytes) -> None:
+        self.sock.sendto(frame, self.address)
+
+
+class RedisSender:
+    """XADD de la trame (champ f) dans le Stream, tronqué à maxlen (approx.)."""
+
+    def __init__(self, client, stream: str = "agent:metrics", maxlen: int = 10000) -> None:
+        self.client = client
+        self.stream = stream
+        self.maxlen = maxlen
+
+    def send(self, frame: bytes) -> None:
+        self.client.xadd(self.stream, {"f": frame}, maxlen=self.maxlen, approximate=True)
+
+
+def run(agent: NodeAgent, sender, interval: float) -> None:
+    """Pousse une trame toutes les interval secondes (sans dérive)."""
+    # Premier échantillon: amorce des compteurs, la première trame a déjà ses taux
+    agent.sample()
+    next_at = time.monotonic()
+    while True:
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.monotonic()))
+        try:
+            sender.send(agent.frame())
+        except Exception as e:
+            # Collecteur ou Redis indisponible: trame perdue, on continue
+            print(f"Trame non envoyée: {e}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Agent de métriques DispyCluster (push)")
+    parser.add_argument("--node", default=socket.gethostname(),
+                        help="nom du nœud, tel que dans nodes.yaml (défaut: hostname)")
+    parser.add_argument("--interval", type=float, default=5.0, help="secondes entre deux trames")
+    parser.add_argument("--collector", help="hôte du service de collecte (UDP)")
+    parser.add_argument("--port", type=int, default=9180, help="port UDP du collecteur")
+    parser.add_argument("--redis", help="URL Redis (Stream) au lieu d'UDP")
+    parser.add_argument("--stream", default="agent:metrics")
+    parser.add_argument("--net-capacity-mbps", type=float, default=100.0,
+                        help="débit d'interface si /sys/class/net/*/speed est absent")
+    args = parser.parse_args()
+
+    if msgpack is None:
+        sys.exit("msgpack requis: pip3 install msgpack")
+    if args.redis:
+        import redis
+        sender = RedisSender(redis.Redis.from_url(args.redis), args.stream)
+    elif args.collector:
+        sender = UdpSender(args.collector, args.port)
+    else:
+        sys.exit("--collector ou --redis requis")
+
+    agent = NodeAgent(args.node, net_capacity_mbps=args.net_capacity_mbps)
+    print(f"Agent {args.node}: trame toutes les {args.interval} s vers {args.redis or args.collector}")
+    try:
+        run(agent, sender, args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -68,17 +68,23 @@ fi
 cleanup() {
     echo -e "\n${YELLOW}Arrêt des processus...${NC}"
     
-    # Arrêter Celery worker
-    if [ ! -z "$CELERY_WORKER_PID" ]; then
-        echo "Arrêt du worker Celery (PID: $CELERY_WORKER_PID)..."
-        kill $CELERY_WORKER_PID 2>/dev/null || true
-    fi
+    # Arrêter les workers Celery
+    for pid in $CELERY_WORKER_PIDS; do
+        echo "Arrêt du worker Celery (PID: $pid)..."
+        kill $pid 2>/dev/null || true
+    done
     
     # Arrêter Celery beat
     if [ ! -z "$CELERY_BEAT_PID" ]; then
         echo "Arrêt de Celery beat (PID: $CELERY_BEAT_PID)..."
         kill $CELERY_BEAT_PID 2>/dev/null || true
     fi
+
+    # Arrêter le service de collecte
+    if [ ! -z "$COLLECTOR_PID" ]; then
+        echo "Arrêt du collecteur (PID: $COLLECTOR_PID)..."
+        kill $COLLECTOR_PID 2>/dev/null || true
+    fi
     
     # Arrêter les services legacy si démarrés
     if [ "$START_LEGACY_SERVICES" = "true" ]; then
@@ -96,12 +102,17 @@ cleanup() {
 # Intercepter Ctrl+C et autres signaux d'arrêt
 trap cleanup SIGINT SIGTERM
 
-# Démarrer Celery worker en arrière-plan
-echo -e "${GREEN}Démarrage du worker Celery en arrière-plan...${NC}"
+# Démarrer les workers Celery en arrière-plan, un par profil
+# (io: scraping, cpu: file par défaut, monitoring: collect_metrics seul)
+CELERY_PROFILES=${CELERY_PROFILES:-"io cpu monitoring"}
 export PYTHONUNBUFFERED=1
-celery -A web.celery_app.celery_app worker --loglevel=info --concurrency=1 > logs/celery_worker.log 2>&1 &
-CELERY_WORKER_PID=$!
-echo "Worker Celery démarré (PID: $CELERY_WORKER_PID)"
+CELERY_WORKER_PIDS=""
+for profile in $CELERY_PROFILES; do
+    echo -e "${GREEN}Démarrage du worker Celery ($profile) en arrière-plan...${NC}"
+    python -m web.celery_worker $profile --loglevel=info > logs/celery_worker_$profile.log 2>&1 &
+    CELERY_WORKER_PIDS="$CELERY_WORKER_PIDS $!"
+    echo "Worker Celery $profile démarré (PID: $!)"
+done
 
 # Attendre un peu pour le démarrage
 sleep 2
@@ -112,6 +123,14 @@ celery -A web.celery_app.celery_app beat --loglevel=info > logs/celery_beat.log
 CELERY_BEAT_PID=$!
 echo "Celery beat démarré (PID: $CELERY_BEAT_PID)"
 
+# Collecte node_exporter hors Celery (COLLECTOR_MODE=daemon dans web/config.env)
+if grep -q "^COLLECTOR_MODE=daemon" web/config.env 2>/dev/null || [ "$COLLECTOR_MODE" = "daemon" ]; then
+    echo -e "${GREEN}Démarrage du service de collecte en arrière-plan...${NC}"
+    python -m web.collector > logs/collector.log 2>&1 &
+    COLLECTOR_PID=$!
+    echo "Collecteur démarré (PID: $COLLECTOR_PID)"
+fi
+
 # Attendre un peu
 sleep 3
 
@@ -173,7 +192,7 @@ echo -e "${GREEN}Démarrage de l'API/UI (Uvicorn) sur http://0.0.0.0:8085...${NC
 echo "📊 Graphiques disponibles sur: http://localhost:8085/monitoring"
 echo "🔧 API Graphiques: http://localhost:8085/api/graphs/"
 export WEB_SIMULATE_NODES=0
-uvicorn web.app:create_socketio_app --factory --host 0.0.0.0 --port 8085
+uvicorn web.app:create_socketio_app --factory --host 0.0.0.0 --port 8085 --workers "${WS_WORKERS:-1}"
 
 # Le cleanup se fera automatiquement via le trap quand uvicorn s'arrêtera
 
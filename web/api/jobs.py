@@ -1,19 +1,36 @@
 """API endpoints pour la gestion des jobs."""
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Dict, Any, Optional, Sequence, Tuple
+from pydantic import BaseModel, ValidationError
 from datetime import datetime
 import json
-import sqlite3
 import uuid
 import httpx
 import asyncio
+import time
+
+from web.config.logging_config import get_logger
+from web.config.metrics_config import JOB_BULK_CONFIG
+from web.core.job_runner import job_runner
+from web.core.job_store import JOB_COLUMNS, TERMINAL_STATUSES, job_store, job_updates, parse_fields
+
+logger = get_logger(__name__)
+
+# Celery (optionnel): les jobs scraping soumis en lot partent dans sa file
+try:
+    from web.celery_app import celery_app
+    from web.tasks.scraping import run_scrape as celery_run_scrape
+    _celery_available = True
+except Exception:
+    celery_app = None
+    celery_run_scrape = None
+    _celery_available = False
 
 router = APIRouter(prefix="/api/jobs", tags=["jobs"])
 
 # Configuration
-DATABASE_PATH = "web/data/cluster.db"
 SERVICES = {
     "api_gateway": "http://localhost:8084",
     "cluster_controller": "http://localhost:8081"
@@ -47,188 +64,224 @@ class JobResponse(BaseModel):
     completed_at: Optional[datetime]
     result: Optional[Dict[str, Any]]
 
+async def stream_jobs_ndjson(status: Optional[str] = None, job_type: Optional[str] = None,
+                             columns: Sequence[str] = JOB_COLUMNS) -> AsyncIterator[bytes]:
+    """Export NDJSON: une ligne par job, parcours par pages (mémoire constante)."""
+    async for jobs in job_store.iter_jobs(status=status, job_type=job_type, columns=columns):
+        yield "".join(json.dumps(job_updates.overlay(job), default=str) + "\n" for job in jobs).encode()
+
+def projection(fields: Optional[str]) -> Sequence[str]:
+    """Paramètre `fields` -> colonnes (400 si un champ est inconnu)."""
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/", response_model=List[JobResponse])
 async def get_jobs(
+    response: Response,
     status: Optional[str] = None,
     job_type: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
-    """Liste des jobs avec filtres."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Construire la requête
-    query = "SELECT * FROM jobs WHERE 1=1"
-    params = []
-    
-    if status:
-        query += " AND status = ?"
-        params.append(status)
-    
-    if job_type:
-        query += " AND job_type = ?"
-        params.append(job_type)
-    
-    query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
-    
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    
-    jobs = []
-    for row in rows:
-        jobs.append(JobResponse(
-            id=row[0],
-            name=row[1],
-            job_type=row[2],
-            parameters=json.loads(row[3]),
-            status=row[4],
-            node=row[5],
-            progress=row[6],
-            priority=row[7],
-            created_at=datetime.fromisoformat(row[8]),
-            started_at=datetime.fromisoformat(row[9]) if row[9] else None,
-            completed_at=datetime.fromisoformat(row[10]) if row[10] else None,
-            result=json.loads(row[11]) if row[11] else None
-        ))
-    
-    conn.close()
-    return jobs
+    """Liste des jobs avec filtres.
+
+    Pagination par clé: passer l'en-tête X-Next-Cursor de la réponse dans
+    `cursor`. `offset` reste accepté mais relit toutes les lignes sautées.
+    """
+    if offset:
+        jobs = await job_store.list_jobs(status=status, job_type=job_type, limit=limit, offset=offset)
+    else:
+        try:
+            jobs, next_cursor = await job_store.list_page(status=status, job_type=job_type, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    # Écritures pas encore flushées incluses (read-your-writes)
+    return [JobResponse(**job_updates.overlay(job)) for job in jobs]
+
+@router.get("/export")
+async def export_jobs(status: Optional[str] = None, job_type: Optional[str] = None, fields: Optional[str] = None):
+    """Tous les jobs en NDJSON (application/x-ndjson), sans tout charger en mémoire."""
+    columns = projection(fields)
+    return StreamingResponse(stream_jobs_ndjson(status, job_type, columns), media_type="application/x-ndjson")
+
+@router.get("/runner")
+async def get_runner_stats():
+    """Jobs locaux en file / en cours par type, limites du pool."""
+    return job_runner.get_stats()
 
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job(job_id: str):
     """Détails d'un job spécifique."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-    row = cursor.fetchone()
-    
-    if not row:
+    job = job_updates.overlay(await job_store.get_job(job_id))
+    if not job:
         raise HTTPException(status_code=404, detail="Job non trouvé")
-    
-    conn.close()
-    
-    return JobResponse(
-        id=row[0],
-        name=row[1],
-        job_type=row[2],
-        parameters=json.loads(row[3]),
-        status=row[4],
-        node=row[5],
-        progress=row[6],
-        priority=row[7],
-        created_at=datetime.fromisoformat(row[8]),
-        started_at=datetime.fromisoformat(row[9]) if row[9] else None,
-        completed_at=datetime.fromisoformat(row[10]) if row[10] else None,
-        result=json.loads(row[11]) if row[11] else None
-    )
+    return JobResponse(**job)
 
 @router.post("/", response_model=Dict[str, str])
-async def create_job(job: JobRequest, background_tasks: BackgroundTasks):
+async def create_job(job: JobRequest):
     """Créer un nouveau job."""
     job_id = f"job_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO jobs (id, name, job_type, parameters, status, priority, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        job_id,
-        job.name,
-        job.job_type,
-        json.dumps(job.parameters),
-        "pending",
-        job.priority,
-        datetime.now().isoformat()
-    ))
+    await job_store.insert_job(job_id, job.name, job.job_type, job.parameters,
+                               status="pending", priority=job.priority)
     
-    conn.commit()
-    conn.close()
-    
-    # Déclencher le job en arrière-plan
-    background_tasks.add_task(process_job, job_id, job)
+    # Exécution hors requête, limitée par type de job
+    job_runner.submit(job_id, job.job_type, process_job, job_id, job)
     
     return {"id": job_id, "status": "created"}
 
+def parse_bulk_body(content_type: str, body: bytes) -> List[Tuple[int, Any]]:
+    """Corps NDJSON ou tableau JSON -> [(index, objet ou exception)]."""
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = []
+        for index, line in enumerate(line for line in body.splitlines() if line.strip()):
+            try:
+                items.append((index, json.loads(line)))
+            except ValueError as e:
+                items.append((index, e))
+        return items
+    try:
+        data = json.loads(body or b"[]")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"JSON invalide: {e}")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Tableau JSON ou NDJSON attendu")
+    return list(enumerate(data))
+
+def enqueue_scrapes(jobs: List[Dict[str, Any]]) -> None:
+    """Publie un paquet de tâches scraping sur une seule connexion producteur (bloquant)."""
+    with celery_app.producer_or_acquire() as producer:
+        for job in jobs:
+            celery_run_scrape.apply_async(args=[job["parameters"]], task_id=job["task_id"], producer=producer)
+
+async def dispatch_bulk(accepted: List[Dict[str, Any]], rejected: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Envoie les jobs Celery par paquets et streame les ids acceptés au fil de l'eau."""
+    chunk_size = max(1, JOB_BULK_CONFIG["chunk_size"])
+    for start in range(0, len(accepted), chunk_size):
+        chunk = accepted[start:start + chunk_size]
+        queued = [job for job in chunk if job["task_id"]]
+        if queued:
+            try:
+                await asyncio.to_thread(enqueue_scrapes, queued)
+            except Exception as e:
+                logger.error(f"Envoi Celery en échec pour {len(queued)} jobs: {e}")
+                for job in queued:
+                    job["status"] = "failed"
+                    job_updates.update_status(job["id"], "failed", 100, result={"error": f"Celery: {e}"})
+        yield "".join(
+            json.dumps({"id": job["id"], "status": job["status"], "task_id": job["task_id"]}) + "\n"
+            for job in chunk
+        ).encode()
+    if rejected:
+        yield "".join(json.dumps(item) + "\n" for item in rejected).encode()
+    yield (json.dumps({"accepted": len(accepted), "rejected": len(rejected)}) + "\n").encode()
+
+@router.post("/bulk")
+async def create_jobs_bulk(request: Request):
+    """Soumission en lot: NDJSON (application/x-ndjson) ou tableau JSON de jobs.
+
+    Tout le lot est inséré en une transaction; les jobs scraping partent à
+    Celery par paquets. Réponse NDJSON: une ligne par job accepté
+    ({"id", "status", "task_id"}), une par entrée rejetée ({"index", "error"}),
+    puis le bilan ({"accepted", "rejected"}).
+    """
+    items = parse_bulk_body(request.headers.get("content-type", ""), await request.body())
+    if len(items) > JOB_BULK_CONFIG["max_jobs"]:
+        raise HTTPException(status_code=413, detail=f"Lot limité à {JOB_BULK_CONFIG['max_jobs']} jobs")
+    
+    accepted: List[Dict[str, Any]] = []
+    rejected: List[Dict[str, Any]] = []
+    local: List[Tuple[str, JobRequest]] = []
+    created_at = datetime.now().isoformat()
+    for index, item in items:
+        if isinstance(item, Exception):
+            rejected.append({"index": index, "error": f"JSON invalide: {item}"})
+            continue
+        try:
+            # JobRequest(**item): pydantic v1 (requirements-rpi.txt) comme v2
+            job = JobRequest(**item)
+        except ValidationError as e:
+            error = e.errors()[0]
+            rejected.append({"index": index, "error": f"{'.'.join(map(str, error['loc']))}: {error['msg']}"})
+            continue
+        except TypeError:
+            # Entrée qui n'est pas un objet JSON (liste, nombre, chaîne)
+            rejected.append({"index": index, "error": "objet JSON attendu"})
+            continue
+        via_celery = _celery_available and job.job_type == "scraping"
+        accepted.append({
+            "id": f"job_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}",
+            "name": job.name,
+            "job_type": job.job_type,
+            "parameters": job.parameters,
+            "priority": job.priority,
+            "status": "queued" if via_celery else "pending",
+            "created_at": created_at,
+            # Id Celery fixé d'avance: stocké dans la même transaction
+            "task_id": str(uuid.uuid4()) if via_celery else None,
+        })
+        if not via_celery:
+            local.append((accepted[-1]["id"], job))
+    
+    if accepted:
+        await job_store.insert_many(accepted)
+    for job_id, job in local:
+        job_runner.submit(job_id, job.job_type, process_job, job_id, job)
+    
+    return StreamingResponse(dispatch_bulk(accepted, rejected), media_type="application/x-ndjson")
+
 @router.put("/{job_id}")
 async def update_job(job_id: str, update: JobUpdate):
     """Mettre à jour un job."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Vérifier que le job existe
-    cursor.execute("SELECT id FROM jobs WHERE id = ?", (job_id,))
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="Job non trouvé")
-    
-    # Construire la requête de mise à jour
-    updates = []
-    params = []
+    fields: Dict[str, Any] = {}
     
     if update.status is not None:
-        updates.append("status = ?")
-        params.append(update.status)
+        fields["status"] = update.status
         
         # Mettre à jour les timestamps selon le statut
         if update.status == "running":
-            updates.append("started_at = ?")
-            params.append(datetime.now().isoformat())
+            fields["started_at"] = datetime.now().isoformat()
         elif update.status in ["completed", "failed"]:
-            updates.append("completed_at = ?")
-            params.append(datetime.now().isoformat())
+            fields["completed_at"] = datetime.now().isoformat()
     
     if update.progress is not None:
-        updates.append("progress = ?")
-        params.append(update.progress)
+        fields["progress"] = update.progress
     
     if update.node is not None:
-        updates.append("node = ?")
-        params.append(update.node)
+        fields["node"] = update.node
     
     if update.result is not None:
-        updates.append("result = ?")
-        params.append(json.dumps(update.result))
+        fields["result"] = update.result
     
-    if updates:
-        params.append(job_id)
-        query = f"UPDATE jobs SET {', '.join(updates)} WHERE id = ?"
-        cursor.execute(query, params)
-        conn.commit()
+    if await job_store.get_status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job non trouvé")
+    
+    if fields:
+        job_updates.update(job_id, fields)
     
-    conn.close()
     return {"message": "Job mis à jour avec succès"}
 
 @router.delete("/{job_id}")
 async def cancel_job(job_id: str):
     """Annuler un job."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
     # Vérifier que le job existe et n'est pas terminé
-    cursor.execute("SELECT status FROM jobs WHERE id = ?", (job_id,))
-    result = cursor.fetchone()
+    status = await job_store.get_status(job_id)
     
-    if not result:
-        conn.close()
+    if status is None:
         raise HTTPException(status_code=404, detail="Job non trouvé")
     
-    if result[0] in ["completed", "failed", "cancelled"]:
-        conn.close()
+    status = job_updates.pending_fields(job_id).get("status", status)
+    if status in TERMINAL_STATUSES:
         raise HTTPException(status_code=400, detail="Impossible d'annuler un job terminé")
     
-    # Marquer comme annulé
-    cursor.execute(
-        "UPDATE jobs SET status = ?, completed_at = ? WHERE id = ?",
-        ("cancelled", datetime.now().isoformat(), job_id)
-    )
-    
-    conn.commit()
-    conn.close()
+    # Marquer comme annulé et arrêter son exécution locale (en file ou en cours)
+    job_updates.update_status(job_id, "cancelled")
+    job_runner.cancel(job_id)
     
     return {"message": "Job annulé avec succès"}
 
@@ -248,42 +301,20 @@ async def get_job_logs(job_id: str):
 @router.post("/{job_id}/retry")
 async def retry_job(job_id: str):
     """Relancer un job échoué."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
     # Vérifier que le job existe et a échoué
-    cursor.execute("SELECT status FROM jobs WHERE id = ?", (job_id,))
-    result = cursor.fetchone()
+    job = job_updates.overlay(await job_store.get_job(job_id))
     
-    if not result:
-        conn.close()
+    if not job:
         raise HTTPException(status_code=404, detail="Job non trouvé")
     
-    if result[0] != "failed":
-        conn.close()
+    if job["status"] != "failed":
         raise HTTPException(status_code=400, detail="Seuls les jobs échoués peuvent être relancés")
     
     # Créer un nouveau job avec les mêmes paramètres
-    cursor.execute("SELECT name, job_type, parameters, priority FROM jobs WHERE id = ?", (job_id,))
-    job_data = cursor.fetchone()
-    
     new_job_id = f"job_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     
-    cursor.execute("""
-        INSERT INTO jobs (id, name, job_type, parameters, status, priority, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        new_job_id,
-        f"{job_data[0]} (retry)",
-        job_data[1],
-        job_data[2],
-        "pending",
-        job_data[3],
-        datetime.now().isoformat()
-    ))
-    
-    conn.commit()
-    conn.close()
+    await job_store.insert_job(new_job_id, f"{job['name']} (retry)", job["job_type"], job["parameters"],
+                               status="pending", priority=job["priority"])
     
     return {"id": new_job_id, "message": "Job relancé avec succès"}
 
@@ -331,48 +362,25 @@ async def process_scraping_job(job_id: str, parameters: Dict[str, Any]):
     except Exception as e:
         await update_job_status(job_id, "failed", 100, result={"error": str(e)})
 
+async def simulate_work(job_id: str, seconds: float, steps: int = 4):
+    """Traitement simulé: étapes bloquantes dans le pool de threads, progression entre deux."""
+    for step in range(1, steps + 1):
+        await job_runner.run_blocking(time.sleep, seconds / steps)
+        job_updates.update(job_id, {"progress": 100.0 * step / steps})
+
 async def process_data_job(job_id: str, parameters: Dict[str, Any]):
     """Traiter un job de traitement de données."""
-    # Simulation d'un traitement
-    import time
-    time.sleep(2)  # Simulation du traitement
+    await simulate_work(job_id, 2)
     
     await update_job_status(job_id, "completed", 100, result={"processed": True})
 
 async def process_generic_job(job_id: str, parameters: Dict[str, Any]):
     """Traiter un job générique."""
-    # Simulation d'un traitement
-    import time
-    time.sleep(1)  # Simulation du traitement
+    await simulate_work(job_id, 1)
     
     await update_job_status(job_id, "completed", 100, result={"completed": True})
 
 async def update_job_status(job_id: str, status: str, progress: float, node: str = None, result: Dict[str, Any] = None):
     """Mettre à jour le statut d'un job."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    updates = ["status = ?", "progress = ?"]
-    params = [status, progress]
-    
-    if node:
-        updates.append("node = ?")
-        params.append(node)
-    
-    if result:
-        updates.append("result = ?")
-        params.append(json.dumps(result))
-    
-    if status == "running":
-        updates.append("started_at = ?")
-        params.append(datetime.now().isoformat())
-    elif status in ["completed", "failed"]:
-        updates.append("completed_at = ?")
-        params.append(datetime.now().isoformat())
-    
-    params.append(job_id)
-    query = f"UPDATE jobs SET {', '.join(updates)} WHERE id = ?"
-    cursor.execute(query, params)
-    
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    # Write-behind: fusionné avec les mises à jour suivantes du même job
+    job_updates.update_status(job_id, status, progress, node=node, result=result)
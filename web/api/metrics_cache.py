@@ -3,23 +3,37 @@
 from fastapi import APIRouter, HTTPException
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
+import asyncio
 import json
-import redis
-from web.tasks.monitoring import get_cached_metrics
+import redis.asyncio as aioredis
+from web.tasks.monitoring import cached_metrics_from
 from web.config.metrics_config import NODES, REDIS_CONFIG
 
 router = APIRouter(prefix="/api/metrics", tags=["metrics-cache"])
 
-# Client Redis configuré
-redis_client = redis.Redis(**REDIS_CONFIG)
+# Client Redis async: lectures du cache sans bloquer la boucle ni passer par Celery
+redis_client = aioredis.Redis(**REDIS_CONFIG)
+
+async def read_nodes_metrics() -> List[Dict[str, Any]]:
+    """Métriques en cache des nœuds de NODES (un seul MGET)."""
+    if not NODES:
+        return []
+    values = await redis_client.mget([f"metrics:{node}" for node in NODES])
+    return [json.loads(value) for value in values if value]
+
+async def scan_keys(pattern: str) -> List[str]:
+    return [key async for key in redis_client.scan_iter(match=pattern, count=500)]
 
 @router.get("/cluster")
 async def get_cluster_metrics():
     """Métriques du cluster depuis le cache Redis."""
     try:
-        # Utiliser la tâche Celery pour récupérer les métriques
-        result = get_cached_metrics.delay()
-        metrics = result.get(timeout=5)
+        # Lecture directe, même payload que la tâche get_cached_metrics
+        aggregated_data = await redis_client.get("cluster:metrics")
+        node_values = []
+        if not aggregated_data and NODES:
+            node_values = await redis_client.mget([f"metrics:{node}" for node in NODES])
+        metrics = cached_metrics_from(aggregated_data, node_values)
         
         if "error" in metrics:
             raise HTTPException(status_code=500, detail=metrics["error"])
@@ -38,12 +52,7 @@ async def get_nodes_metrics():
     """Métriques des nœuds depuis le cache."""
     try:
         # Récupérer directement depuis Redis en utilisant la liste des nœuds
-        all_metrics = []
-        for node in NODES:
-            cache_key = f"metrics:{node}"
-            cached_data = redis_client.get(cache_key)
-            if cached_data:
-                all_metrics.append(json.loads(cached_data))
+        all_metrics = await read_nodes_metrics()
         
         return {
             "status": "success",
@@ -60,7 +69,7 @@ async def get_node_metrics(node_name: str):
     """Métriques d'un nœud spécifique depuis le cache."""
     try:
         cache_key = f"metrics:{node_name}"
-        cached_data = redis_client.get(cache_key)
+        cached_data = await redis_client.get(cache_key)
         
         if not cached_data:
             raise HTTPException(status_code=404, detail=f"Nœud {node_name} non trouvé dans le cache")
@@ -83,18 +92,13 @@ async def get_metrics_overview():
     """Vue d'ensemble des métriques avec cache."""
     try:
         # Récupérer les métriques agrégées
-        aggregated_data = redis_client.get("cluster:metrics")
+        aggregated_data = await redis_client.get("cluster:metrics")
         
         if aggregated_data:
             return json.loads(aggregated_data)
         
         # Fallback: calculer à la volée en utilisant la liste des nœuds
-        all_metrics = []
-        for node in NODES:
-            cache_key = f"metrics:{node}"
-            cached_data = redis_client.get(cache_key)
-            if cached_data:
-                all_metrics.append(json.loads(cached_data))
+        all_metrics = await read_nodes_metrics()
         
         if not all_metrics:
             return {
@@ -130,18 +134,18 @@ async def get_cache_health():
     """Santé du cache Redis."""
     try:
         # Test de connexion Redis
-        redis_client.ping()
+        await redis_client.ping()
         
         # Vérifier les clés de cache
-        cache_keys = redis_client.keys("metrics:*")
-        cluster_key = redis_client.get("cluster:metrics")
+        cache_keys = await scan_keys("metrics:*")
+        cluster_key = await redis_client.exists("cluster:metrics")
         
         return {
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
             "redis_connected": True,
             "cached_nodes": len(cache_keys),
-            "aggregated_metrics_available": cluster_key is not None,
+            "aggregated_metrics_available": bool(cluster_key),
             "cache_keys": cache_keys[:10]  # Limiter l'affichage
         }
         
@@ -153,42 +157,66 @@ async def get_cache_health():
             "error": str(e)
         }
 
-@router.post("/refresh")
+@router.post("/refresh", status_code=202)
 async def refresh_metrics_cache():
-    """Force le rafraîchissement du cache des métriques."""
+    """Lance un rafraîchissement du cache sans l'attendre.
+
+    La fin est annoncée en WebSocket (task_completed sur /monitoring, avec
+    le task_id) et consultable sur GET /api/metrics/refresh/{task_id}.
+    """
     try:
         from web.tasks.monitoring import collect_metrics
         
-        # Lancer la tâche de collecte
-        task = collect_metrics.delay()
-        result = task.get(timeout=30)
+        # Publication sur le broker (I/O synchrone): hors de la boucle
+        task = await asyncio.to_thread(collect_metrics.apply_async, kwargs={"notify": True})
         
         return {
-            "status": "success",
+            "status": "queued",
             "timestamp": datetime.utcnow().isoformat(),
-            "message": "Cache rafraîchi",
-            "task_result": result
+            "message": "Rafraîchissement lancé",
+            "task_id": task.id,
+            "status_url": f"/api/metrics/refresh/{task.id}"
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur rafraîchissement: {str(e)}")
 
+@router.get("/refresh/{task_id}")
+async def get_refresh_status(task_id: str):
+    """État d'un rafraîchissement lancé par POST /refresh."""
+    from web.celery_app import celery_app
+    
+    def read_state() -> Dict[str, Any]:
+        result = celery_app.AsyncResult(task_id)
+        ready = result.ready()
+        return {
+            "state": result.state,
+            "ready": ready,
+            "task_result": result.result if ready and result.successful() else None
+        }
+    
+    try:
+        # Backend de résultats synchrone: hors de la boucle
+        return {"task_id": task_id, **(await asyncio.to_thread(read_state))}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur état du rafraîchissement: {str(e)}")
+
 @router.get("/stats")
 async def get_cache_stats():
     """Statistiques du cache."""
     try:
         # Informations Redis
-        info = redis_client.info()
+        info = await redis_client.info()
         
         # Clés de cache
-        cache_keys = redis_client.keys("metrics:*")
-        cluster_key = redis_client.get("cluster:metrics")
+        cache_keys = await scan_keys("metrics:*")
+        cluster_key = await redis_client.exists("cluster:metrics")
         
-        # TTL des clés
-        ttl_info = {}
-        for key in cache_keys[:5]:  # Limiter aux 5 premières
-            ttl = redis_client.ttl(key)
-            ttl_info[key] = ttl
+        # TTL des clés (5 premières, un aller-retour)
+        pipe = redis_client.pipeline(transaction=False)
+        for key in cache_keys[:5]:
+            pipe.ttl(key)
+        ttl_info = dict(zip(cache_keys[:5], await pipe.execute()))
         
         return {
             "timestamp": datetime.utcnow().isoformat(),
@@ -199,7 +227,7 @@ async def get_cache_stats():
             },
             "cache_stats": {
                 "total_cached_nodes": len(cache_keys),
-                "aggregated_metrics_available": cluster_key is not None,
+                "aggregated_metrics_available": bool(cluster_key),
                 "sample_ttl": ttl_info
             }
         }
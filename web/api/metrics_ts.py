@@ -6,6 +6,7 @@ Expose des lectures simples (TS.RANGE) avec support d'agrégation côté RedisTi
 from fastapi import APIRouter, HTTPException, Query
 
 from web.core.redis_ts import ts_range, ts_mrange
+from web.core.redis_capabilities import redis_capabilities
 
 
 # Routeur dédié aux séries temporelles
@@ -62,10 +63,13 @@ async def get_ts_mrange(
     filters = Query(["metric=cpu.usage"], description="Filtres label=value, répétables"),
     agg = Query(None, description="Agrégation: avg,sum,min,max,count,first,last"),
     bucket_ms = Query(None, description="Taille de fenêtre en ms si agg"),
+    groupby = Query(None, description="Label de regroupement, ex: metric"),
+    reduce: str = Query("avg", description="Réducteur du groupby: avg,sum,min,max,count"),
 ):
     """Lit plusieurs séries en une requête via des labels.
 
     Exemple: filters=metric=cpu.usage&filters=host=node13.lan
+    Avec groupby=metric, les séries sont fusionnées (côté Redis si possible).
     """
     try:
         # Sanitize params
@@ -75,8 +79,8 @@ async def get_ts_mrange(
         except Exception:
             bucket_val = None
         
-        series = ts_mrange(frm, to, filters, aggregation=agg_val, bucket_ms=bucket_val)
-        return {"from": frm, "to": to, "filters": filters, "aggregation": agg_val, "bucket_ms": bucket_val, "series": series}
+        series = ts_mrange(frm, to, filters, aggregation=agg_val, bucket_ms=bucket_val, groupby=groupby or None, reduce=reduce)
+        return {"from": frm, "to": to, "filters": filters, "aggregation": agg_val, "bucket_ms": bucket_val, "groupby": groupby, "series": series}
     except Exception as e:
         # Fail-soft: renvoyer une liste vide pour ne pas casser le front
         return {
@@ -90,3 +94,12 @@ async def get_ts_mrange(
         }
 
 
+@router.get("/capabilities")
+async def get_ts_capabilities():
+    """Capacités Redis détectées (TimeSeries, JSON, version serveur).
+
+    Lecture du cache uniquement: le re-probe tourne en tâche de fond.
+    """
+    caps = redis_capabilities.snapshot(refresh=False)
+    caps.pop("server_version_tuple", None)
+    return caps
@@ -7,7 +7,7 @@ import httpx
 import asyncio
 import json
 import redis
-from web.config.metrics_config import REDIS_CONFIG
+from web.config.metrics_config import REDIS_CONFIG, MONITORING_CONFIG
 from web.config.logging_config import get_logger
 
 # Configuration du logger
@@ -114,91 +114,15 @@ async def get_performance_report(hours: int = 24):
 
 @router.get("/alerts")
 async def get_alerts():
-    """Alertes actives basées sur le cache Redis."""
+    """Alertes actives, tenues à jour par le moteur de règles du collecteur."""
     try:
-        # Utiliser le cache Redis pour générer des alertes intelligentes
-        cached_data = redis_client.get("cluster:metrics")
-        if cached_data:
-            cluster_metrics = json.loads(cached_data)
-            
-            alerts = []
-            alert_count = 0
-            
-            # Vérifier les métriques du cluster
-            cpu_avg = cluster_metrics.get("cpu_usage_avg", 0)
-            memory_avg = cluster_metrics.get("memory_usage_avg", 0)
-            online_nodes = cluster_metrics.get("online_nodes", 0)
-            total_nodes = cluster_metrics.get("total_nodes", 0)
-            
-            # Alertes basées sur les métriques
-            if cpu_avg > 90:
-                alerts.append({
-                    "id": "high_cpu",
-                    "type": "warning",
-                    "message": f"Utilisation CPU élevée: {cpu_avg:.1f}%",
-                    "timestamp": datetime.now().isoformat()
-                })
-                alert_count += 1
-            
-            if memory_avg > 90:
-                alerts.append({
-                    "id": "high_memory",
-                    "type": "warning", 
-                    "message": f"Utilisation mémoire élevée: {memory_avg:.1f}%",
-                    "timestamp": datetime.now().isoformat()
-                })
-                alert_count += 1
-            
-            if online_nodes < total_nodes:
-                down_nodes = total_nodes - online_nodes
-                alerts.append({
-                    "id": "nodes_down",
-                    "type": "critical" if down_nodes > total_nodes // 2 else "warning",
-                    "message": f"{down_nodes} nœuds hors ligne ({online_nodes}/{total_nodes})",
-                    "timestamp": datetime.now().isoformat()
-                })
-                alert_count += 1
-            
-            # Vérifier les nœuds individuels
-            for node_data in cluster_metrics.get("nodes", []):
-                node_name = node_data.get("node", "")
-                cpu_usage = node_data.get("cpu_usage", 0)
-                memory_usage = node_data.get("memory_usage", 0)
-                temperature = node_data.get("temperature", 0)
-                
-                if cpu_usage > 95:
-                    alerts.append({
-                        "id": f"high_cpu_{node_name}",
-                        "type": "warning",
-                        "message": f"{node_name}: CPU très élevé ({cpu_usage:.1f}%)",
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    alert_count += 1
-                
-                if memory_usage > 95:
-                    alerts.append({
-                        "id": f"high_memory_{node_name}",
-                        "type": "warning",
-                        "message": f"{node_name}: Mémoire très élevée ({memory_usage:.1f}%)",
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    alert_count += 1
-                
-                if temperature > 80:
-                    alerts.append({
-                        "id": f"high_temp_{node_name}",
-                        "type": "critical",
-                        "message": f"{node_name}: Température élevée ({temperature:.1f}°C)",
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    alert_count += 1
-            
-            return {
-                "active_alerts": alerts,
-                "alert_count": alert_count,
-                "timestamp": datetime.now().isoformat()
-            }
-            
+        stored = redis_client.hvals(MONITORING_CONFIG["alerts_key"])
+        alerts = sorted((json.loads(raw) for raw in stored), key=lambda alert: alert.get("since", ""))
+        return {
+            "active_alerts": alerts,
+            "alert_count": len(alerts),
+            "timestamp": datetime.now().isoformat()
+        }
     except Exception as e:
         return {"active_alerts": [], "alert_count": 0, "error": str(e)}
 
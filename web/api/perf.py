@@ -0,0 +1,50 @@
+"""Endpoint de lecture de l'instrumentation des chemins chauds."""
+
+import json
+from datetime import datetime
+
+import redis
+from fastapi import APIRouter, Query
+
+from web.core.perf import perf, REDIS_KEY_PREFIX
+from web.config.metrics_config import REDIS_CONFIG
+from web.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api/perf", tags=["perf"])
+
+# Client Redis pour les snapshots des autres process (worker Celery...)
+redis_client = redis.Redis(**REDIS_CONFIG)
+
+
+def _remote_snapshots():
+    """Snapshots publiés par les autres process via perf.flush_to_redis."""
+    snapshots = []
+    try:
+        for key in redis_client.scan_iter(match=f"{REDIS_KEY_PREFIX}*", count=100):
+            raw = redis_client.get(key)
+            if raw:
+                snapshots.append(json.loads(raw))
+    except Exception as e:
+        logger.warning(f"Lecture des snapshots perf impossible: {e}")
+    return snapshots
+
+
+@router.get("")
+async def get_perf(local_only: bool = Query(False, description="Ignorer les snapshots des autres process")):
+    """p50/p95/p99 par span (ms), fusionnés entre process."""
+    extra = [] if local_only else _remote_snapshots()
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "enabled": perf.enabled,
+        "sources": 1 + len(extra),
+        "spans": perf.summary(extra),
+    }
+
+
+@router.post("/reset")
+async def reset_perf():
+    """Remet à zéro les histogrammes du process web."""
+    perf.reset()
+    return {"status": "reset", "timestamp": datetime.now().isoformat()}
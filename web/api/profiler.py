@@ -0,0 +1,46 @@
+"""Endpoints du profiler par échantillonnage (opt-in: PROFILER_ENABLED=1)."""
+
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from web.core.profiler import PROFILER_ENABLED, PROFILER_MAX_SECONDS, loop_lag_monitor, profile_process
+
+router = APIRouter(prefix="/api/profiler", tags=["profiler"])
+
+
+def _require_enabled():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler désactivé (PROFILER_ENABLED=1 pour l'activer)")
+
+
+@router.get("/flamegraph")
+async def get_flamegraph(
+    seconds: float = Query(10.0, gt=0, le=PROFILER_MAX_SECONDS, description="Durée d'échantillonnage"),
+    rate: float = Query(100.0, gt=0, le=1000, description="Échantillons par seconde"),
+):
+    """Profile le process web et renvoie un fichier collapsed stacks.
+
+    A ouvrir avec speedscope.app ou flamegraph.pl.
+    """
+    _require_enabled()
+    try:
+        profiler = await profile_process(seconds, rate)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    filename = f"dispycluster-{datetime.now().strftime('%Y%m%d_%H%M%S')}.collapsed"
+    return Response(
+        content=profiler.collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(profiler.sample_count),
+        },
+    )
+
+
+@router.get("/loop-lag")
+async def get_loop_lag():
+    """Blocages de la boucle asyncio détectés, avec la pile capturée."""
+    _require_enabled()
+    return loop_lag_monitor.report()
@@ -0,0 +1,174 @@
+"""Endpoint /metrics au format OpenMetrics pour Prometheus.
+
+Tout est lu depuis le cache: métriques agrégées du collecteur dans Redis
+(cluster:metrics) et état en mémoire du dispatcher / de la file. Le texte
+rendu est gardé tant que le cycle de collecte n'a pas changé, un scrape ne
+coûte alors qu'une comparaison.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import redis
+from fastapi import APIRouter, Response
+
+from web.config.metrics_config import NODES, REDIS_CONFIG, PROMETHEUS_CONFIG
+from web.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(tags=["prometheus"])
+
+# Client Redis pour le cache
+redis_client = redis.Redis(**REDIS_CONFIG)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Champs par nœud exposés: clé dans metrics:{node} -> (nom, aide)
+NODE_FIELDS = {
+    "cpu_usage": ("dispycluster_node_cpu_usage_percent", "Utilisation CPU du noeud (%)"),
+    "memory_usage": ("dispycluster_node_memory_usage_percent", "Utilisation memoire du noeud (%)"),
+    "disk_usage": ("dispycluster_node_disk_usage_percent", "Utilisation du disque racine (%)"),
+    "temperature": ("dispycluster_node_temperature_celsius", "Temperature du noeud"),
+    "memory_total": ("dispycluster_node_memory_total_bytes", "Memoire totale"),
+    "memory_available": ("dispycluster_node_memory_available_bytes", "Memoire disponible"),
+    "disk_total": ("dispycluster_node_disk_total_bytes", "Taille du disque racine"),
+    "disk_available": ("dispycluster_node_disk_available_bytes", "Espace libre du disque racine"),
+}
+
+# Cache du texte rendu (un rendu par cycle de collecte)
+_cache: Dict[str, Any] = {"source": None, "text": "", "checked_at": 0.0}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: Any) -> Optional[str]:
+    """Formate une valeur numérique, None si non exploitable."""
+    if value is None:
+        return None
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class Exposition:
+    """Petit builder de texte OpenMetrics (familles HELP/TYPE + échantillons)."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, samples) -> None:
+        """Ajoute une famille. samples: liste de (labels_dict, valeur)."""
+        rendered = []
+        suffix = "_total" if kind == "counter" else ""
+        for labels, value in samples:
+            val = _fmt(value)
+            if val is None:
+                continue
+            if labels:
+                lbl = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                rendered.append(f"{name}{suffix}{{{lbl}}} {val}")
+            else:
+                rendered.append(f"{name}{suffix} {val}")
+        if not rendered:
+            return
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        self.lines.extend(rendered)
+
+    def render(self) -> str:
+        return "\n".join(self.lines + ["# EOF", ""])
+
+
+def _render_cluster(expo: Exposition, aggregated: Dict[str, Any]) -> None:
+    stats = aggregated.get("cluster_stats", {})
+    expo.family("dispycluster_cluster_nodes", "gauge", "Noeuds declares", [({}, stats.get("total_nodes", len(NODES)))])
+    expo.family("dispycluster_cluster_nodes_online", "gauge", "Noeuds en ligne", [({}, stats.get("online_nodes"))])
+    expo.family("dispycluster_cluster_cpu_usage_avg_percent", "gauge", "CPU moyen du cluster (%)", [({}, stats.get("avg_cpu"))])
+    expo.family("dispycluster_cluster_memory_usage_avg_percent", "gauge", "Memoire moyenne du cluster (%)", [({}, stats.get("avg_memory"))])
+    expo.family("dispycluster_cluster_temperature_avg_celsius", "gauge", "Temperature moyenne du cluster", [({}, stats.get("avg_temperature"))])
+
+    nodes = aggregated.get("nodes", {}) or {}
+    for field, (name, help_text) in NODE_FIELDS.items():
+        samples = [({"node": node}, metrics.get(field)) for node, metrics in nodes.items() if isinstance(metrics, dict)]
+        expo.family(name, "gauge", help_text, samples)
+
+
+def _render_dispatcher(expo: Exposition) -> None:
+    """Dispatcher, file de tâches et workers (état en mémoire du process web)."""
+    try:
+        from web.app import cluster_view
+    except Exception:
+        return
+    stats = cluster_view.dispatcher.dispatch_stats
+    expo.family("dispycluster_dispatch", "counter", "Taches dispatchees", [({}, stats.get("total_dispatched"))])
+    expo.family("dispycluster_dispatch_success", "counter", "Dispatchs reussis", [({}, stats.get("successful_dispatches"))])
+    expo.family("dispycluster_dispatch_failure", "counter", "Dispatchs en echec", [({}, stats.get("failed_dispatches"))])
+
+    queue = cluster_view.task_queue.get_stats()
+    expo.family("dispycluster_queue_tasks", "gauge", "Taches par etat dans la file",
+                [({"state": state}, queue.get(state)) for state in ("pending", "running", "completed", "failed")])
+
+    workers = cluster_view.worker_registry.get_stats()
+    expo.family("dispycluster_workers", "gauge", "Workers par etat",
+                [({"state": "ready"}, workers.get("ready_workers")),
+                 ({"state": "busy"}, workers.get("busy_workers")),
+                 ({"state": "down"}, workers.get("down_workers"))])
+
+
+def _render_celery(expo: Exposition) -> None:
+    """Statistiques du collecteur Celery (écrites par web.tasks.monitoring)."""
+    try:
+        stats = redis_client.hgetall("celery:collector")
+    except Exception:
+        return
+    if not stats:
+        return
+    expo.family("dispycluster_collector_runs", "counter", "Executions du collecteur", [({}, stats.get("runs_total"))])
+    expo.family("dispycluster_collector_errors", "counter", "Executions du collecteur en erreur", [({}, stats.get("errors_total", 0))])
+    expo.family("dispycluster_collector_duration_seconds", "gauge", "Duree du dernier cycle", [({}, stats.get("last_duration_s"))])
+    expo.family("dispycluster_collector_nodes_processed", "gauge", "Noeuds traites au dernier cycle", [({}, stats.get("last_nodes_processed"))])
+    expo.family("dispycluster_collector_last_success_timestamp_seconds", "gauge", "Horodatage du dernier cycle reussi", [({}, stats.get("last_success_ts"))])
+
+
+def render_metrics(raw_aggregated: Optional[str]) -> str:
+    """Construit l'exposition complète à partir du JSON agrégé brut."""
+    expo = Exposition()
+    aggregated = {}
+    if raw_aggregated:
+        try:
+            aggregated = json.loads(raw_aggregated)
+        except Exception:
+            aggregated = {}
+    _render_cluster(expo, aggregated)
+    _render_dispatcher(expo)
+    _render_celery(expo)
+    return expo.render()
+
+
+def get_exposition() -> str:
+    """Texte OpenMetrics, re-rendu seulement quand le cycle de collecte change."""
+    now = time.monotonic()
+    if _cache["text"] and now - _cache["checked_at"] < PROMETHEUS_CONFIG["recheck_s"]:
+        return _cache["text"]
+    try:
+        raw = redis_client.get("cluster:metrics")
+    except Exception as e:
+        logger.warning(f"Lecture cluster:metrics impossible pour /metrics: {e}")
+        raw = None
+    _cache["checked_at"] = now
+    if raw is not None and raw == _cache["source"] and _cache["text"]:
+        return _cache["text"]
+    _cache["source"] = raw
+    _cache["text"] = render_metrics(raw)
+    return _cache["text"]
+
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    """Cible de scrape Prometheus (format OpenMetrics)."""
+    return Response(content=get_exposition(), media_type=CONTENT_TYPE)
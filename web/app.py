@@ -5,10 +5,8 @@ les workers, le monitoring et les jobs.
 """
 
 import asyncio
-import json
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
-from pathlib import Path
 
 # Configuration du logging
 from web.config.logging_config import setup_logging
@@ -18,23 +16,25 @@ from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi import Response
 from pydantic import BaseModel, HttpUrl
 import httpx
-import sqlite3
 import uvicorn
 from typing import cast
 from contextlib import asynccontextmanager
 
 # Importer les routes API
 from web.api.cluster import router as cluster_router
-from web.api.jobs import router as jobs_router
+from web.api.jobs import router as jobs_router, projection as jobs_projection, stream_jobs_ndjson
 from web.api.monitoring import router as monitoring_router
 from web.api.tests import router as tests_router
 from web.api.metrics_cache import router as metrics_cache_router
 from web.api.graphs import router as graphs_router
 from web.api.metrics_ts import router as metrics_ts_router
+from web.api.prometheus import router as prometheus_router
+from web.api.perf import router as perf_router
+from web.api.profiler import router as profiler_router
 
 # Importer les vues intelligentes
 from web.views.cluster_view import ClusterView
@@ -42,9 +42,12 @@ from web.views.monitoring_view import MonitoringView
 
 # Importer le gestionnaire WebSocket
 from web.core.websocket_manager import WebSocketManager
+from web.core.redis_capabilities import redis_capabilities
+from web.core.job_runner import job_runner
+from web.core.job_store import job_store, job_updates
+from web.core.profiler import PROFILER_ENABLED, loop_lag_monitor
 
 # Configuration
-DATABASE_PATH = "web/data/cluster.db"
 STATIC_PATH = "web/static"
 TEMPLATES_PATH = "web/templates"
 
@@ -62,6 +65,16 @@ async def lifespan(app: FastAPI):
     """Initialise l'appli au démarrage et gère le teardown proprement."""
     init_database()
     print("Base de données initialisée")
+
+    # Probe des capacités Redis au démarrage puis re-probe périodique (TTL/backoff)
+    caps_stop = asyncio.Event()
+    await asyncio.to_thread(redis_capabilities.probe)
+    caps_task = asyncio.create_task(redis_capabilities.run(caps_stop))
+
+    # Moniteur de lag de la boucle (opt-in)
+    if PROFILER_ENABLED:
+        loop_lag_monitor.start()
+
     try:
         await websocket_manager.start_redis_subscriber()
         print("WebSocket Manager démarré avec support Redis pub/sub")
@@ -72,11 +85,24 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    caps_stop.set()
+    if PROFILER_ENABLED:
+        await loop_lag_monitor.stop()
     try:
-        if websocket_manager.pubsub is not None:
-            websocket_manager.pubsub.close()
+        await caps_task
     except Exception:
         pass
+    try:
+        await websocket_manager.stop_redis_subscriber()
+    except Exception:
+        pass
+    # Jobs locaux encore actifs, mises à jour en attente, puis connexions SQLite du pool
+    await job_runner.stop()
+    try:
+        await job_updates.stop()
+    except Exception as e:
+        print(f"Flush des mises à jour de jobs en échec: {e}")
+    await asyncio.to_thread(job_store.close)
     # Rien à arrêter côté Celery snapshot
 
 app = FastAPI(
@@ -107,6 +133,9 @@ app.include_router(tests_router)
 app.include_router(metrics_cache_router)
 app.include_router(graphs_router)
 app.include_router(metrics_ts_router)
+app.include_router(prometheus_router)
+app.include_router(perf_router)
+app.include_router(profiler_router)
 
 # Initialiser les vues intelligentes
 cluster_view = ClusterView()
@@ -156,62 +185,9 @@ except Exception:
 
 # Base de données
 def init_database():
-    """Initialiser la base de données SQLite."""
-    Path("web/data").mkdir(parents=True, exist_ok=True)
-    
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Table des jobs
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS jobs (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            job_type TEXT NOT NULL,
-            parameters TEXT NOT NULL,
-            status TEXT NOT NULL,
-            node TEXT,
-            progress REAL DEFAULT 0,
-            priority INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            started_at TIMESTAMP,
-            completed_at TIMESTAMP,
-            result TEXT
-        )
-    """)
-
-    # Ajouter la colonne task_id si elle n'existe pas
-    cursor.execute("PRAGMA table_info(jobs)")
-    cols = [row[1] for row in cursor.fetchall()]
-    if "task_id" not in cols:
-        cursor.execute("ALTER TABLE jobs ADD COLUMN task_id TEXT")
-    
-    # Table des nœuds
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS nodes (
-            name TEXT PRIMARY KEY,
-            status TEXT NOT NULL,
-            cpu_usage REAL,
-            memory_usage REAL,
-            disk_usage REAL,
-            temperature REAL,
-            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Table des métriques
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            node TEXT NOT NULL,
-            metric_type TEXT NOT NULL,
-            value REAL NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
+    """Initialiser la base de données SQLite (migrations du store des jobs)."""
+    version = job_store.migrate()
+    print(f"Schéma SQLite en version {version}")
 
 # Routes principales
 @app.get("/", response_class=HTMLResponse)
@@ -243,7 +219,11 @@ async def health():
         "timestamp": datetime.now().isoformat(),
         "version": "2.0.0",
         "celery": {"available": _celery_available, "broker": broker_ok},
-        "websocket": {"connected_clients": len(websocket_manager.connected_clients)}
+        "websocket": {
+            "connected_clients": await websocket_manager.count_connected_clients(),
+            "worker_clients": len(websocket_manager.connected_clients),
+            "pubsub": websocket_manager.get_pubsub_stats()
+        }
     }
 
 @app.get("/api/cluster/overview")
@@ -285,43 +265,33 @@ async def get_node_details(node_name: str, hours: int = 24):
 
 # Gestion des jobs
 @app.get("/api/jobs")
-async def get_jobs(status: Optional[str] = None, limit: int = 50):
-    """Liste des jobs."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    query = "SELECT * FROM jobs"
-    params = []
-    
-    if status:
-        query += " WHERE status = ?"
-        params.append(status)
-    
-    query += " ORDER BY created_at DESC LIMIT ?"
-    params.append(limit)
-    
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    
-    jobs = []
-    for row in rows:
-        jobs.append({
-            "id": row[0],
-            "name": row[1],
-            "job_type": row[2],
-            "parameters": json.loads(row[3]),
-            "status": row[4],
-            "node": row[5],
-            "progress": row[6],
-            "priority": row[7],
-            "created_at": row[8],
-            "started_at": row[9],
-            "completed_at": row[10],
-            "result": json.loads(row[11]) if row[11] else None
-        })
-    
-    conn.close()
-    return jobs
+async def get_jobs(
+    response: Response,
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = "json"
+):
+    """Liste des jobs.
+
+    Pagination par clé (`cursor` = en-tête X-Next-Cursor de la page
+    précédente), projection `fields=name,status,...` (sans `parameters` ni
+    `result` ils ne sont ni lus ni décodés), `format=ndjson` pour un export
+    complet en streaming.
+    """
+    columns = jobs_projection(fields)
+    if format == "ndjson":
+        return StreamingResponse(stream_jobs_ndjson(status, job_type, columns), media_type="application/x-ndjson")
+    try:
+        jobs, next_cursor = await job_store.list_page(status=status, job_type=job_type, limit=limit,
+                                                      cursor=cursor, columns=columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [job_updates.overlay(job) for job in jobs]
 
 @app.post("/api/jobs")
 async def create_job(job: JobRequest):
@@ -338,25 +308,15 @@ async def create_job(job: JobRequest):
         # Si Celery est dispo et type scraping, déclencher une task Celery et tracer dans SQLite
         if _celery_available and job.job_type == "scraping":
             # Enregistrer le job en base
-            conn = sqlite3.connect(DATABASE_PATH)
-            cursor = conn.cursor()
             job_id = f"job_{int(datetime.now().timestamp()*1000)}"
-            cursor.execute(
-                "INSERT INTO jobs (id, name, job_type, parameters, status, priority) VALUES (?, ?, ?, ?, ?, ?)",
-                (job_id, job.name, job.job_type, json.dumps(job.parameters), "queued", job.priority),
-            )
-            conn.commit()
+            await job_store.insert_job(job_id, job.name, job.job_type, job.parameters,
+                                       status="queued", priority=job.priority)
 
             # Lancer la task Celery
             task = celery_run_scrape.delay(job.parameters)
 
             # Sauvegarder le task_id pour suivi
-            cursor.execute(
-                "UPDATE jobs SET task_id = ? WHERE id = ?",
-                (task.id, job_id),
-            )
-            conn.commit()
-            conn.close()
+            await job_store.update_fields(job_id, {"task_id": task.id})
 
             # Retourner l’identifiant Celery pour suivi
             return {"id": job_id, "task_id": task.id, "status": "queued"}
@@ -386,67 +346,21 @@ async def trigger_scraping_job(job_id: str, parameters: Dict[str, Any]):
             
             if response.status_code == 200:
                 # Mettre à jour le statut du job
-                conn = sqlite3.connect(DATABASE_PATH)
-                cursor = conn.cursor()
-                cursor.execute(
-                    "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
-                    ("running", datetime.now().isoformat(), job_id)
-                )
-                conn.commit()
-                conn.close()
+                job_updates.update_status(job_id, "running")
                 
     except Exception as e:
         # Marquer le job comme échoué
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE jobs SET status = ?, result = ? WHERE id = ?",
-            ("failed", json.dumps({"error": str(e)}), job_id)
-        )
-        conn.commit()
-        conn.close()
+        job_updates.update(job_id, {"status": "failed", "result": {"error": str(e)}})
 
 @app.get("/api/jobs/{job_id}")
 async def get_job(job_id: str):
     """Détails d'un job spécifique."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-    row = cursor.fetchone()
-    
-    if not row:
+    response = job_updates.overlay(await job_store.get_job(job_id))
+    if not response:
         raise HTTPException(status_code=404, detail="Job non trouvé")
-    
-    # Construire la réponse et inclure état Celery si task_id
-    response = {
-        "id": row[0],
-        "name": row[1],
-        "job_type": row[2],
-        "parameters": json.loads(row[3]),
-        "status": row[4],
-        "node": row[5],
-        "progress": row[6],
-        "priority": row[7],
-        "created_at": row[8],
-        "started_at": row[9],
-        "completed_at": row[10],
-        "result": json.loads(row[11]) if row[11] else None
-    }
-
-    # Tenter de récupérer le task_id si la colonne existe
-    try:
-        # Requêter explicitement la colonne task_id
-        cursor.execute("SELECT task_id FROM jobs WHERE id = ?", (job_id,))
-        task_row = cursor.fetchone()
-        if task_row:
-            task_id = task_row[0]
-        else:
-            task_id = None
-    except Exception:
-        task_id = None
 
-    conn.close()
+    # Inclure l'état Celery si task_id
+    task_id = response.pop("task_id", None)
 
     if _celery_available and task_id:
         async_result = celery_app.AsyncResult(task_id)
@@ -1,5 +1,8 @@
 import os
 from celery import Celery
+from kombu import Exchange, Queue
+
+from web.config.metrics_config import CELERY_QUEUES, COLLECTOR_MODE, celery_worker_profile
 
 
 def _build_redis_url(default_db: int) -> str:
@@ -21,20 +24,33 @@ celery_app = Celery(
     ],
 )
 
+_profile = celery_worker_profile()
+
 celery_app.conf.update(
     task_soft_time_limit=60,
     task_time_limit=120,
     worker_prefetch_multiplier=1,
     task_acks_late=True,
     broker_transport_options={"visibility_timeout": 3600},
-    # Configuration spécifique Windows
-    worker_pool='solo',  # Évite les problèmes de multiprocessing sur Windows
-    worker_concurrency=1,
+    # Pool et concurrence du profil (CELERY_WORKER_PROFILE, solo sous Windows).
+    # Pour gevent/eventlet passer par `python -m web.celery_worker`, qui patche avant l'import.
+    worker_pool=_profile["pool"],
+    worker_concurrency=_profile["concurrency"],
+    # Sans -Q un worker consomme toutes les files déclarées
+    task_queues=[Queue(name, Exchange(name), routing_key=name) for name in dict.fromkeys(CELERY_QUEUES.values())],
+    task_default_queue=CELERY_QUEUES["default"],
+    task_routes={
+        "web.tasks.monitoring.*": {"queue": CELERY_QUEUES["monitoring"]},
+        "web.tasks.scraping.*": {"queue": CELERY_QUEUES["scraping"]},
+    },
+    # COLLECTOR_MODE=daemon: collecte par le service web.collector, pas de tâche beat
     beat_schedule={
         "collect-metrics-every-5s": {
             "task": "web.tasks.monitoring.collect_metrics",
             "schedule": 5.0,  # Collecte toutes les 5 secondes pour les graphiques
+            # Une collecte pas démarrée avant la suivante est périmée: on la jette
+            "options": {"expires": 5.0},
         },
-    },
+    } if COLLECTOR_MODE == "celery" else {},
 )
 
@@ -0,0 +1,48 @@
+"""Lance un worker Celery selon un profil d'exécution.
+
+    python -m web.celery_worker                 # CELERY_WORKER_PROFILE (auto par défaut)
+    python -m web.celery_worker io -l info      # profil explicite + options celery
+
+Profils (CELERY_WORKER_PROFILES): solo, prefork, cpu, io, monitoring. Le
+pool, la concurrence et les files (-Q) viennent du profil; les options
+passées en plus gagnent. gevent/eventlet sont patchés avant tout import.
+
+collect_metrics (file monitoring) tourne toujours sur un seul processus:
+avec prefork (auto sous Linux), cpu ou io, lancer aussi le profil
+monitoring.
+"""
+
+import sys
+from typing import List, Optional
+
+from web.config.metrics_config import CELERY_WORKER_PROFILES, celery_worker_profile
+
+
+def worker_argv(profile_name: Optional[str] = None, extra: Optional[List[str]] = None) -> List[str]:
+    """Arguments `celery worker` d'un profil."""
+    profile = celery_worker_profile(profile_name)
+    return [
+        "worker",
+        "-P", profile["pool"],
+        "-c", str(profile["concurrency"]),
+        "-Q", ",".join(profile["queues"]),
+        "-n", f"{profile['name']}@%h",
+        *(extra or []),
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+    profile_name = args.pop(0) if args and args[0] in CELERY_WORKER_PROFILES else None
+    celery_args = worker_argv(profile_name, args)
+
+    # Monkey-patch gevent/eventlet avant celery_app (sockets, threads)
+    from celery import maybe_patch_concurrency
+    maybe_patch_concurrency(["celery", *celery_args])
+
+    from web.celery_app import celery_app
+    celery_app.worker_main(celery_args)
+
+
+if __name__ == "__main__":
+    main()
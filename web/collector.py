@@ -0,0 +1,41 @@
+"""Service de collecte des métriques node_exporter.
+
+    COLLECTOR_MODE=daemon python -m web.collector
+
+Remplace la tâche beat collect_metrics (désactivée en mode daemon). On
+peut en lancer plusieurs: un seul, le leader, collecte.
+"""
+
+import asyncio
+import signal
+
+from web.config.logging_config import get_logger
+from web.core.collector_daemon import CollectorDaemon
+
+logger = get_logger(__name__)
+
+
+async def serve() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C remonte en KeyboardInterrupt
+            pass
+    daemon = CollectorDaemon()
+    logger.info(f"Service de collecte démarré ({daemon.lease.owner})")
+    await daemon.run(stop)
+    logger.info(f"Service de collecte arrêté: {daemon.get_stats()}")
+
+
+def main() -> None:
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,76 @@ METRICS_CACHE_TTL = int(os.getenv("METRICS_CACHE_TTL", "300"))
 METRICS_AGGREGATED_TTL = int(os.getenv("METRICS_AGGREGATED_TTL", "300"))
 METRICS_COLLECTION_INTERVAL = int(os.getenv("METRICS_COLLECTION_INTERVAL", "10"))
 
+# Probe des capacités Redis (modules, version)
+REDIS_CAPS_TTL = int(os.getenv("REDIS_CAPS_TTL", "300"))
+REDIS_CAPS_BACKOFF_MAX = int(os.getenv("REDIS_CAPS_BACKOFF_MAX", "60"))
+
+# Endpoint /metrics (Prometheus): délai mini entre deux vérifications du cache
+PROMETHEUS_RECHECK_S = float(os.getenv("PROMETHEUS_RECHECK_S", "1.0"))
+
+# Relais pub/sub Redis -> WebSocket
+WS_PUBSUB_QUEUE_SIZE = int(os.getenv("WS_PUBSUB_QUEUE_SIZE", "100"))
+WS_PUBSUB_BACKOFF_MAX = float(os.getenv("WS_PUBSUB_BACKOFF_MAX", "30"))
+# Push différentiel: un keyframe complet tous les N cycles
+WS_DELTA_KEYFRAME_EVERY = int(os.getenv("WS_DELTA_KEYFRAME_EVERY", "30"))
+# Client lent: au-delà de N paquets en attente, les trames sont sautées
+WS_CLIENT_MAX_BACKLOG = int(os.getenv("WS_CLIENT_MAX_BACKLOG", "8"))
+# Workers uvicorn: au-delà de 1, socket.io passe par un manager Redis
+WS_WORKERS = int(os.getenv("WS_WORKERS", "1"))
+WS_LEADER_TTL = float(os.getenv("WS_LEADER_TTL", "10"))
+
+# Base SQLite des jobs
+DATABASE_PATH = os.getenv("DATABASE_PATH", "web/data/cluster.db")
+JOB_STORE_POOL_SIZE = int(os.getenv("JOB_STORE_POOL_SIZE", "4"))
+# NORMAL en WAL: durable au checkpoint, pas de fsync à chaque commit
+JOB_STORE_SYNCHRONOUS = os.getenv("JOB_STORE_SYNCHRONOUS", "NORMAL")
+# Write-behind des statuts de jobs: flush toutes les N ms ou dès M jobs en attente
+JOB_BUFFER_FLUSH_MS = int(os.getenv("JOB_BUFFER_FLUSH_MS", "200"))
+JOB_BUFFER_MAX_PENDING = int(os.getenv("JOB_BUFFER_MAX_PENDING", "500"))
+# Soumission en lot: taille max d'une requête, jobs par paquet Celery
+JOB_BULK_MAX_JOBS = int(os.getenv("JOB_BULK_MAX_JOBS", "50000"))
+JOB_BULK_CHUNK_SIZE = int(os.getenv("JOB_BULK_CHUNK_SIZE", "500"))
+# Exécution des jobs locaux: threads pour le travail bloquant, jobs simultanés par type
+JOB_RUNNER_WORKERS = int(os.getenv("JOB_RUNNER_WORKERS", "8"))
+JOB_CONCURRENCY_SCRAPING = int(os.getenv("JOB_CONCURRENCY_SCRAPING", "16"))
+JOB_CONCURRENCY_PROCESSING = int(os.getenv("JOB_CONCURRENCY_PROCESSING", "4"))
+JOB_CONCURRENCY_DEFAULT = int(os.getenv("JOB_CONCURRENCY_DEFAULT", "8"))
+
+# Workers Celery: profil d'exécution (auto = solo sous Windows, prefork ailleurs)
+CELERY_WORKER_PROFILE = os.getenv("CELERY_WORKER_PROFILE", "auto")
+# 0 = concurrence du profil
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", "0"))
+# Pool du profil io: threads, gevent ou eventlet (ces deux-là à installer à part)
+CELERY_IO_POOL = os.getenv("CELERY_IO_POOL", "threads")
+CELERY_IO_CONCURRENCY = int(os.getenv("CELERY_IO_CONCURRENCY", "32"))
+
 # Configuration node_exporter
 NODE_EXPORTER_PORT = int(os.getenv("NODE_EXPORTER_PORT", "9100"))
 NODE_EXPORTER_TIMEOUT = int(os.getenv("NODE_EXPORTER_TIMEOUT", "5"))
+# Collecte: connexion TCP max, et durée max d'un cycle (sous l'intervalle beat de 5 s)
+NODE_EXPORTER_CONNECT_TIMEOUT = float(os.getenv("NODE_EXPORTER_CONNECT_TIMEOUT", "1.0"))
+COLLECT_CYCLE_DEADLINE = float(os.getenv("COLLECT_CYCLE_DEADLINE", "4.0"))
+# Collecte: tâche beat Celery (celery) ou service dédié python -m web.collector (daemon)
+COLLECTOR_MODE = os.getenv("COLLECTOR_MODE", "celery")
+COLLECTOR_INTERVAL = float(os.getenv("COLLECTOR_INTERVAL", "5.0"))
+# Etat des compteurs CPU du service: memory (process) ou redis (repris par le prochain leader)
+COLLECTOR_CPU_STATE = os.getenv("COLLECTOR_CPU_STATE", "redis")
+# Cadence adaptative (intervalle par nœud jusqu'à COLLECTOR_MAX_INTERVAL) et bande morte de l'historique
+ADAPTIVE_SAMPLING = os.getenv("ADAPTIVE_SAMPLING", "1") in ("1", "true", "True")
+COLLECTOR_MAX_INTERVAL = float(os.getenv("COLLECTOR_MAX_INTERVAL", "60.0"))
+# Un nœud stable doit être rescrapé au moins deux fois par METRICS_CACHE_TTL, sinon
+# metrics:<nœud> expire entre deux scrapes et le nœud sort des nœuds en ligne
+if COLLECTOR_MAX_INTERVAL > METRICS_CACHE_TTL / 2:
+    print(f"COLLECTOR_MAX_INTERVAL={COLLECTOR_MAX_INTERVAL:g} ramené à {METRICS_CACHE_TTL / 2:g} "
+          f"(METRICS_CACHE_TTL={METRICS_CACHE_TTL})")
+    COLLECTOR_MAX_INTERVAL = METRICS_CACHE_TTL / 2
+HISTORY_MAX_GAP = float(os.getenv("HISTORY_MAX_GAP", "300.0"))
+# Débit d'une interface quand node_exporter ne donne pas node_network_speed_bytes (wifi)
+NODE_NET_CAPACITY_MBPS = float(os.getenv("NODE_NET_CAPACITY_MBPS", "100"))
+# Agent de nœud poussé (scripts/monitoring/node_agent.py): trames UDP ou Stream Redis
+AGENT_INGEST = os.getenv("AGENT_INGEST", "0") in ("1", "true", "True")
+AGENT_UDP_PORT = int(os.getenv("AGENT_UDP_PORT", "9180"))
+AGENT_INTERVAL = float(os.getenv("AGENT_INTERVAL", "5.0"))
 
 def load_nodes_from_yaml() -> List[str]:
     """Charge la liste des nœuds depuis nodes.yaml."""
@@ -66,6 +133,13 @@ REDIS_CONFIG = {
     "decode_responses": True
 }
 
+# Configuration du probe de capacités Redis
+REDIS_CAPS_CONFIG = {
+    "ttl_s": REDIS_CAPS_TTL,
+    "backoff_initial_s": 1,
+    "backoff_max_s": REDIS_CAPS_BACKOFF_MAX
+}
+
 # Configuration des métriques
 METRICS_CONFIG = {
     "cache_ttl": METRICS_CACHE_TTL,
@@ -74,3 +148,221 @@ METRICS_CONFIG = {
     "node_exporter_port": NODE_EXPORTER_PORT,
     "node_exporter_timeout": NODE_EXPORTER_TIMEOUT
 }
+
+# Collecteur: boucle et pool de connexions keep-alive persistants
+COLLECTOR_CONFIG = {
+    # Par requête /metrics; un nœud ne dépasse jamais non plus la deadline du cycle
+    "timeout_s": NODE_EXPORTER_TIMEOUT,
+    "connect_timeout_s": NODE_EXPORTER_CONNECT_TIMEOUT,
+    "cycle_deadline_s": COLLECT_CYCLE_DEADLINE,
+    "max_connections": 256,
+    "keepalive_expiry_s": 30.0,
+    # Cœur compté saturé au-delà de ce % (cpu_cores_saturated)
+    "cpu_saturation_pct": 90.0,
+    # Service dédié (COLLECTOR_MODE=daemon): un minuteur par nœud, écritures par lots
+    "mode": COLLECTOR_MODE,
+    "interval_s": COLLECTOR_INTERVAL,
+    # +/- 10 % par tour: les nœuds ne restent pas synchronisés
+    "jitter": 0.1,
+    "flush_interval_s": 1.0,
+    "cpu_state": COLLECTOR_CPU_STATE,
+    "cpu_state_key": "collector:cpu_prev",
+    "leader_key": "collector:leader",
+    "leader_ttl_s": 10.0
+}
+
+# Echantillonnage adaptatif (web.core.adaptive_sampling)
+ADAPTIVE_SAMPLING_CONFIG = {
+    "enabled": ADAPTIVE_SAMPLING,
+    "min_interval_s": COLLECTOR_INTERVAL,
+    "max_interval_s": COLLECTOR_MAX_INTERVAL,
+    # Après 3 scrapes stables d'affilée, x1.5 par scrape stable: 5 s -> 60 s en ~9 scrapes
+    "growth": 1.5,
+    "stable_scrapes": 3,
+    # Variation entre deux scrapes (unités de la métrique) qui ramène à min_interval_s
+    "fast_change": {"cpu_usage": 5.0, "memory_usage": 5.0, "net_usage": 10.0, "psi_cpu": 5.0,
+                    "psi_io": 5.0, "load_per_core": 0.25},
+    # Ecart au dernier point écrit en dessous duquel l'historique n'est pas écrit
+    "dead_band": {"cpu_usage": 2.0, "memory_usage": 1.0, "disk_usage": 0.5, "temperature": 1.0,
+                  "net_usage": 2.0, "psi_cpu": 1.0, "psi_memory": 1.0, "psi_io": 1.0, "load1": 0.1},
+    # Un point au moins toutes les max_gap_s, même stable
+    "max_gap_s": HISTORY_MAX_GAP,
+    # Nœud avec un job "running" (store des jobs): intervalle minimal
+    "busy_from_jobs": True
+}
+
+# Réception des trames de l'agent de nœud (web.core.agent_ingest)
+AGENT_CONFIG = {
+    "enabled": AGENT_INGEST,
+    # UDP: service de collecte seulement (port d'écoute); le Stream sert aussi à la tâche beat
+    "udp": True,
+    "udp_host": "0.0.0.0",
+    "udp_port": AGENT_UDP_PORT,
+    # Trame UDP acceptée seulement depuis une adresse du nœud nommé (DNS mis en cache)
+    "resolve_ttl_s": 300.0,
+    "stream": "agent:metrics",
+    "stream_batch": 1000,
+    # Sans trame depuis stale_s, le nœud repasse au scrape node_exporter
+    "stale_s": AGENT_INTERVAL * 3
+}
+
+# Règles d'alerte (web.core.alert_rules): seuils, durée (for_s), variation (rate), absence de données,
+# écart à la ligne de base du nœud (anomaly).
+# Seuls les changements d'état (firing/resolved) sont publiés sur cluster:alerts
+MONITORING_CONFIG = {
+    "alert_rules": [
+        {"name": "high_cpu_avg", "scope": "cluster", "metric": "avg_cpu", "op": ">", "value": 90, "for_s": 30,
+         "message": "CPU moyenne élevée: {value:.1f}%"},
+        {"name": "high_memory_avg", "scope": "cluster", "metric": "avg_memory", "op": ">", "value": 90, "for_s": 30,
+         "message": "Mémoire moyenne élevée: {value:.1f}%"},
+        {"name": "high_cpu", "metric": "cpu_usage", "op": ">", "value": 95, "for_s": 60,
+         "message": "{node}: CPU très élevé ({value:.1f}%)"},
+        {"name": "high_memory", "metric": "memory_usage", "op": ">", "value": 95, "for_s": 60,
+         "message": "{node}: Mémoire très élevée ({value:.1f}%)"},
+        {"name": "high_disk", "metric": "disk_usage", "op": ">", "value": 90,
+         "message": "{node}: Disque presque plein ({value:.1f}%)"},
+        {"name": "high_temp", "metric": "temperature", "op": ">", "value": 80, "severity": "critical",
+         "message": "{node}: Température élevée ({value:.1f}°C)"},
+        # Mémoire qui monte de plus de 5 points par minute pendant 2 min (fuite, job qui dérape)
+        {"name": "memory_climb", "type": "rate", "metric": "memory_usage", "op": ">", "value": 5, "for_s": 120,
+         "message": "{node}: Mémoire en hausse rapide (+{value:.1f} %/min)"},
+        # Au-delà de 3 intervalles max de la cadence adaptative sans point
+        {"name": "node_absent", "type": "absent", "for_s": 3 * COLLECTOR_MAX_INTERVAL, "severity": "critical",
+         "message": "{node}: aucune métrique depuis {value:.0f} s"},
+        # Dérive lente par rapport au nœud lui-même (Pi qui chauffe, fuite mémoire), signalée bien
+        # avant high_temp/high_memory. Base sur ~1 jour (tau_s), score >= 5 pendant 5 min
+        {"name": "temperature_drift", "type": "anomaly", "metric": "temperature", "op": ">=", "value": 5,
+         "for_s": 300, "min_std": 0.5, "message": "{node}: Température anormale pour ce nœud (score {value:.1f})"},
+        {"name": "memory_drift", "type": "anomaly", "metric": "memory_usage", "op": ">=", "value": 5,
+         "for_s": 300, "min_std": 1.0, "message": "{node}: Mémoire anormale pour ce nœud (score {value:.1f})"}
+    ],
+    # Alertes actives (hash id -> JSON), lues par /api/monitoring/alerts
+    "alerts_key": "cluster:alerts:active"
+}
+
+# Métriques étendues des nœuds (charge, réseau, disque, PSI)
+NODE_METRICS_CONFIG = {
+    # Interfaces et disques ignorés (virtuels, ou doublons d'un disque physique)
+    "net_exclude": ("lo", "veth", "docker", "br-", "virbr", "cni", "flannel", "tun", "wg"),
+    "disk_exclude": ("loop", "ram", "zram", "dm-", "md"),
+    # Partitions (mmcblk0p2, nvme0n1p1, sda1): déjà comptées dans le disque entier
+    "disk_partition": r"^(mmcblk\d+p|nvme\d+n\d+p|[shv]d[a-z]+)\d+$",
+    "net_capacity_bps": NODE_NET_CAPACITY_MBPS * 1_000_000 / 8
+}
+
+# Scores du LoadBalancer (best_performance, network_headroom): poids par métrique, plus bas = mieux
+# active_jobs: points de score par job en cours sur le nœud (métriques en %,
+# un job pèse comme ~25 % de CPU), pour que les nœuds équivalents se partagent les jobs
+LOAD_BALANCER_WEIGHTS = {
+    "default": {"cpu_usage": 0.4, "memory_usage": 0.3, "response_time": 0.3, "active_jobs": 10.0},
+    # Scraping: limité par le réseau, puis par l'attente disque/CPU
+    "network": {"net_usage": 0.5, "psi_io": 0.15, "cpu_usage": 0.15, "memory_usage": 0.1, "response_time": 0.1,
+                "active_jobs": 10.0}
+}
+
+# Stratégie du dispatcher selon une capacité requise par la tâche
+DISPATCH_STRATEGIES = {
+    "scraping": "network_headroom"
+}
+
+# Configuration de l'exposition Prometheus
+PROMETHEUS_CONFIG = {
+    "recheck_s": PROMETHEUS_RECHECK_S
+}
+
+# Configuration du relais pub/sub WebSocket
+WS_PUBSUB_CONFIG = {
+    "channels": ["cluster:metrics", "cluster:health", "cluster:alerts", "celery:metrics", "celery:tasks"],
+    # Canaux d'état: seule la dernière trame compte, une rafale se réduit à un message
+    "coalesce_channels": ["cluster:metrics", "cluster:health", "celery:metrics"],
+    "queue_size": WS_PUBSUB_QUEUE_SIZE,
+    "client_max_backlog": WS_CLIENT_MAX_BACKLOG,
+    "backoff_initial_s": 0.5,
+    "backoff_max_s": WS_PUBSUB_BACKOFF_MAX,
+    "keyframe_every": WS_DELTA_KEYFRAME_EVERY
+}
+
+# Store SQLite des jobs (pool de connexions dans un exécuteur)
+JOB_STORE_CONFIG = {
+    "path": DATABASE_PATH,
+    "pool_size": JOB_STORE_POOL_SIZE,
+    "synchronous": JOB_STORE_SYNCHRONOUS,
+    "busy_timeout_ms": 5000,
+    "cache_size_kib": 16384,
+    "mmap_size": 64 * 1024 * 1024,
+    # Cache de requêtes préparées par connexion (sqlite3)
+    "cached_statements": 256
+}
+
+JOB_BUFFER_CONFIG = {
+    "flush_interval_ms": JOB_BUFFER_FLUSH_MS,
+    "max_pending": JOB_BUFFER_MAX_PENDING,
+    # Une mise à jour qui échoue autant de fois (seule dans sa transaction) est abandonnée
+    "max_attempts": 5
+}
+
+JOB_BULK_CONFIG = {
+    "max_jobs": JOB_BULK_MAX_JOBS,
+    "chunk_size": JOB_BULK_CHUNK_SIZE
+}
+
+JOB_RUNNER_CONFIG = {
+    "max_workers": JOB_RUNNER_WORKERS,
+    # Scraping: surtout de l'attente réseau; processing: travail bloquant en threads
+    "concurrency": {
+        "scraping": JOB_CONCURRENCY_SCRAPING,
+        "processing": JOB_CONCURRENCY_PROCESSING
+    },
+    "default_concurrency": JOB_CONCURRENCY_DEFAULT
+}
+
+# Files Celery: collect_metrics seule sur la sienne, le scraping (I/O) à part du reste
+CELERY_QUEUES = {
+    "default": os.getenv("CELERY_QUEUE_DEFAULT", "celery"),
+    "scraping": os.getenv("CELERY_QUEUE_SCRAPING", "scraping"),
+    "monitoring": os.getenv("CELERY_QUEUE_MONITORING", "monitoring")
+}
+
+# Profils de worker: pool, concurrence, files consommées. La file monitoring n'est
+# consommée que par un worker à un seul processus (solo, monitoring): l'état du
+# collecteur (taux CPU, cadence, agrégat, alertes) est propre au processus
+CELERY_WORKER_PROFILES = {
+    # Windows / dev: un seul worker sans pool, toutes les files
+    "solo": {"pool": "solo", "concurrency": 1, "queues": list(CELERY_QUEUES.values())},
+    # Worker Linux: un processus par cœur, tout sauf collect_metrics (lancer aussi le profil monitoring)
+    "prefork": {"pool": "prefork", "concurrency": os.cpu_count() or 2,
+                "queues": [CELERY_QUEUES["default"], CELERY_QUEUES["scraping"]]},
+    # Tâches CPU (file par défaut)
+    "cpu": {"pool": "prefork", "concurrency": os.cpu_count() or 2, "queues": [CELERY_QUEUES["default"]]},
+    # Scraping: surtout de l'attente réseau, beaucoup de tâches par processus
+    "io": {"pool": CELERY_IO_POOL, "concurrency": CELERY_IO_CONCURRENCY, "queues": [CELERY_QUEUES["scraping"]]},
+    # collect_metrics: une collecte à la fois, jamais derrière du scraping
+    "monitoring": {"pool": "prefork", "concurrency": 1, "queues": [CELERY_QUEUES["monitoring"]]}
+}
+
+
+def celery_worker_profile(name: str = None) -> Dict[str, Any]:
+    """Profil de worker demandé (ou CELERY_WORKER_PROFILE), concurrence forcée appliquée."""
+    name = name or CELERY_WORKER_PROFILE
+    if name == "auto":
+        name = "solo" if os.name == "nt" else "prefork"
+    if name not in CELERY_WORKER_PROFILES:
+        raise ValueError(f"Profil Celery inconnu: {name} ({', '.join(CELERY_WORKER_PROFILES)})")
+    profile = {"name": name, **CELERY_WORKER_PROFILES[name]}
+    # Concurrence forcée: jamais sur un worker qui consomme la file monitoring
+    if CELERY_WORKER_CONCURRENCY > 0 and CELERY_QUEUES["monitoring"] not in profile["queues"]:
+        profile["concurrency"] = CELERY_WORKER_CONCURRENCY
+    return profile
+
+# Mode multi-workers du serveur socket.io (manager Redis, présence, relais élu)
+WS_CLUSTER_CONFIG = {
+    "enabled": WS_WORKERS > 1,
+    "workers": WS_WORKERS,
+    "redis_url": os.getenv("WS_REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_METRICS_DB}"),
+    "manager_channel": "dispycluster:socketio",
+    "leader_key": "ws:relay:leader",
+    "leader_ttl_s": WS_LEADER_TTL,
+    "presence_prefix": "ws:presence:",
+    # Renouvellement du bail et de la présence: 3 fois par TTL
+    "heartbeat_s": WS_LEADER_TTL / 3
+}
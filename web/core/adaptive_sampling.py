@@ -0,0 +1,127 @@
+"""Cadence de collecte adaptative et compression par bande morte.
+
+AdaptiveCadence: intervalle de scrape par nœud, entre min_interval_s et
+max_interval_s. Une métrique suivie qui bouge vite (`fast_change`) ou un
+job en cours sur le nœud ramène l'intervalle au minimum; après
+`stable_scrapes` scrapes stables d'affilée, chaque scrape stable le
+multiplie par `growth` (un incident bruité reste à pleine cadence).
+
+DeadBand: un point ne part dans l'historique (liste, Stream, TimeSeries)
+que si une métrique suivie s'écarte du dernier point écrit d'au moins
+son seuil, ou après `max_gap_s` sans point. Les incidents gardent donc
+toute leur résolution, un nœud au repos un point de vie.
+"""
+
+import time
+from typing import Any, Dict, Iterable, Optional
+
+
+def _tracked(metrics: Dict[str, Any], keys: Iterable[str]) -> Dict[str, float]:
+    return {key: float(metrics[key]) for key in keys if metrics.get(key) is not None}
+
+
+def _moved(prev: Dict[str, float], current: Dict[str, float], thresholds: Dict[str, float]) -> bool:
+    """Vrai si une valeur a bougé d'au moins son seuil (ou vient d'apparaître)."""
+    for key, value in current.items():
+        old = prev.get(key)
+        if old is None or abs(value - old) >= thresholds[key]:
+            return True
+    return False
+
+
+class AdaptiveCadence:
+    """Intervalle de scrape par nœud selon la vitesse de variation de ses métriques."""
+
+    def __init__(self, min_interval_s: float = 5.0, max_interval_s: float = 60.0, growth: float = 1.5,
+                 stable_scrapes: int = 3, fast_change: Optional[Dict[str, float]] = None,
+                 enabled: bool = True, **_: Any) -> None:
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max(min_interval_s, max_interval_s)
+        self.growth = growth
+        self.stable_scrapes = stable_scrapes
+        self.fast_change = dict(fast_change or {})
+        self.enabled = enabled
+        self._last: Dict[str, Dict[str, float]] = {}
+        self._interval: Dict[str, float] = {}
+        self._due: Dict[str, float] = {}
+        self._stable: Dict[str, int] = {}
+
+    def observe(self, node: str, metrics: Dict[str, Any], busy: bool = False,
+                now: Optional[float] = None) -> float:
+        """Enregistre un scrape de node et rend l'intervalle avant le suivant."""
+        now = time.monotonic() if now is None else now
+        current = _tracked(metrics, self.fast_change)
+        prev = self._last.get(node)
+        self._last[node] = current
+        if not self.enabled or busy or prev is None or _moved(prev, current, self.fast_change):
+            self._stable[node] = 0
+            interval = self.min_interval_s
+        else:
+            stable = self._stable[node] = self._stable.get(node, 0) + 1
+            interval = self._interval.get(node, self.min_interval_s)
+            if stable >= self.stable_scrapes:
+                interval = min(self.max_interval_s, interval * self.growth)
+        self._interval[node] = interval
+        self._due[node] = now + interval
+        return interval
+
+    def is_due(self, node: str, now: Optional[float] = None, tolerance_s: float = 0.0) -> bool:
+        """Vrai si node est à scraper (jamais vu, ou échéance à tolerance_s près)."""
+        if not self.enabled:
+            return True
+        now = time.monotonic() if now is None else now
+        return now + tolerance_s >= self._due.get(node, 0.0)
+
+    def interval(self, node: str) -> float:
+        return self._interval.get(node, self.min_interval_s)
+
+    def wake(self, node: str) -> None:
+        """Remet node à l'intervalle minimal, échéance immédiate."""
+        self._interval[node] = self.min_interval_s
+        self._due[node] = 0.0
+        self._stable[node] = 0
+
+    def clear(self) -> None:
+        self._last.clear()
+        self._interval.clear()
+        self._due.clear()
+        self._stable.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        intervals = list(self._interval.values())
+        return {
+            "nodes": len(intervals),
+            "at_min": sum(1 for interval in intervals if interval <= self.min_interval_s),
+            "avg_interval_s": round(sum(intervals) / len(intervals), 2) if intervals else None,
+        }
+
+
+class DeadBand:
+    """Filtre des points d'historique: écrit seulement ce qui a bougé."""
+
+    def __init__(self, dead_band: Optional[Dict[str, float]] = None, max_gap_s: float = 300.0,
+                 enabled: bool = True, **_: Any) -> None:
+        self.thresholds = dict(dead_band or {})
+        self.max_gap_s = max_gap_s
+        self.enabled = enabled
+        self._stored: Dict[str, Dict[str, float]] = {}
+        self._stored_at: Dict[str, float] = {}
+        self.stats = {"stored": 0, "skipped": 0}
+
+    def should_store(self, node: str, metrics: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """Vrai si le point doit être écrit (et le retient comme dernier point écrit)."""
+        now = time.monotonic() if now is None else now
+        current = _tracked(metrics, self.thresholds)
+        prev = self._stored.get(node)
+        if (self.enabled and prev is not None and now - self._stored_at[node] < self.max_gap_s
+                and not _moved(prev, current, self.thresholds)):
+            self.stats["skipped"] += 1
+            return False
+        self._stored[node] = current
+        self._stored_at[node] = now
+        self.stats["stored"] += 1
+        return True
+
+    def clear(self) -> None:
+        self._stored.clear()
+        self._stored_at.clear()
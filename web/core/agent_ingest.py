@@ -0,0 +1,185 @@
+"""Réception des trames de l'agent de nœud (scripts/monitoring/node_agent.py).
+
+Trames msgpack [version, nœud, timestamp ms, valeurs...] reçues en UDP
+(service de collecte) ou lues dans le Stream Redis agent:metrics
+(service et tâche beat). Décoder = unpackb + zip sur AGENT_FIELDS, pas
+de parsing texte. Un nœud dont une trame est arrivée depuis moins de
+stale_s n'est pas scrapé sur node_exporter; sans trame, il y repasse.
+Seuls les nœuds connus (NODES) sont acceptés; en UDP, la trame doit en
+plus venir d'une adresse du nœud qu'elle nomme (résolution DNS mise en
+cache resolve_ttl_s), sans quoi n'importe quel hôte du réseau pourrait
+écrire les métriques d'un autre. Le Stream, lui, passe par l'accès Redis.
+"""
+
+import asyncio
+import socket
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import msgpack
+import redis.asyncio as aioredis
+
+from web.config.logging_config import get_logger
+from web.config.metrics_config import AGENT_CONFIG, REDIS_CONFIG
+
+logger = get_logger(__name__)
+
+AGENT_FRAME_VERSION = 1
+# Même ordre que FIELDS de l'agent (nouvelle version de trame si modifié)
+AGENT_FIELDS = (
+    "cpu_usage", "cpu_iowait", "cpu_steal", "cpu_cores", "cpu_core_max", "cpu_cores_saturated",
+    "memory_usage", "memory_total", "memory_available",
+    "disk_usage", "disk_total", "disk_available", "temperature",
+    "load1", "load5", "load15", "load_per_core",
+    "net_rx_bps", "net_tx_bps", "net_usage", "disk_read_bps", "disk_write_bps",
+    "psi_cpu", "psi_memory", "psi_io",
+)
+_FRAME_LEN = 3 + len(AGENT_FIELDS)
+
+
+def decode_frame(data: bytes) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(nœud, métriques) d'une trame, None si illisible ou d'une autre version."""
+    try:
+        frame = msgpack.unpackb(data)
+    except Exception:
+        return None
+    if (not isinstance(frame, list) or len(frame) != _FRAME_LEN or frame[0] != AGENT_FRAME_VERSION
+            or not isinstance(frame[1], str)):
+        return None
+    # Flottants simple précision: arrondis pour le cache JSON
+    metrics = {key: round(value, 3) for key, value in zip(AGENT_FIELDS, frame[3:]) if value is not None}
+    metrics.setdefault("temperature", None)
+    metrics["agent_ts"] = frame[2] / 1000
+    return frame[1], metrics
+
+
+def resolve_addresses(node: str) -> Tuple[str, ...]:
+    """Adresses IP d'un nom de nœud (vide si non résolu)."""
+    try:
+        return tuple({info[4][0] for info in socket.getaddrinfo(node, None, type=socket.SOCK_DGRAM)})
+    except OSError:
+        return ()
+
+
+class _AgentDatagrams(asyncio.DatagramProtocol):
+    def __init__(self, ingest: "AgentIngest") -> None:
+        self.ingest = ingest
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.ingest.receive(data, source=addr[0])
+
+
+class AgentIngest:
+    """Dernière trame par nœud, en attente d'écriture, et fraîcheur des agents."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 known_nodes: Optional[Callable[[], Iterable[str]]] = None,
+                 resolve: Callable[[str], Iterable[str]] = resolve_addresses) -> None:
+        self.config = {**AGENT_CONFIG, **(config or {})}
+        self._known_nodes = known_nodes
+        self._resolve = resolve
+        # Nœud -> (expiration, adresses): pas de DNS à chaque trame
+        self._addresses: Dict[str, Tuple[float, frozenset]] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._seen: Dict[str, float] = {}
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        # Client Stream (réponses brutes), lié à la boucle qui l'a créé
+        self._redis = None
+        self._redis_loop = None
+        self._last_id: Optional[str] = None
+        self.stats = {"frames": 0, "invalid": 0, "unknown_node": 0, "spoofed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config["enabled"])
+
+    def receive(self, data: bytes, source: Optional[str] = None) -> bool:
+        """Prend une trame brute; faux si illisible, d'un nœud inconnu ou d'une autre adresse.
+
+        source: adresse d'émission (UDP), comparée à celles du nœud nommé.
+        """
+        decoded = decode_frame(data)
+        if decoded is None:
+            self.stats["invalid"] += 1
+            return False
+        node, metrics = decoded
+        if self._known_nodes is not None and node not in self._known_nodes():
+            self.stats["unknown_node"] += 1
+            return False
+        if source is not None and not self._from_node(node, source):
+            self.stats["spoofed"] += 1
+            return False
+        self._pending[node] = metrics
+        self._seen[node] = time.monotonic()
+        self.stats["frames"] += 1
+        return True
+
+    def _from_node(self, node: str, source: str) -> bool:
+        """Vrai si source est une adresse de node."""
+        # Socket IPv6 double pile: adresse IPv4 vue comme ::ffff:a.b.c.d
+        if source.startswith("::ffff:"):
+            source = source[7:]
+        now = time.monotonic()
+        cached = self._addresses.get(node)
+        if cached is None or cached[0] <= now:
+            cached = (now + self.config["resolve_ttl_s"], frozenset(self._resolve(node)))
+            self._addresses[node] = cached
+        return source in cached[1]
+
+    def is_live(self, node: str, now: Optional[float] = None) -> bool:
+        """Vrai si l'agent de node a envoyé une trame depuis moins de stale_s."""
+        seen = self._seen.get(node)
+        if seen is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - seen < self.config["stale_s"]
+
+    def drain(self) -> Dict[str, Dict[str, Any]]:
+        """Trames reçues depuis le dernier appel (une par nœud, la plus récente)."""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    async def start_udp(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _AgentDatagrams(self), local_addr=(self.config["udp_host"], self.config["udp_port"]))
+        logger.info(f"Agents de nœud: écoute UDP {self.config['udp_host']}:{self.config['udp_port']}")
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = aioredis.Redis(**{**REDIS_CONFIG, "decode_responses": False})
+            self._redis_loop = loop
+        return self._redis
+
+    async def poll_stream(self) -> int:
+        """Lit les trames arrivées dans le Stream depuis la dernière lecture; rend leur nombre."""
+        if self._last_id is None:
+            # Premier appel: trames encore fraîches seulement
+            self._last_id = f"{int((time.time() - self.config['stale_s']) * 1000)}-0"
+        client = self._client()
+        count = self.config["stream_batch"]
+        received = 0
+        while True:
+            entries = await client.xread({self.config["stream"]: self._last_id}, count=count)
+            messages = entries[0][1] if entries else []
+            for message_id, fields in messages:
+                self._last_id = message_id
+                frame = fields.get(b"f")
+                if frame is not None and self.receive(frame):
+                    received += 1
+            if len(messages) < count:
+                return received
+
+    async def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        client, self._redis = self._redis, None
+        if client is not None and self._redis_loop is asyncio.get_running_loop():
+            await client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {**self.stats, "live": sum(1 for node in self._seen if self.is_live(node, now)),
+                "udp": self._transport is not None}
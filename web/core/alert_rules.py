@@ -0,0 +1,257 @@
+"""Moteur d'alertes déclaratif (règles de MONITORING_CONFIG["alert_rules"]).
+
+Règle = dict: name, type (threshold, rate, absent, anomaly), scope
+(node ou cluster), metric, op, value, for_s, severity, message. Exemples:
+
+    {"name": "high_temp", "metric": "temperature", "op": ">", "value": 80}
+    {"name": "memory_climb", "type": "rate", "metric": "memory_usage", "value": 5, "for_s": 120}
+    {"name": "node_absent", "type": "absent", "for_s": 180}
+    {"name": "temperature_drift", "type": "anomaly", "metric": "temperature", "op": ">=", "value": 5}
+
+- threshold: la valeur courante comparée à value.
+- rate: variation par minute depuis le point précédent du même nœud.
+- absent: aucun point du nœud depuis for_s secondes.
+- anomaly: score médiane/MAD de la série du nœud contre sa ligne de
+  base (web.core.anomaly; réglages optionnels tau_s, fast_tau_s, min_std,
+  warmup).
+- scope cluster: metric lue dans cluster_stats (chemin pointé, ex.
+  "distribution.cpu_usage.p90").
+
+Chaque (règle, nœud) a son état: inactive -> pending (condition vraie,
+attente de for_s) -> firing -> resolved. Seul un nœud qui reçoit un
+point est réévalué; les transitions firing/resolved sont rendues à
+l'appelant, qui ne publie que celles-là.
+"""
+
+import operator
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from web.core.anomaly import MadScore
+
+OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+RULE_TYPES = ("threshold", "rate", "absent", "anomaly")
+CLUSTER = "cluster"
+
+
+def _lookup(data: Dict[str, Any], path: str) -> Optional[float]:
+    """Valeur d'un chemin pointé (distribution.cpu_usage.p90), None si absente."""
+    for part in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data if isinstance(data, (int, float)) and not isinstance(data, bool) else None
+
+
+class AlertRule:
+    """Une règle validée."""
+
+    def __init__(self, name: str, type: str = "threshold", scope: str = "node", metric: Optional[str] = None,
+                 op: str = ">", value: float = 0.0, for_s: float = 0.0, severity: str = "warning",
+                 message: Optional[str] = None, **detector: float) -> None:
+        if type not in RULE_TYPES:
+            raise ValueError(f"Règle {name}: type inconnu {type} ({', '.join(RULE_TYPES)})")
+        if op not in OPS:
+            raise ValueError(f"Règle {name}: opérateur inconnu {op}")
+        if scope not in ("node", CLUSTER) or (type in ("absent", "anomaly") and scope != "node"):
+            raise ValueError(f"Règle {name}: scope invalide {scope}")
+        if detector and type != "anomaly":
+            raise ValueError(f"Règle {name}: paramètres inconnus {', '.join(detector)}")
+        if type != "absent" and not metric:
+            raise ValueError(f"Règle {name}: metric requise")
+        self.name = name
+        self.type = type
+        self.scope = scope
+        self.metric = metric
+        self.op = op
+        self.value = value
+        self.for_s = for_s
+        self.severity = severity
+        self.message = message
+        # Réglages du détecteur (anomaly): tau_s, fast_tau_s, min_std, warmup
+        self.detector = detector
+        if type == "anomaly":
+            try:
+                MadScore(**detector)
+            except TypeError as e:
+                raise ValueError(f"Règle {name}: {e}") from None
+
+    def check(self, value: Optional[float]) -> bool:
+        return value is not None and OPS[self.op](value, self.value)
+
+    def format(self, key: str, value: Optional[float]) -> str:
+        value = 0.0 if value is None else value
+        if self.message:
+            return self.message.format(node=key, value=value)
+        if self.type == "absent":
+            return f"{key}: aucune métrique depuis {value:.0f} s"
+        if self.type == "anomaly":
+            return f"{key}: {self.metric} anormal (score {value:.1f})"
+        label = f"{self.metric}/min" if self.type == "rate" else self.metric
+        return f"{key}: {label} {self.op} {self.value} ({value:.1f})"
+
+
+def load_rules(configs: Iterable[Dict[str, Any]]) -> List[AlertRule]:
+    """Règles de la configuration (ValueError si une règle est invalide ou en double)."""
+    rules = [AlertRule(**config) for config in configs]
+    names = [rule.name for rule in rules]
+    if len(names) != len(set(names)):
+        raise ValueError("Noms de règles d'alerte en double")
+    return rules
+
+
+class _AlertState:
+    __slots__ = ("since", "since_ts", "value", "firing")
+
+    def __init__(self, since: float, since_ts: float, value: Optional[float], firing: bool = False) -> None:
+        self.since = since
+        self.since_ts = since_ts
+        self.value = value
+        self.firing = firing
+
+
+class AlertEngine:
+    """Etat des règles par nœud; rend les transitions firing/resolved."""
+
+    def __init__(self, rules: Iterable[Dict[str, Any]]) -> None:
+        self.rules = load_rules(rules)
+        self._node_rules = [rule for rule in self.rules if rule.scope == "node" and rule.type != "absent"]
+        self._cluster_rules = [rule for rule in self.rules if rule.scope == CLUSTER]
+        self._absent_rules = [rule for rule in self.rules if rule.type == "absent"]
+        self._states: Dict[Tuple[str, str], _AlertState] = {}
+        # Point précédent (instant, valeur) des règles rate, par (règle, nœud)
+        self._prev: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        # Ligne de base des règles anomaly, par (règle, nœud)
+        self._detectors: Dict[Tuple[str, str], MadScore] = {}
+        self._last_seen: Dict[str, float] = {}
+        # Alertes actives rechargées une fois (processus qui démarre)
+        self.restored = False
+
+    def observe(self, node: str, metrics: Dict[str, Any], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Nouveau point de node: réévalue ses règles."""
+        now = time.monotonic() if now is None else now
+        self._last_seen[node] = now
+        return self._evaluate(self._node_rules, node, metrics, now)
+
+    def observe_cluster(self, stats: Dict[str, Any], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Nouvel agrégat (cluster_stats): réévalue les règles du cluster."""
+        now = time.monotonic() if now is None else now
+        return self._evaluate(self._cluster_rules, CLUSTER, stats, now)
+
+    def check_absent(self, nodes: Iterable[str], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Règles absent sur nodes (un nœud jamais vu compte à partir du premier appel)."""
+        if not self._absent_rules:
+            return []
+        now = time.monotonic() if now is None else now
+        transitions = []
+        for node in nodes:
+            silence = now - self._last_seen.setdefault(node, now)
+            for rule in self._absent_rules:
+                transition = self._step(rule, node, silence >= rule.for_s, silence, now, hold_s=0.0)
+                if transition:
+                    transitions.append(transition)
+        return transitions
+
+    def _evaluate(self, rules: List[AlertRule], key: str, metrics: Dict[str, Any], now: float) -> List[Dict[str, Any]]:
+        transitions = []
+        for rule in rules:
+            value = _lookup(metrics, rule.metric)
+            if rule.type == "rate":
+                value = self._rate(rule, key, value, now)
+                if value is None:
+                    # Premier point: pas de variation, état inchangé
+                    continue
+            elif rule.type == "anomaly":
+                value = self._score(rule, key, value, now)
+                if value is None:
+                    # Préchauffage de la ligne de base: état inchangé
+                    continue
+            transition = self._step(rule, key, rule.check(value), value, now, hold_s=rule.for_s)
+            if transition:
+                transitions.append(transition)
+        return transitions
+
+    def _rate(self, rule: AlertRule, key: str, value: Optional[float], now: float) -> Optional[float]:
+        if value is None:
+            return None
+        prev = self._prev.get((rule.name, key))
+        self._prev[(rule.name, key)] = (now, value)
+        if prev is None or now <= prev[0]:
+            return None
+        return (value - prev[1]) / (now - prev[0]) * 60
+
+    def _score(self, rule: AlertRule, key: str, value: Optional[float], now: float) -> Optional[float]:
+        if value is None:
+            return None
+        detector = self._detectors.get((rule.name, key))
+        if detector is None:
+            detector = self._detectors[(rule.name, key)] = MadScore(**rule.detector)
+        return detector.update(value, now)
+
+    def _step(self, rule: AlertRule, key: str, active: bool, value: Optional[float], now: float,
+              hold_s: float) -> Optional[Dict[str, Any]]:
+        state_key = (rule.name, key)
+        state = self._states.get(state_key)
+        if active:
+            if state is None:
+                state = self._states[state_key] = _AlertState(now, time.time(), value)
+            state.value = value
+            if not state.firing and now - state.since >= hold_s:
+                state.firing = True
+                return self._alert(rule, key, state, "firing")
+            return None
+        if state is None:
+            return None
+        del self._states[state_key]
+        return self._alert(rule, key, state, "resolved") if state.firing else None
+
+    def _alert(self, rule: AlertRule, key: str, state: _AlertState, status: str) -> Dict[str, Any]:
+        return {
+            "id": rule.name if key == CLUSTER else f"{rule.name}:{key}",
+            "rule": rule.name,
+            "node": None if key == CLUSTER else key,
+            "state": status,
+            # "type": sévérité, lue par le tableau de bord
+            "type": rule.severity,
+            "severity": rule.severity,
+            "value": round(state.value, 2) if state.value is not None else None,
+            "message": rule.format(key, state.value),
+            "since": datetime.fromtimestamp(state.since_ts, timezone.utc).isoformat(),
+        }
+
+    def active(self) -> List[Dict[str, Any]]:
+        """Alertes en cours (firing), les plus anciennes d'abord."""
+        rules = {rule.name: rule for rule in self.rules}
+        firing = [(key, state) for key, state in self._states.items() if state.firing and key[0] in rules]
+        firing.sort(key=lambda item: item[1].since_ts)
+        return [self._alert(rules[name], node, state, "firing") for (name, node), state in firing]
+
+    def restore(self, alerts: Iterable[Dict[str, Any]], now: Optional[float] = None) -> int:
+        """Reprend des alertes actives publiées (firing) pour ne pas les redéclencher."""
+        now = time.monotonic() if now is None else now
+        rules = {rule.name: rule for rule in self.rules}
+        loaded = 0
+        for alert in alerts:
+            name = alert.get("rule")
+            if name not in rules:
+                continue
+            try:
+                since_ts = datetime.fromisoformat(alert["since"]).timestamp()
+            except (KeyError, TypeError, ValueError):
+                since_ts = time.time()
+            key = alert.get("node") or CLUSTER
+            self._states[(name, key)] = _AlertState(now, since_ts, alert.get("value"), firing=True)
+            if rules[name].type == "absent":
+                # Nœud toujours muet: pas de résolution au premier check_absent
+                self._last_seen.setdefault(key, now - rules[name].for_s)
+            loaded += 1
+        self.restored = True
+        return loaded
+
+    def clear(self) -> None:
+        self._states.clear()
+        self._prev.clear()
+        self._detectors.clear()
+        self._last_seen.clear()
+        self.restored = False
@@ -0,0 +1,69 @@
+"""Détection d'anomalies en flux: score robuste d'une série contre sa propre ligne de base.
+
+MadScore tient, pour une série (nœud x métrique), une médiane et un MAD
+lents (ligne de base, constante de temps tau_s) et une médiane rapide
+(fast_tau_s), estimés par approximation stochastique: chaque point
+déplace l'estimation d'un pas fixe vers lui, quelle que soit son
+amplitude. Un job de quelques minutes (+6 °C, +15 % de mémoire) ne
+pousse donc ni la base ni l'échelle, alors qu'une moyenne/variance EWMA
+en sort gonflée et rate ensuite la dérive. Score = (rapide - base) /
+(1.4826 x MAD): une dérive lente (Pi qui chauffe, fuite mémoire) le fait
+monter bien avant un seuil fixe. Une dérive plus lente que la base
+(tau_s, un jour par défaut) ou un changement de niveau durable finit
+par être appris: le seuil fixe reste le filet de sécurité. Les pas
+dépendent du temps écoulé, pas du nombre de points (la cadence
+adaptative espace les scrapes). Mémoire O(1): cinq nombres par série,
+pas d'historique.
+"""
+
+import math
+from typing import Optional
+
+# MAD -> écart-type pour un bruit gaussien
+MAD_SCALE = 1.4826
+
+
+def _sign(diff: float) -> int:
+    return (diff > 0) - (diff < 0)
+
+
+class MadScore:
+    """Score médiane/MAD d'une série; None pendant le préchauffage."""
+
+    __slots__ = ("tau_s", "fast_tau_s", "min_std", "warmup", "median", "mad", "fast", "count", "last")
+
+    def __init__(self, tau_s: float = 86400.0, fast_tau_s: float = 600.0, min_std: float = 1.0,
+                 warmup: int = 20) -> None:
+        self.tau_s = tau_s
+        self.fast_tau_s = fast_tau_s
+        # Plancher de l'écart-type: une série plate ne donne pas de score énorme au moindre mouvement
+        self.min_std = min_std
+        self.warmup = warmup
+        self.median = 0.0
+        self.mad = 0.0
+        self.fast = 0.0
+        self.count = 0
+        self.last = 0.0
+
+    def update(self, value: float, now: float) -> Optional[float]:
+        """Ajoute un point (instant now, en secondes) et rend le score."""
+        if self.count == 0:
+            self.median = self.fast = value
+            self.mad = self.min_std / MAD_SCALE
+            self.count, self.last = 1, now
+            return None
+        elapsed = max(0.0, now - self.last)
+        self.last = now
+        std = max(MAD_SCALE * self.mad, self.min_std)
+        # Score contre la base d'avant ce point (le point ne se juge pas lui-même)
+        score = (self.fast - self.median) / std
+        alpha = 1 - math.exp(-elapsed / self.tau_s)
+        if self.count < 10 * self.warmup:
+            # Premiers points: pas plus grands pour trouver le niveau de la série
+            alpha = max(alpha, 1 / (self.count + 1))
+        self.fast += (1 - math.exp(-elapsed / self.fast_tau_s)) * std * _sign(value - self.fast)
+        # Pas fixe: sans plancher, le MAD passerait sous 0 et oscillerait autour de min_std
+        self.mad = max(0.0, self.mad + alpha * std * (1 if abs(value - self.median) > self.mad else -1))
+        self.median += alpha * std * _sign(value - self.median)
+        self.count += 1
+        return score if self.count > self.warmup else None
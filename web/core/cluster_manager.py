@@ -11,6 +11,7 @@ from pathlib import Path
 import yaml
 import os
 from web.config.logging_config import get_logger
+from web.core.cpu_counters import CPU_METRIC, CpuRateEngine, parse_cpu_sample
 
 # Configuration du logger
 logger = get_logger(__name__)
@@ -46,8 +47,8 @@ class ClusterManager:
         self._simulate_nodes: bool = os.getenv("WEB_SIMULATE_NODES", "1") in ("1", "true", "True")
         self.node_metrics: Dict[str, Dict] = {}
         self.last_update: Dict[str, datetime] = {}
-        # Stockage pour calculer l'utilisation CPU à partir des compteurs node_exporter
-        self._cpu_prev: Dict[str, Dict[str, float]] = {}
+        # Compteurs node_exporter du scrape précédent, pour calculer l'utilisation CPU
+        self._cpu_rates = CpuRateEngine()
 
     def set_nodes(self, nodes: List[str]) -> None:
         """Met à jour la liste des nœuds et préserve les statuts connus."""
@@ -179,34 +180,24 @@ class ClusterManager:
     def _parse_exporter_metrics(self, node: str, metrics_text: str) -> (float, float):
         """Calcule CPU% et MEM% à partir des métriques node_exporter.
 
-        CPU% est estimé via la variation des compteurs node_cpu_seconds_total sur toutes les CPUs
-        entre deux scrapes. Si pas d'échantillon précédent, retourne 0.0 et enregistre l'état.
+        CPU% est estimé via la variation des compteurs node_cpu_seconds_total (tous les cœurs,
+        tous les modes) entre deux scrapes. Si pas d'échantillon précédent, retourne 0.0 et
+        enregistre l'état.
 
         MEM% est calculé via 1 - MemAvailable / MemTotal.
         """
-        total_by_mode = {}
+        cpu_samples = []
         mem_total = None
         mem_avail = None
 
         for line in metrics_text.splitlines():
             if not line or line.startswith('#'):
                 continue
-            if line.startswith('node_cpu_seconds_total'):
+            if line.startswith(CPU_METRIC):
                 # Exemple: node_cpu_seconds_total{cpu="0",mode="idle"} 1.234
-                try:
-                    parts = line.split('}')
-                    labels = parts[0]
-                    value = float(parts[1].strip())
-                    # extraire mode="..."
-                    if 'mode="' in labels:
-                        mstart = labels.index('mode="') + 6
-                        mend = labels.index('"', mstart)
-                        mode = labels[mstart:mend]
-                    else:
-                        mode = 'unknown'
-                    total_by_mode[mode] = total_by_mode.get(mode, 0.0) + value
-                except Exception:
-                    continue
+                sample = parse_cpu_sample(line)
+                if sample is not None:
+                    cpu_samples.append(sample)
             elif line.startswith('node_memory_MemTotal_bytes'):
                 try:
                     mem_total = float(line.split(' ')[-1])
@@ -224,18 +215,8 @@ class ClusterManager:
             mem_usage = max(0.0, min(100.0, (1.0 - (mem_avail / mem_total)) * 100.0))
 
         # CPU
-        now_total = sum(total_by_mode.values()) if total_by_mode else None
-        now_idle = total_by_mode.get('idle', None)
-        cpu_usage = 0.0
-        if now_total is not None and now_idle is not None:
-            prev = self._cpu_prev.get(node)
-            if prev:
-                dt_total = now_total - prev.get('total', 0.0)
-                dt_idle = now_idle - prev.get('idle', 0.0)
-                if dt_total > 0:
-                    cpu_usage = max(0.0, min(100.0, (1.0 - (dt_idle / dt_total)) * 100.0))
-            # MàJ état précédent
-            self._cpu_prev[node] = {'total': now_total, 'idle': now_idle}
+        rates = self._cpu_rates.update(node, cpu_samples)
+        cpu_usage = max(0.0, min(100.0, rates["cpu_usage"])) if rates else 0.0
 
         return cpu_usage, mem_usage
 
@@ -0,0 +1,103 @@
+"""Agrégat du cluster calculé en mémoire (numpy), sans relire Redis.
+
+ClusterSnapshot garde les dernières métriques écrites de chaque nœud;
+un nœud est en ligne tant que son dernier point a moins de ttl_s (même
+règle que l'expiration de metrics:<nœud>). Moyenne, p50, p90 et max
+sont calculés d'un bloc sur la matrice nœuds x métriques; une valeur
+absente (pas de sonde de température, premier scrape sans taux CPU)
+est ignorée au lieu de compter pour 0.
+"""
+
+import json
+import time
+import warnings
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Métriques résumées dans cluster_stats["distribution"]
+AGGREGATE_FIELDS = ("cpu_usage", "memory_usage", "disk_usage", "temperature", "net_usage", "load_per_core")
+
+
+def _value(metrics: Dict[str, Any], field: str) -> Optional[float]:
+    # cpu_usage à 0 sans cpu_cores: premier scrape du nœud, pas encore de taux
+    if field == "cpu_usage" and "cpu_cores" not in metrics:
+        return None
+    return metrics.get(field)
+
+
+class ClusterSnapshot:
+    """Dernier point de chaque nœud et résumé statistique du cluster."""
+
+    def __init__(self, ttl_s: float, fields: Tuple[str, ...] = AGGREGATE_FIELDS) -> None:
+        self.ttl_s = ttl_s
+        self.fields = fields
+        self._latest: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # Rechargé une fois depuis le cache Redis (processus qui démarre)
+        self.seeded = False
+
+    def update(self, node: str, metrics: Dict[str, Any], now: Optional[float] = None) -> None:
+        self._latest[node] = (time.monotonic() if now is None else now, metrics)
+
+    def seed(self, nodes: Iterable[str], values: List[Optional[str]], now: Optional[float] = None) -> int:
+        """Complète avec les valeurs JSON du cache (MGET sur nodes); rend le nombre de nœuds repris."""
+        now = time.monotonic() if now is None else now
+        loaded = 0
+        for node, raw in zip(nodes, values):
+            if raw and node not in self._latest:
+                try:
+                    self._latest[node] = (now, json.loads(raw))
+                except ValueError:
+                    continue
+                loaded += 1
+        self.seeded = True
+        return loaded
+
+    def online(self, nodes: Iterable[str], now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Métriques des nœuds de nodes vus depuis moins de ttl_s."""
+        now = time.monotonic() if now is None else now
+        online = {}
+        for node in nodes:
+            entry = self._latest.get(node)
+            if entry is not None and now - entry[0] < self.ttl_s:
+                online[node] = entry[1]
+        return online
+
+    def aggregate(self, nodes: List[str], now: Optional[float] = None) -> Dict[str, Any]:
+        """Document cluster:metrics: nœuds en ligne et statistiques du cluster."""
+        online = self.online(nodes, now)
+        stats: Dict[str, Any] = {
+            "total_nodes": len(nodes),
+            "online_nodes": len(online),
+            "avg_cpu": 0,
+            "avg_memory": 0,
+            "avg_temperature": 0,
+            "distribution": {},
+        }
+        if online:
+            distribution = self._distribution(online.values())
+            stats["distribution"] = distribution
+            stats["avg_cpu"] = distribution.get("cpu_usage", {}).get("mean", 0)
+            stats["avg_memory"] = distribution.get("memory_usage", {}).get("mean", 0)
+            stats["avg_temperature"] = distribution.get("temperature", {}).get("mean", 0)
+        return {"timestamp": datetime.utcnow().isoformat(), "nodes": online, "cluster_stats": stats}
+
+    def _distribution(self, metrics: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+        # None -> NaN, ignoré par les fonctions nan*
+        values = np.array([[_value(m, field) for field in self.fields] for m in metrics], dtype=float)
+        with warnings.catch_warnings():
+            # Colonne sans aucune valeur (aucune sonde): NaN, écartée plus bas
+            warnings.simplefilter("ignore", RuntimeWarning)
+            means = np.nanmean(values, axis=0)
+            p50, p90 = np.nanpercentile(values, [50, 90], axis=0)
+            maxes = np.nanmax(values, axis=0)
+        return {
+            field: {"mean": round(float(means[i]), 2), "p50": round(float(p50[i]), 2),
+                    "p90": round(float(p90[i]), 2), "max": round(float(maxes[i]), 2)}
+            for i, field in enumerate(self.fields) if not np.isnan(means[i])
+        }
+
+    def clear(self) -> None:
+        self._latest.clear()
+        self.seeded = False
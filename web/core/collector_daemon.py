@@ -0,0 +1,232 @@
+"""Service de collecte node_exporter, hors Celery (python -m web.collector).
+
+Chaque nœud a son propre minuteur (intervalle +/- jitter, départs étalés
+sur le premier intervalle): pas de rafale de N requêtes toutes les 5 s
+ni de cycle retardé par le nœud le plus lent. L'intervalle suit la
+cadence adaptative (AdaptiveCadence): court quand le nœud bouge ou a un
+job en cours, jusqu'à max_interval_s quand il est stable. Les dernières métriques de
+chaque nœud s'accumulent et partent par lots (store_metrics_batch) toutes
+les `flush_interval_s` secondes, dans un thread.
+
+Avec AGENT_INGEST=1, les nœuds équipés de l'agent poussé
+(scripts/monitoring/node_agent.py) envoient leurs trames en UDP ou dans
+le Stream agent:metrics: elles rejoignent le lot suivant et le nœud
+n'est plus scrapé tant que ses trames arrivent.
+
+Un seul service collecte à la fois: bail Redis (LeaderLease). Les
+compteurs CPU restent dans le process; avec cpu_state="redis" ils sont
+aussi copiés dans un hash et rechargés par le leader suivant.
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as aioredis
+
+from web.config.logging_config import get_logger
+from web.config.metrics_config import ADAPTIVE_SAMPLING_CONFIG, COLLECTOR_CONFIG, REDIS_CONFIG
+from web.core.adaptive_sampling import AdaptiveCadence
+from web.core.agent_ingest import AgentIngest
+from web.core.collector_loop import new_http_client
+from web.core.ws_cluster import LeaderLease, worker_id
+from web.tasks import monitoring
+
+logger = get_logger(__name__)
+
+
+class CollectorDaemon:
+    """Collecte par nœud, écritures par lots, un seul leader."""
+
+    def __init__(self, nodes: Optional[List[str]] = None, config: Optional[Dict[str, Any]] = None,
+                 client=None, sampling: Optional[Dict[str, Any]] = None,
+                 agents: Optional[Dict[str, Any]] = None) -> None:
+        self.config = {**COLLECTOR_CONFIG, **(config or {})}
+        self.cadence = AdaptiveCadence(**{**ADAPTIVE_SAMPLING_CONFIG, "min_interval_s": self.config["interval_s"],
+                                          **(sampling or {})})
+        # Nœuds avec un job en cours (relus à chaque lot) et réveil de leur minuteur
+        self._busy: set = set()
+        self._wake: Dict[str, asyncio.Event] = {}
+        self._nodes = nodes
+        # Trames acceptées pour les nœuds collectés (ceux qui ont un minuteur)
+        self.agents = AgentIngest(agents, known_nodes=lambda: self._wake)
+        self.redis = client if client is not None else aioredis.Redis(**REDIS_CONFIG)
+        self.lease = LeaderLease(self.config["leader_key"], worker_id(), self.config["leader_ttl_s"],
+                                 client=self.redis)
+        self._http = None
+        self._node_tasks: Dict[str, asyncio.Task] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._active = False
+        # Dernières métriques par nœud, pas encore écrites
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"scrapes": 0, "failures": 0, "flushes": 0, "written": 0}
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._nodes if self._nodes is not None else monitoring.NODES)
+
+    @property
+    def scraping(self) -> bool:
+        return bool(self._node_tasks)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Tourne jusqu'à stop: prend ou garde le bail, collecte tant qu'il est leader."""
+        heartbeat = self.config["leader_ttl_s"] / 3
+        try:
+            while not stop.is_set():
+                try:
+                    leader = await self.lease.acquire_or_renew()
+                except Exception as e:
+                    logger.warning(f"Bail du collecteur indisponible: {e}")
+                    leader = False
+                if leader and not self.scraping:
+                    logger.info(f"Collecteur leader ({self.lease.owner}): {len(self.nodes)} nœuds")
+                    await self.start()
+                elif not leader and self.scraping:
+                    logger.warning("Bail du collecteur perdu: arrêt de la collecte")
+                    await self.stop()
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.stop()
+            await self.lease.release()
+
+    async def start(self) -> None:
+        if self.config["cpu_state"] == "redis":
+            await self._load_cpu_state()
+        self._http = new_http_client(**self.config)
+        self._active = True
+        nodes = self.nodes
+        interval = self.config["interval_s"]
+        self._wake = {node: asyncio.Event() for node in nodes}
+        if self.agents.enabled and self.agents.config["udp"]:
+            try:
+                await self.agents.start_udp()
+            except OSError as e:
+                logger.warning(f"Ecoute UDP des agents impossible (Stream seulement): {e}")
+        for i, node in enumerate(nodes):
+            # Départs étalés sur le premier intervalle
+            offset = interval * i / max(1, len(nodes))
+            self._node_tasks[node] = asyncio.create_task(self._scrape_loop(node, offset), name=f"collect:{node}")
+        self._flusher = asyncio.create_task(self._flush_loop(), name="collect:flush")
+
+    async def stop(self) -> None:
+        self._active = False
+        tasks = list(self._node_tasks.values())
+        if self._flusher is not None:
+            tasks.append(self._flusher)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._node_tasks.clear()
+        self._flusher = None
+        await self.agents.close()
+        if self._pending:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Dernier lot de métriques non écrit: {e}")
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _scrape_loop(self, node: str, offset: float) -> None:
+        jitter = self.config["jitter"]
+        loop = asyncio.get_running_loop()
+        wake = self._wake[node]
+        await asyncio.sleep(offset)
+        # wait_for (3.11) peut absorber une annulation: _active arrête aussi la boucle
+        while self._active:
+            started = loop.time()
+            if self.agents.is_live(node):
+                # Nœud servi par son agent: pas de scrape, revérifié à l'intervalle minimal
+                interval = self.cadence.min_interval_s
+            else:
+                result = await monitoring._collect_node_metrics(self._http, node)
+                self.stats["scrapes"] += 1
+                if result and result.get("metrics"):
+                    self._pending[node] = result["metrics"]
+                    interval = self.cadence.observe(node, result["metrics"], busy=node in self._busy)
+                else:
+                    self.stats["failures"] += 1
+                    interval = self.cadence.min_interval_s
+            delay = interval * (1 + random.uniform(-jitter, jitter)) - (loop.time() - started)
+            # Un job qui démarre sur le nœud raccourcit l'attente (réveil par _refresh_busy)
+            wake.clear()
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=max(0.0, delay))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config["flush_interval_s"])
+            if self.agents.enabled:
+                try:
+                    await self.agents.poll_stream()
+                except Exception as e:
+                    logger.warning(f"Stream des agents de nœud non lu: {e}")
+            try:
+                await self._refresh_busy()
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ecriture du lot de métriques échouée: {e}")
+
+    async def flush(self) -> int:
+        """Ecrit les métriques en attente (un lot) et l'état CPU des nœuds concernés."""
+        # Trame d'agent plus récente qu'un scrape éventuel du même nœud
+        batch, self._pending = {**self._pending, **self.agents.drain()}, {}
+        if not batch:
+            # Aucun nœud n'a répondu: les règles d'alerte d'absence tournent quand même
+            await asyncio.to_thread(monitoring.evaluate_alerts)
+            return 0
+        started = time.perf_counter()
+        written = await asyncio.to_thread(monitoring.store_metrics_batch, batch)
+        await asyncio.to_thread(monitoring._record_collector_run, time.perf_counter() - started, written, True)
+        self.stats["flushes"] += 1
+        self.stats["written"] += written
+        if self.config["cpu_state"] == "redis":
+            await self._save_cpu_state(batch)
+        return written
+
+    async def _refresh_busy(self) -> None:
+        busy = await monitoring.busy_nodes()
+        for node in busy - self._busy:
+            # Job démarré: scrape au prochain tour, puis intervalle minimal
+            if node in self._wake and self.cadence.interval(node) > self.cadence.min_interval_s:
+                self.cadence.wake(node)
+                self._wake[node].set()
+        self._busy = busy
+
+    async def _load_cpu_state(self) -> None:
+        try:
+            state = await self.redis.hgetall(self.config["cpu_state_key"])
+        except Exception as e:
+            logger.warning(f"Etat CPU du collecteur non rechargé: {e}")
+            return
+        monitoring.cpu_rates.restore(state)
+
+    async def _save_cpu_state(self, nodes) -> None:
+        state = monitoring.cpu_rates.export(nodes)
+        if not state:
+            return
+        try:
+            await self.redis.hset(self.config["cpu_state_key"], mapping=state)
+        except Exception as e:
+            logger.warning(f"Etat CPU du collecteur non sauvegardé: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "leader": self.lease.is_leader,
+            "owner": self.lease.owner,
+            "nodes": len(self._node_tasks),
+            "pending": len(self._pending),
+            "busy": len(self._busy),
+            "cadence": self.cadence.get_stats(),
+            "agents": self.agents.get_stats(),
+        }
@@ -0,0 +1,99 @@
+"""Boucle asyncio et pool HTTP persistants pour la collecte node_exporter.
+
+Une boucle tourne dans un thread dédié du processus (recréée après un
+fork, pour les workers prefork) et garde un httpx.AsyncClient keep-alive
+HTTP/1.1: les cycles successifs réutilisent boucle et connexions TCP au
+lieu de tout recréer. Les appelants synchrones (tâche Celery) passent
+par run().
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Coroutine, Optional
+
+import httpx
+
+from web.config.logging_config import get_logger
+from web.config.metrics_config import COLLECTOR_CONFIG
+
+logger = get_logger(__name__)
+
+
+def new_http_client(timeout_s: float = 5.0, connect_timeout_s: float = 1.0, max_connections: int = 256,
+                    keepalive_expiry_s: float = 30.0, **_: Any) -> httpx.AsyncClient:
+    """Client node_exporter keep-alive HTTP/1.1 (réglages de COLLECTOR_CONFIG)."""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout_s, connect=connect_timeout_s),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                            keepalive_expiry=keepalive_expiry_s),
+        http1=True,
+        http2=False,
+    )
+
+
+class CollectorLoop:
+    """Boucle de fond + client HTTP partagé par les cycles de collecte."""
+
+    def __init__(self, timeout_s: float = 5.0, connect_timeout_s: float = 1.0, max_connections: int = 256,
+                 keepalive_expiry_s: float = 30.0, **_: Any) -> None:
+        self.timeout_s = timeout_s
+        self.connect_timeout_s = connect_timeout_s
+        self.max_connections = max_connections
+        self.keepalive_expiry_s = keepalive_expiry_s
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return self._loop
+            # Premier appel, ou enfant forké: le thread du parent n'existe pas ici
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="collector-loop", daemon=True)
+            thread.start()
+            self._loop, self._thread, self._pid, self._client = loop, thread, os.getpid(), None
+            return loop
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Exécute coro sur la boucle du collecteur et rend son résultat (appel bloquant)."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def client(self) -> httpx.AsyncClient:
+        """Client keep-alive partagé (à appeler depuis la boucle du collecteur)."""
+        if self._client is None or self._client.is_closed:
+            self._client = new_http_client(self.timeout_s, self.connect_timeout_s, self.max_connections,
+                                           self.keepalive_expiry_s)
+        return self._client
+
+    def reset(self) -> None:
+        """Ferme le client: le prochain cycle repart sur de nouvelles connexions."""
+        client, self._client = self._client, None
+        if client is None or client.is_closed:
+            return
+        if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+            try:
+                self.run(client.aclose(), timeout=5)
+            except Exception as e:
+                logger.debug(f"Fermeture du client de collecte: {e}")
+
+    def stop(self) -> None:
+        self.reset()
+        with self._lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is not None and thread is not None and thread.is_alive():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+
+
+# Instance globale (par processus)
+collector_loop = CollectorLoop(**COLLECTOR_CONFIG)
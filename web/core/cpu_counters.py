@@ -0,0 +1,151 @@
+"""Taux des compteurs node_exporter: CPU (node_cpu_seconds_total) et débits.
+
+Chaque scrape devient un tableau cœurs x modes de compteurs monotones;
+le delta avec le scrape précédent du même nœud est calculé d'un bloc
+(numpy). Un compteur qui recule (reboot, remise à zéro) repart de 0,
+comme rate() de Prometheus; un nombre de cœurs différent (hotplug)
+redémarre l'état du nœud.
+
+Utilisation = temps hors idle/iowait sur le temps total de tous les
+cœurs. Chaque consommateur (collecteur, ClusterManager) a son instance:
+deux scrapers du même nœud ne doivent pas partager leurs deltas.
+
+CounterRateEngine applique la même règle de remise à zéro à des
+compteurs nommés (octets réseau/disque, secondes PSI) et les divise par
+le temps écoulé entre deux scrapes. Un compteur par périphérique
+(<clé>:<device>): débit de chaque série, puis somme par clé, comme
+sum(rate()) de Prometheus; un périphérique qui apparaît ou repart de 0
+ne fausse pas le total.
+"""
+
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MODES = ("user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal")
+MODE_INDEX = {mode: i for i, mode in enumerate(MODES)}
+_IDLE, _IOWAIT, _STEAL = MODE_INDEX["idle"], MODE_INDEX["iowait"], MODE_INDEX["steal"]
+
+CPU_METRIC = "node_cpu_seconds_total"
+_CPU_LABEL = re.compile(r'cpu="(\d+)"')
+_MODE_LABEL = re.compile(r'mode="([a-z]+)"')
+
+CpuSample = Tuple[int, int, float]
+
+
+def parse_cpu_sample(line: str) -> Optional[CpuSample]:
+    """(cœur, index du mode, valeur) d'une ligne node_cpu_seconds_total, None sinon."""
+    labels, _, value = line.rpartition(" ")
+    cpu, mode = _CPU_LABEL.search(labels), _MODE_LABEL.search(labels)
+    if cpu is None or mode is None or mode.group(1) not in MODE_INDEX:
+        return None
+    try:
+        return int(cpu.group(1)), MODE_INDEX[mode.group(1)], float(value)
+    except ValueError:
+        return None
+
+
+def counters_from_samples(samples: List[CpuSample]) -> Optional[np.ndarray]:
+    """Tableau cœurs x modes (float64) à partir des échantillons d'un scrape."""
+    if not samples:
+        return None
+    cpus, modes, values = zip(*samples)
+    counters = np.zeros((max(cpus) + 1, len(MODES)))
+    counters[list(cpus), list(modes)] = values
+    return counters
+
+
+class CpuRateEngine:
+    """Etat des compteurs CPU par nœud et calcul des taux entre deux scrapes."""
+
+    def __init__(self, saturation_pct: float = 90.0) -> None:
+        self.saturation_pct = saturation_pct
+        self._prev: Dict[str, np.ndarray] = {}
+
+    def update(self, node: str, samples: List[CpuSample]) -> Optional[Dict[str, Any]]:
+        """Enregistre le scrape de node; rend ses taux, None au premier scrape."""
+        counters = counters_from_samples(samples)
+        if counters is None:
+            return None
+        prev = self._prev.get(node)
+        self._prev[node] = counters
+        if prev is None or prev.shape != counters.shape:
+            return None
+        reset = counters < prev
+        delta = np.where(reset, counters, counters - prev)
+        per_core = delta.sum(axis=1)
+        total = per_core.sum()
+        if total <= 0:
+            return None
+        busy_core = per_core - delta[:, _IDLE] - delta[:, _IOWAIT]
+        cores = np.divide(busy_core, per_core, out=np.zeros_like(per_core), where=per_core > 0) * 100
+        return {
+            "cpu_usage": float(busy_core.sum() / total * 100),
+            "cpu_iowait": float(delta[:, _IOWAIT].sum() / total * 100),
+            "cpu_steal": float(delta[:, _STEAL].sum() / total * 100),
+            "cpu_cores": len(cores),
+            "cpu_core_max": float(cores.max()),
+            "cpu_cores_saturated": int((cores >= self.saturation_pct).sum()),
+            "cpu_counter_reset": bool(reset.any()),
+        }
+
+    def forget(self, node: str) -> None:
+        self._prev.pop(node, None)
+
+    def clear(self) -> None:
+        self._prev.clear()
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._prev
+
+    def export(self, nodes: Iterable[str]) -> Dict[str, str]:
+        """Etat JSON des nœuds connus parmi nodes (copie dans Redis)."""
+        return {node: json.dumps(self._prev[node].tolist()) for node in nodes if node in self._prev}
+
+    def restore(self, state: Dict[str, str]) -> int:
+        """Recharge un état exporté; les entrées illisibles sont ignorées."""
+        loaded = 0
+        for node, raw in state.items():
+            try:
+                counters = np.array(json.loads(raw), dtype=float)
+            except (TypeError, ValueError):
+                continue
+            if counters.ndim == 2 and counters.shape[1] == len(MODES):
+                self._prev[node] = counters
+                loaded += 1
+        return loaded
+
+
+class CounterRateEngine:
+    """Débits par seconde de compteurs nommés, par nœud (séries <clé>:<device> sommées par clé)."""
+
+    def __init__(self) -> None:
+        self._prev: Dict[str, Tuple[float, Dict[str, float]]] = {}
+
+    def update(self, node: str, counters: Dict[str, float], now: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Enregistre les compteurs de node; rend {nom: débit/s}, None au premier scrape."""
+        if not counters:
+            return None
+        now = time.monotonic() if now is None else now
+        prev = self._prev.get(node)
+        self._prev[node] = (now, counters)
+        if prev is None or now <= prev[0]:
+            return None
+        elapsed = now - prev[0]
+        rates = {}
+        for name, value in counters.items():
+            old = prev[1].get(name)
+            # Série nouvelle (périphérique apparu): pas de débit avant son deuxième point
+            if old is not None:
+                key = name.partition(":")[0]
+                rates[key] = rates.get(key, 0.0) + (value if value < old else value - old) / elapsed
+        return rates
+
+    def forget(self, node: str) -> None:
+        self._prev.pop(node, None)
+
+    def clear(self) -> None:
+        self._prev.clear()
@@ -15,6 +15,8 @@ from .load_balancer import LoadBalancer
 from .fault_tolerance import FaultToleranceManager
 from .task_queue import TaskQueue, Task, TaskStatus
 from .worker_registry import WorkerRegistry, WorkerStatus
+from .perf import timed
+from web.config.metrics_config import DISPATCH_STRATEGIES
 
 class Dispatcher:
     def __init__(self, registry: WorkerRegistry, queue: TaskQueue) -> None:
@@ -100,6 +102,7 @@ class Dispatcher:
                 "timestamp": datetime.now().isoformat()
             }
 
+    @timed("dispatch.pick_target")
     def _pick_target(self, requires: Optional[List[str]] = None, 
                     strategy: str = "round_robin") -> Optional[str]:
         """Sélectionne un nœud cible pour une tâche."""
@@ -129,6 +132,11 @@ class Dispatcher:
                 performance_metrics[node] = {
                     "cpu_usage": worker_info.cpu_usage,
                     "memory_usage": worker_info.memory_usage,
+                    "net_usage": worker_info.net_usage,
+                    "psi_cpu": worker_info.psi_cpu,
+                    "psi_memory": worker_info.psi_memory,
+                    "psi_io": worker_info.psi_io,
+                    "load_per_core": worker_info.load_per_core,
                     "response_time": 1.0 / worker_info.performance_score if worker_info.performance_score > 0 else 1.0
                 }
                 connection_counts[node] = worker_info.active_jobs
@@ -143,13 +151,21 @@ class Dispatcher:
             performance_metrics=performance_metrics
         )
 
+    def _strategy_for(self, task: Task) -> str:
+        """Stratégie liée à une capacité requise (scraping: marge réseau), round-robin sinon."""
+        for capability in task.requires:
+            if capability in DISPATCH_STRATEGIES:
+                return DISPATCH_STRATEGIES[capability]
+        return "round_robin"
+
+    @timed("dispatch.dispatch_once")
     async def dispatch_once(self) -> Optional[Dict[str, Any]]:
         """Traite une tâche de la file."""
         task: Optional[Task] = self.queue.pop()
         if not task:
             return None
         
-        target = self._pick_target(task.requires)
+        target = self._pick_target(task.requires, strategy=self._strategy_for(task))
         if not target:
             # Pas de cible disponible, réinsérer en fin de file
             self.queue.push(task)
@@ -158,6 +174,7 @@ class Dispatcher:
         # Marquer la tâche comme en cours
         self.queue.mark_running(task, target)
         self.registry.set_status(target, WorkerStatus.BUSY)
+        self.registry.record_job_start(target)
         
         try:
             # Exécuter la tâche avec tolérance aux pannes
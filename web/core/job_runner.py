@@ -0,0 +1,111 @@
+"""Exécution des jobs locaux de /api/jobs, sans bloquer la boucle de l'API.
+
+Chaque job soumis devient une tâche asyncio qui attend une place dans la
+limite de son type (`concurrency`, `default_concurrency` pour les autres).
+Le travail bloquant passe par run_blocking(): un pool borné de
+`max_workers` threads. cancel(job_id) annule un job en file ou en cours;
+un appel bloquant déjà parti finit son étape, son résultat est ignoré.
+"""
+
+import asyncio
+import functools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from web.config.logging_config import get_logger
+from web.config.metrics_config import JOB_RUNNER_CONFIG
+
+logger = get_logger(__name__)
+
+
+class JobRunner:
+    """Pool d'exécution des jobs avec limites par type et annulation."""
+
+    def __init__(self, max_workers: int = 8, concurrency: Optional[Dict[str, int]] = None,
+                 default_concurrency: int = 4) -> None:
+        self.max_workers = max(1, max_workers)
+        self.concurrency = dict(concurrency or {})
+        self.default_concurrency = max(1, default_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running: Counter = Counter()
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def _limit(self, job_type: str) -> asyncio.Semaphore:
+        limit = self._limits.get(job_type)
+        if limit is None:
+            limit = self._limits[job_type] = asyncio.Semaphore(
+                max(1, self.concurrency.get(job_type, self.default_concurrency)))
+        return limit
+
+    def submit(self, job_id: str, job_type: str, fn: Callable[..., Awaitable[Any]], *args: Any) -> asyncio.Task:
+        """Planifie fn(*args) pour job_id; démarre dès qu'une place de job_type se libère."""
+        task = asyncio.get_running_loop().create_task(self._run(job_type, fn, args), name=f"job:{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(functools.partial(self._done, job_id))
+        self.stats["submitted"] += 1
+        return task
+
+    async def _run(self, job_type: str, fn: Callable[..., Awaitable[Any]], args: tuple) -> Any:
+        async with self._limit(job_type):
+            self._running[job_type] += 1
+            try:
+                return await fn(*args)
+            finally:
+                self._running[job_type] -= 1
+
+    def _done(self, job_id: str, task: asyncio.Task) -> None:
+        if self._tasks.get(job_id) is task:
+            del self._tasks[job_id]
+        if task.cancelled():
+            self.stats["cancelled"] += 1
+        elif task.exception() is not None:
+            self.stats["failed"] += 1
+            logger.error(f"Job {job_id} en échec: {task.exception()}")
+        else:
+            self.stats["completed"] += 1
+
+    def is_active(self, job_id: str) -> bool:
+        return job_id in self._tasks
+
+    def cancel(self, job_id: str) -> bool:
+        """Annule le job s'il est en file ou en cours (False sinon)."""
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        return task.cancel()
+
+    async def run_blocking(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """fn(*args) dans le pool de threads des jobs."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job-runner")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def stop(self) -> None:
+        """Annule les jobs restants et arrête le pool de threads."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._limits.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        running = {job_type: count for job_type, count in self._running.items() if count}
+        return {
+            **self.stats,
+            "active": len(self._tasks),
+            "running": running,
+            "queued": len(self._tasks) - sum(running.values()),
+            "max_workers": self.max_workers,
+            "concurrency": {**self.concurrency, "default": self.default_concurrency},
+        }
+
+
+# Instance globale
+job_runner = JobRunner(**JOB_RUNNER_CONFIG)
@@ -0,0 +1,580 @@
+"""Store SQLite des jobs.
+
+Les handlers async ne touchent plus sqlite3 directement: chaque requête
+part dans un petit exécuteur dont chaque thread garde sa connexion
+(pool de `pool_size` connexions). Connexions en WAL, `synchronous`
+réglable, requêtes au texte constant pour profiter du cache de
+statements préparés de sqlite3. Le schéma évolue par migrations
+numérotées (PRAGMA user_version).
+
+Listes paginées par clé (created_at, id) avec curseur opaque, projection
+de colonnes (les blobs JSON ne sont lus et décodés que si demandés).
+
+Les changements de statut et de progression passent par JobUpdateBuffer
+(write-behind): fusionnés par job, écrits par lots.
+"""
+
+import asyncio
+import base64
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from web.config.logging_config import get_logger
+from web.config.metrics_config import JOB_BUFFER_CONFIG, JOB_STORE_CONFIG
+from web.core.perf import span
+
+logger = get_logger(__name__)
+
+JOB_COLUMNS = (
+    "id", "name", "job_type", "parameters", "status", "node", "progress", "priority",
+    "created_at", "started_at", "completed_at", "result", "task_id",
+)
+_SELECT_JOBS = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs"
+# Colonnes modifiables par update_fields (garde-fou: elles finissent dans le SQL)
+UPDATABLE_COLUMNS = frozenset(("status", "node", "progress", "priority", "started_at",
+                               "completed_at", "result", "task_id"))
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+# Colonnes JSON décodées à la lecture
+JSON_COLUMNS = ("parameters", "result")
+MAX_PAGE_SIZE = 1000
+
+
+def _migration_tables(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            job_type TEXT NOT NULL,
+            parameters TEXT NOT NULL,
+            status TEXT NOT NULL,
+            node TEXT,
+            progress REAL DEFAULT 0,
+            priority INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            result TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS nodes (
+            name TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            cpu_usage REAL,
+            memory_usage REAL,
+            disk_usage REAL,
+            temperature REAL,
+            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            node TEXT NOT NULL,
+            metric_type TEXT NOT NULL,
+            value REAL NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _migration_task_id(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("PRAGMA table_info(jobs)")
+    if "task_id" not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE jobs ADD COLUMN task_id TEXT")
+
+
+def _migration_job_indexes(cursor: sqlite3.Cursor) -> None:
+    # Listes: filtre status et/ou job_type, tri created_at DESC
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_type_created ON jobs(job_type, created_at)")
+
+
+def _migration_keyset_indexes(cursor: sqlite3.Cursor) -> None:
+    # Pagination par clé: id départage les created_at identiques, dans l'index
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_id ON jobs(created_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created_id ON jobs(status, created_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_type_created_id ON jobs(job_type, created_at, id)")
+    for name in ("idx_jobs_created", "idx_jobs_status_created", "idx_jobs_type_created"):
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+# (version, description, fonction): appliquées dans l'ordre, une transaction chacune
+MIGRATIONS: List[tuple] = [
+    (1, "tables jobs, nodes, metrics", _migration_tables),
+    (2, "colonne jobs.task_id", _migration_task_id),
+    (3, "index jobs (status|job_type, created_at)", _migration_job_indexes),
+    (4, "index jobs (status|job_type, created_at, id) pour la pagination par clé", _migration_keyset_indexes),
+]
+
+
+def row_to_job(row: Sequence[Any], columns: Sequence[str] = JOB_COLUMNS) -> Dict[str, Any]:
+    """Ligne SELECT columns -> dict, parameters et result décodés s'ils sont lus."""
+    job = dict(zip(columns, row))
+    if "parameters" in job:
+        job["parameters"] = json.loads(job["parameters"]) if job["parameters"] else {}
+    if "result" in job:
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def parse_fields(raw: Optional[str]) -> Tuple[str, ...]:
+    """Projection "name,status,..." -> colonnes, id et created_at toujours inclus (curseur)."""
+    if not raw:
+        return JOB_COLUMNS
+    wanted = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = wanted - set(JOB_COLUMNS)
+    if unknown:
+        raise ValueError(f"Champs inconnus: {sorted(unknown)}")
+    wanted |= {"id", "created_at"}
+    return tuple(c for c in JOB_COLUMNS if c in wanted)
+
+
+def encode_cursor(created_at: Any, job_id: str) -> str:
+    raw = json.dumps([created_at, job_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Curseur opaque -> (created_at, id). ValueError s'il est illisible."""
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Curseur invalide")
+    return created_at, job_id
+
+
+def status_fields(status: str, progress: Optional[float] = None, node: Optional[str] = None,
+                  result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Colonnes d'un changement de statut, horodatage associé compris."""
+    fields: Dict[str, Any] = {"status": status}
+    if progress is not None:
+        fields["progress"] = progress
+    if node:
+        fields["node"] = node
+    if result:
+        fields["result"] = result
+    if status == "running":
+        fields["started_at"] = datetime.now().isoformat()
+    elif status in TERMINAL_STATUSES:
+        fields["completed_at"] = datetime.now().isoformat()
+    return fields
+
+
+def _encode_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    unknown = set(fields) - UPDATABLE_COLUMNS
+    if unknown:
+        raise ValueError(f"Colonnes non modifiables: {sorted(unknown)}")
+    if "result" in fields and fields["result"] is not None and not isinstance(fields["result"], str):
+        fields = {**fields, "result": json.dumps(fields["result"])}
+    return fields
+
+
+@lru_cache(maxsize=None)
+def _list_sql(by_status: bool, by_type: bool) -> str:
+    # Texte identique pour une même combinaison de filtres: statement réutilisé
+    where = [clause for clause, used in (("status = ?", by_status), ("job_type = ?", by_type)) if used]
+    sql = _SELECT_JOBS
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+
+
+@lru_cache(maxsize=None)
+def _page_sql(columns: tuple, by_status: bool, by_type: bool, after: bool) -> str:
+    where = [clause for clause, used in (("status = ?", by_status), ("job_type = ?", by_type),
+                                         ("(created_at, id) < (?, ?)", after)) if used]
+    sql = f"SELECT {', '.join(columns)} FROM jobs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY created_at DESC, id DESC LIMIT ?"
+
+
+@lru_cache(maxsize=None)
+def _update_sql(columns: tuple) -> str:
+    return f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?"
+
+
+class JobStore:
+    """Accès aux jobs: un exécuteur de `pool_size` threads, une connexion par thread."""
+
+    def __init__(self, path: str, pool_size: int = 4, synchronous: str = "NORMAL",
+                 busy_timeout_ms: int = 5000, cache_size_kib: int = 16384,
+                 mmap_size: int = 0, cached_statements: int = 256) -> None:
+        self.path = path
+        self.pool_size = max(1, pool_size)
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    # Connexions
+
+    def connect(self) -> sqlite3.Connection:
+        """Nouvelle connexion réglée (WAL, synchronous, cache, mmap)."""
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if self.mmap_size:
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        return conn
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, fn: Callable, args: tuple) -> Any:
+        return fn(self._thread_connection(), *args)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Exécute fn(conn, *args) dans le pool, sans bloquer la boucle."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="jobstore")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, args)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    # Schéma
+
+    def migrate(self) -> int:
+        """Applique les migrations manquantes. Retourne la version du schéma."""
+        conn = self.connect()
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, description, apply in MIGRATIONS:
+                if target <= version:
+                    continue
+                with span("sqlite.jobs.migrate"):
+                    with conn:
+                        apply(conn.cursor())
+                        conn.execute(f"PRAGMA user_version={target}")
+                logger.info(f"Migration SQLite {target} appliquée: {description}")
+                version = target
+            return version
+        finally:
+            conn.close()
+
+    # Requêtes (exécutées dans le pool)
+
+    @staticmethod
+    def _list(conn, status, job_type, limit, offset) -> List[Dict[str, Any]]:
+        params: List[Any] = [v for v in (status, job_type) if v]
+        params.extend([limit, offset])
+        rows = conn.execute(_list_sql(bool(status), bool(job_type)), params).fetchall()
+        return [row_to_job(row) for row in rows]
+
+    @staticmethod
+    def _page(conn, columns, status, job_type, after, limit) -> List[Dict[str, Any]]:
+        params: List[Any] = [v for v in (status, job_type) if v]
+        if after is not None:
+            params.extend(after)
+        params.append(limit)
+        rows = conn.execute(_page_sql(columns, bool(status), bool(job_type), after is not None), params).fetchall()
+        return [row_to_job(row, columns) for row in rows]
+
+    @staticmethod
+    def _get(conn, job_id) -> Optional[Dict[str, Any]]:
+        row = conn.execute(_SELECT_JOBS + " WHERE id = ?", (job_id,)).fetchone()
+        return row_to_job(row) if row else None
+
+    @staticmethod
+    def _get_status(conn, job_id) -> Optional[str]:
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _running_nodes(conn) -> Set[str]:
+        rows = conn.execute("SELECT DISTINCT node FROM jobs WHERE status = 'running' AND node IS NOT NULL")
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def _insert(conn, job_id, name, job_type, parameters, status, priority, created_at, task_id) -> None:
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, name, job_type, parameters, status, priority, created_at, task_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, name, job_type, parameters, status, priority, created_at, task_id),
+            )
+
+    @staticmethod
+    def _insert_many(conn, rows) -> None:
+        with conn:
+            conn.executemany(
+                "INSERT INTO jobs (id, name, job_type, parameters, status, priority, created_at, task_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    @staticmethod
+    def _update(conn, job_id, columns, values) -> bool:
+        with conn:
+            cursor = conn.execute(_update_sql(columns), (*values, job_id))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def _update_many(conn, groups) -> None:
+        # Une transaction; un executemany par jeu de colonnes
+        with conn:
+            for columns, rows in groups.items():
+                conn.executemany(_update_sql(columns), rows)
+
+    async def list_jobs(self, status: Optional[str] = None, job_type: Optional[str] = None,
+                        limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        with span("sqlite.jobs.list"):
+            return await self.run(self._list, status, job_type, limit, offset)
+
+    async def list_page(self, status: Optional[str] = None, job_type: Optional[str] = None,
+                        limit: int = 50, cursor: Optional[str] = None,
+                        columns: Sequence[str] = JOB_COLUMNS) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Page suivant `cursor` (tri created_at, id décroissant) et curseur de la page d'après."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+        with span("sqlite.jobs.page"):
+            jobs = await self.run(self._page, tuple(columns), status, job_type, after, limit)
+        next_cursor = encode_cursor(jobs[-1]["created_at"], jobs[-1]["id"]) if len(jobs) == limit else None
+        return jobs, next_cursor
+
+    async def iter_jobs(self, status: Optional[str] = None, job_type: Optional[str] = None,
+                        columns: Sequence[str] = JOB_COLUMNS,
+                        chunk: int = MAX_PAGE_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Parcourt tous les jobs par pages de `chunk` (export), mémoire constante."""
+        cursor = None
+        while True:
+            jobs, cursor = await self.list_page(status, job_type, chunk, cursor, columns)
+            if jobs:
+                yield jobs
+            if cursor is None:
+                return
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with span("sqlite.jobs.get"):
+            return await self.run(self._get, job_id)
+
+    async def get_status(self, job_id: str) -> Optional[str]:
+        return await self.run(self._get_status, job_id)
+
+    async def running_nodes(self) -> Set[str]:
+        """Nœuds ayant au moins un job en cours."""
+        return await self.run(self._running_nodes)
+
+    async def insert_job(self, job_id: str, name: str, job_type: str, parameters: Dict[str, Any],
+                         status: str = "pending", priority: int = 1, created_at: Optional[str] = None,
+                         task_id: Optional[str] = None) -> None:
+        with span("sqlite.jobs.insert"):
+            await self.run(self._insert, job_id, name, job_type, json.dumps(parameters), status,
+                           priority, created_at or datetime.now().isoformat(), task_id)
+
+    async def insert_many(self, jobs: Sequence[Dict[str, Any]]) -> int:
+        """Insère des jobs (clés de insert_job) en une transaction executemany."""
+        now = datetime.now().isoformat()
+        rows = [
+            (job["id"], job["name"], job["job_type"], json.dumps(job.get("parameters") or {}),
+             job.get("status", "pending"), job.get("priority", 1), job.get("created_at") or now,
+             job.get("task_id"))
+            for job in jobs
+        ]
+        with span("sqlite.jobs.insert_many"):
+            await self.run(self._insert_many, rows)
+        return len(rows)
+
+    async def update_fields(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        """UPDATE des colonnes données (result encodé en JSON). False si job absent."""
+        if not fields:
+            return await self.get_status(job_id) is not None
+        fields = _encode_fields(fields)
+        columns = tuple(fields)
+        with span("sqlite.jobs.update"):
+            return await self.run(self._update, job_id, columns, tuple(fields[c] for c in columns))
+
+    async def update_status(self, job_id: str, status: str, progress: Optional[float] = None,
+                            node: Optional[str] = None, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Statut + horodatage associé (started_at / completed_at)."""
+        with span("sqlite.jobs.update_status"):
+            return await self.update_fields(job_id, status_fields(status, progress, node, result))
+
+    async def update_many(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Applique {job_id: colonnes} en une seule transaction."""
+        groups: Dict[tuple, List[tuple]] = {}
+        for job_id, fields in updates.items():
+            fields = _encode_fields(fields)
+            columns = tuple(sorted(fields))
+            groups.setdefault(columns, []).append((*(fields[c] for c in columns), job_id))
+        with span("sqlite.jobs.update_many"):
+            await self.run(self._update_many, groups)
+        return len(updates)
+
+
+class JobUpdateBuffer:
+    """Write-behind des mises à jour de jobs.
+
+    Les mises à jour successives d'un même job sont fusionnées en mémoire
+    puis écrites en une transaction toutes les `flush_interval_ms` ms, ou dès
+    `max_pending` jobs en attente. Les lectures passent par overlay() pour
+    voir les écritures pas encore flushées. stop() vide le tampon.
+
+    Un lot en échec est rejoué job par job: une ligne qui ne passe pas
+    (result non encodable...) ne bloque pas les autres, et elle est
+    abandonnée après `max_attempts` échecs (stats["dropped"]).
+    """
+
+    def __init__(self, store: JobStore, flush_interval_ms: int = 200, max_pending: int = 500,
+                 max_attempts: int = 5) -> None:
+        self.store = store
+        self.flush_interval_s = flush_interval_ms / 1000
+        self.max_pending = max(1, max_pending)
+        self.max_attempts = max(1, max_attempts)
+        # Echecs successifs des jobs rejoués ligne par ligne
+        self._attempts: Dict[str, int] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Lot en cours d'écriture, encore visible par overlay()
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.stats = {"updates": 0, "merged": 0, "flushes": 0, "rows": 0, "errors": 0, "dropped": 0}
+
+    def _ensure_task(self) -> None:
+        if self._task is None or self._task.done():
+            self._dirty = asyncio.Event()
+            self._full = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        """Met en attente des colonnes pour job_id (les plus récentes gagnent)."""
+        self._ensure_task()
+        pending = self._pending.get(job_id)
+        if pending is None:
+            self._pending[job_id] = dict(fields)
+        else:
+            pending.update(fields)
+            self.stats["merged"] += 1
+        self.stats["updates"] += 1
+        self._dirty.set()
+        if len(self._pending) >= self.max_pending:
+            self._full.set()
+
+    def update_status(self, job_id: str, status: str, progress: Optional[float] = None,
+                      node: Optional[str] = None, result: Optional[Dict[str, Any]] = None) -> None:
+        self.update(job_id, status_fields(status, progress, node, result))
+
+    def pending_fields(self, job_id: str) -> Dict[str, Any]:
+        return {**self._inflight.get(job_id, {}), **self._pending.get(job_id, {})}
+
+    def overlay(self, job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Job lu en base + écritures en attente (read-your-writes)."""
+        if job is None:
+            return None
+        fields = self.pending_fields(job["id"])
+        if not fields:
+            return job
+        # Projection: seulement les colonnes lues
+        return {**job, **{k: v for k, v in fields.items() if k in job}}
+
+    async def _run(self) -> None:
+        while True:
+            await self._dirty.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Écrit les mises à jour en attente. Retourne le nombre de jobs écrits."""
+        if self._flush_lock is None:
+            return 0
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._dirty.clear()
+            self._full.clear()
+            self._inflight = batch
+            try:
+                written = await self.store.update_many(batch)
+                if self._attempts:
+                    for job_id in batch:
+                        self._attempts.pop(job_id, None)
+            except Exception as e:
+                logger.warning(f"Flush des mises à jour de jobs en échec ({len(batch)} jobs), reprise job par job: {e}")
+                self.stats["errors"] += 1
+                written = await self._flush_rows(batch)
+            finally:
+                self._inflight = {}
+            self.stats["flushes"] += 1
+            self.stats["rows"] += written
+            return written
+
+    async def _flush_rows(self, batch: Dict[str, Dict[str, Any]]) -> int:
+        """Une transaction par job; les échecs sont remis en attente, puis abandonnés."""
+        written = 0
+        for job_id, fields in batch.items():
+            try:
+                await self.store.update_many({job_id: fields})
+            except Exception as e:
+                attempts = self._attempts.get(job_id, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(job_id, None)
+                    self.stats["dropped"] += 1
+                    logger.error(f"Mise à jour du job {job_id} abandonnée après {attempts} échecs "
+                                 f"(colonnes {', '.join(sorted(fields))}): {e}")
+                    continue
+                self._attempts[job_id] = attempts
+                # Remis en attente sous les écritures plus récentes
+                self._pending[job_id] = {**fields, **self._pending.get(job_id, {})}
+                self._dirty.set()
+            else:
+                self._attempts.pop(job_id, None)
+                written += 1
+        return written
+
+    async def stop(self) -> None:
+        """Arrête la tâche de fond et écrit ce qui reste (arrêt de l'appli)."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": len(self._pending)}
+
+
+# Instances globales
+job_store = JobStore(**JOB_STORE_CONFIG)
+job_updates = JobUpdateBuffer(job_store, **JOB_BUFFER_CONFIG)
@@ -8,6 +8,8 @@ import random
 import time
 from datetime import datetime, timedelta
 
+from web.config.metrics_config import LOAD_BALANCER_WEIGHTS
+
 class LoadBalancer:
     def __init__(self) -> None:
         self._rr_index: int = 0
@@ -74,28 +76,45 @@ class LoadBalancer:
         
         return best_node
 
-    def pick_best_performance(self, nodes: List[str], performance_metrics: Dict[str, Dict]) -> Optional[str]:
-        """Sélectionne le nœud avec les meilleures performances."""
+    def pick_best_performance(self, nodes: List[str], performance_metrics: Dict[str, Dict],
+                              profile: str = "default",
+                              connection_counts: Optional[Dict[str, int]] = None) -> Optional[str]:
+        """Sélectionne le nœud avec les meilleures performances.
+
+        profile: jeu de poids de LOAD_BALANCER_WEIGHTS (métrique -> poids).
+        connection_counts: jobs en cours par nœud, ajoutés au score (poids
+        active_jobs). Les ex aequo sont départagés en round-robin.
+        """
         if not nodes:
             return None
         
+        weights = LOAD_BALANCER_WEIGHTS.get(profile, LOAD_BALANCER_WEIGHTS["default"])
+        connection_counts = connection_counts or {}
         best_score = float('inf')
-        best_node = None
+        best_nodes: List[str] = []
         
         for node in nodes:
             metrics = performance_metrics.get(node, {})
-            cpu_usage = metrics.get('cpu_usage', 0)
-            memory_usage = metrics.get('memory_usage', 0)
-            response_time = metrics.get('response_time', 0)
             
             # Score composite (plus bas = mieux)
-            score = (cpu_usage * 0.4 + memory_usage * 0.3 + response_time * 0.3)
+            score = sum(metrics.get(key, 0) * weight for key, weight in weights.items() if key != "active_jobs")
+            score += connection_counts.get(node, 0) * weights.get("active_jobs", 0.0)
             
-            if score < best_score:
+            if score < best_score - 1e-9:
                 best_score = score
-                best_node = node
+                best_nodes = [node]
+            elif score <= best_score + 1e-9:
+                best_nodes.append(node)
         
-        return best_node
+        node = best_nodes[self._rr_index % len(best_nodes)]
+        self._rr_index += 1
+        return node
+
+    def pick_network_headroom(self, nodes: List[str], performance_metrics: Dict[str, Dict],
+                              connection_counts: Optional[Dict[str, int]] = None) -> Optional[str]:
+        """Sélectionne le nœud avec le plus de marge réseau (jobs de scraping)."""
+        return self.pick_best_performance(nodes, performance_metrics, profile="network",
+                                          connection_counts=connection_counts)
 
     def update_node_performance(self, node: str, response_time: float, success: bool) -> None:
         """Met à jour les métriques de performance d'un nœud."""
@@ -137,6 +156,9 @@ class LoadBalancer:
         elif strategy == "least_recent":
             return self.pick_least_recent(nodes)
         elif strategy == "best_performance":
-            return self.pick_best_performance(nodes, performance_metrics or {})
+            return self.pick_best_performance(nodes, performance_metrics or {},
+                                              connection_counts=connection_counts)
+        elif strategy == "network_headroom":
+            return self.pick_network_headroom(nodes, performance_metrics or {}, connection_counts)
         else:
             return self.pick_round_robin(nodes)
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""Push différentiel des métriques cluster vers les clients WebSocket.
+
+Les clients du namespace /monitoring s'abonnent (événement subscribe_metrics)
+à une sélection de nœuds et de métriques, matérialisée par des rooms
+socket.io: "node:<nom>" et "metric:<champ>" (aucune room = tout). Ils
+reçoivent ensuite "metrics_delta":
+
+- keyframe: {"t": "k", "seq", "timestamp", "cluster_stats", "nodes"}
+- delta:    {"t": "d", "seq", "base", "timestamp", "cluster_stats", "nodes", "gone"}
+  avec seulement les champs qui ont changé depuis le snapshot `base`,
+  le dernier acquitté par le client (événement metrics_ack).
+
+Un keyframe part à l'abonnement, sur demande (metrics_resync), si la base
+du client est sortie de l'historique et tous les `keyframe_every` cycles.
+Les clients qui partagent la même sélection et la même base reçoivent le
+même message: un seul calcul et un seul encodage par groupe. Sans abonné,
+le payload brut est gardé tel quel et décodé seulement au premier abonnement.
+"""
+
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from web.config.logging_config import get_logger
+from web.core.perf import span
+from web.core.ws_fanout import loads
+
+logger = get_logger(__name__)
+
+DELTA_ROOM = "metrics:delta"
+# Clients historiques (payload complet): tout le monde y entre à la connexion,
+# un abonné au push différentiel en sort. Évite des skip_sid en O(n) par envoi.
+FULL_ROOM = "metrics:full"
+NODE_ROOM_PREFIX = "node:"
+METRIC_ROOM_PREFIX = "metric:"
+
+
+def normalize_snapshot(aggregated: Dict[str, Any]) -> Dict[str, Any]:
+    """Ramène un payload cluster:metrics à {"meta", "cluster_stats", "nodes"}."""
+    nodes = aggregated.get("nodes") or {}
+    if isinstance(nodes, list):
+        # Format de /api/cluster/nodes: liste de dicts avec un nom
+        keyed = {}
+        for i, item in enumerate(nodes):
+            if isinstance(item, dict):
+                keyed[str(item.get("node") or item.get("name") or item.get("host") or i)] = item
+        nodes = keyed
+    return {
+        "meta": {k: v for k, v in aggregated.items() if k not in ("nodes", "cluster_stats")},
+        "cluster_stats": dict(aggregated.get("cluster_stats") or {}),
+        "nodes": {name: dict(fields) for name, fields in nodes.items() if isinstance(fields, dict)},
+    }
+
+
+def _select(fields: Dict[str, Any], metrics: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    if metrics is None:
+        return fields
+    return {k: v for k, v in fields.items() if k in metrics}
+
+
+def _node_names(snapshot: Dict[str, Any], nodes: Optional[FrozenSet[str]]) -> Iterable[str]:
+    if nodes is None:
+        return snapshot["nodes"].keys()
+    return (n for n in snapshot["nodes"] if n in nodes)
+
+
+def build_keyframe(seq: int, snapshot: Dict[str, Any], nodes: Optional[FrozenSet[str]],
+                   metrics: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    return {
+        "t": "k",
+        "seq": seq,
+        **snapshot["meta"],
+        "cluster_stats": snapshot["cluster_stats"],
+        "nodes": {n: _select(snapshot["nodes"][n], metrics) for n in _node_names(snapshot, nodes)},
+    }
+
+
+def build_delta(seq: int, base_seq: int, base: Dict[str, Any], current: Dict[str, Any],
+                nodes: Optional[FrozenSet[str]], metrics: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    """Champs modifiés entre `base` et `current` (None = champ disparu)."""
+    delta: Dict[str, Any] = {"t": "d", "seq": seq, "base": base_seq}
+    for key, value in current["meta"].items():
+        if base["meta"].get(key) != value:
+            delta[key] = value
+
+    old_stats, new_stats = base["cluster_stats"], current["cluster_stats"]
+    stats = {k: v for k, v in new_stats.items() if k not in old_stats or old_stats[k] != v}
+    stats.update({k: None for k in old_stats if k not in new_stats})
+    if stats:
+        delta["cluster_stats"] = stats
+
+    changed: Dict[str, Dict[str, Any]] = {}
+    for name in _node_names(current, nodes):
+        new_fields = _select(current["nodes"][name], metrics)
+        old_fields = base["nodes"].get(name)
+        if old_fields is None:
+            changed[name] = new_fields
+            continue
+        old_fields = _select(old_fields, metrics)
+        diff = {k: v for k, v in new_fields.items() if k not in old_fields or old_fields[k] != v}
+        diff.update({k: None for k in old_fields if k not in new_fields})
+        if diff:
+            changed[name] = diff
+    if changed:
+        delta["nodes"] = changed
+
+    gone = [n for n in _node_names(base, nodes) if n not in current["nodes"]]
+    if gone:
+        delta["gone"] = gone
+    return delta
+
+
+class MetricsDeltaPublisher:
+    """Abonnements, acquittements et diffusion différentielle sur un namespace."""
+
+    def __init__(self, sio, namespace: str = "/monitoring", keyframe_every: int = 30, history: int = 8,
+                 emit: Optional[Callable] = None) -> None:
+        self.sio = sio
+        # emit(event, data, namespace=, to=): Broadcaster.emit ou sio.emit
+        self._emit = emit or sio.emit
+        self.namespace = namespace
+        self.keyframe_every = max(1, keyframe_every)
+        self.history = max(2, history)
+        self.seq = 0
+        self._snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # Dernier payload reçu sans abonné (texte ou dict), pas encore décodé
+        self._latest_raw: Any = None
+        # sid -> dernier seq acquitté (0 = keyframe attendu)
+        self._acked: Dict[str, int] = {}
+        # sid -> (nœuds, métriques), copie des rooms pour grouper sans les relire
+        self._selections: Dict[str, Tuple[Optional[FrozenSet[str]], Optional[FrozenSet[str]]]] = {}
+        self.stats = {"keyframes": 0, "deltas": 0, "groups": 0}
+
+    @property
+    def subscribers(self) -> List[str]:
+        return list(self._acked)
+
+    def _rooms_selection(self, sid: str) -> Tuple[Optional[FrozenSet[str]], Optional[FrozenSet[str]]]:
+        nodes, metrics = set(), set()
+        for room in self.sio.rooms(sid, namespace=self.namespace):
+            if room.startswith(NODE_ROOM_PREFIX):
+                nodes.add(room[len(NODE_ROOM_PREFIX):])
+            elif room.startswith(METRIC_ROOM_PREFIX):
+                metrics.add(room[len(METRIC_ROOM_PREFIX):])
+        return (frozenset(nodes) or None, frozenset(metrics) or None)
+
+    async def join_full(self, sid: str, namespace: str) -> None:
+        """A la connexion: le client reçoit le payload complet tant qu'il ne s'abonne pas."""
+        await self.sio.enter_room(sid, FULL_ROOM, namespace=namespace)
+
+    async def subscribe(self, sid: str, nodes: Optional[List[str]] = None,
+                        metrics: Optional[List[str]] = None) -> None:
+        """(Re)définit la sélection d'un client et lui envoie un keyframe."""
+        for room in self.sio.rooms(sid, namespace=self.namespace):
+            if room.startswith((NODE_ROOM_PREFIX, METRIC_ROOM_PREFIX)):
+                await self.sio.leave_room(sid, room, namespace=self.namespace)
+        for node in nodes or []:
+            await self.sio.enter_room(sid, f"{NODE_ROOM_PREFIX}{node}", namespace=self.namespace)
+        for metric in metrics or []:
+            await self.sio.enter_room(sid, f"{METRIC_ROOM_PREFIX}{metric}", namespace=self.namespace)
+        await self.sio.enter_room(sid, DELTA_ROOM, namespace=self.namespace)
+        await self.sio.leave_room(sid, FULL_ROOM, namespace=self.namespace)
+        # Même connexion engine.io sur le namespace racine: plus d'event global complet
+        try:
+            eio_sid = self.sio.manager.eio_sid_from_sid(sid, self.namespace)
+            root_sid = self.sio.manager.sid_from_eio_sid(eio_sid, "/") if eio_sid else None
+            if root_sid:
+                await self.sio.leave_room(root_sid, FULL_ROOM, namespace="/")
+        except Exception:
+            pass
+
+        self._selections[sid] = self._rooms_selection(sid)
+        self._acked[sid] = 0
+        await self.send_keyframe(sid)
+
+    def forget(self, sid: str) -> None:
+        self._acked.pop(sid, None)
+        self._selections.pop(sid, None)
+
+    def ack(self, sid: str, seq: Any) -> None:
+        try:
+            seq = int(seq)
+        except (TypeError, ValueError):
+            return
+        if sid in self._acked and seq in self._snapshots and seq > self._acked[sid]:
+            self._acked[sid] = seq
+
+    async def send_keyframe(self, sid: str) -> None:
+        """Keyframe immédiat (abonnement, resync) depuis le dernier snapshot."""
+        if self._latest_raw is not None:
+            raw, self._latest_raw = self._latest_raw, None
+            self._record(raw)
+        if not self._snapshots:
+            return
+        nodes, metrics = self._selections.get(sid, (None, None))
+        payload = build_keyframe(self.seq, self._snapshots[self.seq], nodes, metrics)
+        await self._emit("metrics_delta", payload, to=sid, namespace=self.namespace)
+        self.stats["keyframes"] += 1
+
+    def _record(self, aggregated: Any) -> Dict[str, Any]:
+        if isinstance(aggregated, (str, bytes, bytearray)):
+            aggregated = loads(aggregated)
+        snapshot = normalize_snapshot(aggregated)
+        self.seq += 1
+        self._snapshots[self.seq] = snapshot
+        while len(self._snapshots) > self.history:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    async def publish(self, aggregated: Any) -> None:
+        """Enregistre un nouveau snapshot (dict ou JSON brut) et diffuse par groupe."""
+        if not self._acked:
+            # Personne en delta: pas de décodage, on garde la dernière trame
+            self._latest_raw = aggregated
+            return
+        self._latest_raw = None
+        snapshot = self._record(aggregated)
+
+        with span("ws.delta_build"):
+            force_keyframe = self.seq % self.keyframe_every == 0
+            groups: Dict[Tuple[Any, ...], List[str]] = defaultdict(list)
+            for sid, acked in list(self._acked.items()):
+                base = 0 if force_keyframe or acked not in self._snapshots else acked
+                groups[(self._selections.get(sid, (None, None)), base)].append(sid)
+
+            messages = []
+            for ((nodes, metrics), base), sids in groups.items():
+                if base == 0:
+                    payload = build_keyframe(self.seq, snapshot, nodes, metrics)
+                    self.stats["keyframes"] += len(sids)
+                else:
+                    payload = build_delta(self.seq, base, self._snapshots[base], snapshot, nodes, metrics)
+                    self.stats["deltas"] += len(sids)
+                messages.append((payload, sids))
+            self.stats["groups"] += len(messages)
+
+        for payload, sids in messages:
+            await self._emit("metrics_delta", payload, to=sids, namespace=self.namespace)
@@ -0,0 +1,237 @@
+"""Instrumentation légère des chemins chauds (dispatch, collecte, API).
+
+Histogrammes à buckets fixes (puissances de 2 en nanosecondes, de 1 µs à
+~67 s) et compteurs sans verrou: sous le GIL un incrément de liste suffit,
+on accepte de perdre un échantillon de temps en temps entre threads plutôt
+que de payer un lock à chaque span. Les buckets étant identiques partout,
+les histogrammes de plusieurs process (web, worker Celery) se fusionnent par
+simple addition via Redis.
+
+Usage:
+    with span("collect.parse"):
+        ...
+
+    @timed("dispatch.pick_target")
+    def _pick_target(...): ...
+"""
+
+import functools
+import inspect
+import json
+import os
+import socket
+from bisect import bisect_left as _bisect
+from time import perf_counter_ns
+from typing import Any, Dict, List, Optional
+
+# Bornes supérieures des buckets en ns: 1µs, 2µs, 4µs, ... ~67s
+BUCKET_BOUNDS_NS: List[int] = [1000 << i for i in range(27)]
+
+PERF_ENABLED = os.getenv("PERF_ENABLED", "1") in ("1", "true", "True")
+
+# Préfixe des snapshots publiés dans Redis par les autres process
+REDIS_KEY_PREFIX = "perf:spans:"
+
+
+class Histogram:
+    """Histogramme de durées à buckets fixes."""
+
+    __slots__ = ("name", "counts", "sum_ns", "max_ns")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # Un bucket de plus pour tout ce qui dépasse la dernière borne
+        self.counts: List[int] = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    @property
+    def count(self) -> int:
+        # Dérivé des buckets: un incrément de moins sur le chemin chaud
+        return sum(self.counts)
+
+    def observe_ns(self, duration_ns: int) -> None:
+        self.counts[_bisect(BUCKET_BOUNDS_NS, duration_ns)] += 1
+        self.sum_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def clear(self) -> None:
+        # Remise à zéro en place (la liste peut être capturée par un span en cours)
+        self.counts[:] = [0] * len(self.counts)
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """Additionne un snapshot (to_dict) dans cet histogramme."""
+        for i, c in enumerate(data.get("counts", [])[:len(self.counts)]):
+            self.counts[i] += int(c)
+        self.sum_ns += int(data.get("sum_ns", 0))
+        self.max_ns = max(self.max_ns, int(data.get("max_ns", 0)))
+
+    def quantile_ns(self, q: float) -> float:
+        """Estime le quantile q par interpolation linéaire dans le bucket."""
+        total = self.count
+        if total == 0:
+            return 0.0
+        target = q * total
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            if c == 0:
+                continue
+            if cumulative + c >= target:
+                lower = BUCKET_BOUNDS_NS[i - 1] if i > 0 else 0
+                upper = BUCKET_BOUNDS_NS[i] if i < len(BUCKET_BOUNDS_NS) else self.max_ns
+                estimate = lower + (upper - lower) * ((target - cumulative) / c)
+                return float(min(estimate, self.max_ns))
+            cumulative += c
+        return float(self.max_ns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": list(self.counts), "count": self.count, "sum_ns": self.sum_ns, "max_ns": self.max_ns}
+
+    def summary(self) -> Dict[str, Any]:
+        """Résumé lisible en millisecondes."""
+        total = self.count
+        mean_ns = self.sum_ns / total if total else 0.0
+        return {
+            "count": total,
+            "total_ms": self.sum_ns / 1e6,
+            "mean_ms": mean_ns / 1e6,
+            "p50_ms": self.quantile_ns(0.50) / 1e6,
+            "p95_ms": self.quantile_ns(0.95) / 1e6,
+            "p99_ms": self.quantile_ns(0.99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class _Span:
+    """Context manager de mesure (sync et async)."""
+
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, hist: Histogram) -> None:
+        self._hist = hist
+
+    def __enter__(self):
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # observe_ns inliné: un appel de méthode en moins par span
+        d = perf_counter_ns() - self._start
+        h = self._hist
+        h.counts[_bisect(BUCKET_BOUNDS_NS, d)] += 1
+        h.sum_ns += d
+        if d > h.max_ns:
+            h.max_ns = d
+
+    async def __aenter__(self):
+        self._start = perf_counter_ns()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._hist.observe_ns(perf_counter_ns() - self._start)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class PerfRegistry:
+    """Registre des histogrammes du process."""
+
+    def __init__(self, enabled: bool = PERF_ENABLED) -> None:
+        self.enabled = enabled
+        self._histograms: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        hist = self._histograms.get(name)
+        if hist is None:
+            hist = self._histograms.setdefault(name, Histogram(name))
+        return hist
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NOOP
+        hist = self._histograms.get(name)
+        return _Span(hist if hist is not None else self.histogram(name))
+
+    def observe(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            self.histogram(name).observe_ns(int(seconds * 1e9))
+
+    def timed(self, name: Optional[str] = None):
+        """Décorateur: mesure chaque appel (fonction sync ou coroutine)."""
+        def decorator(func):
+            span_name = name or f"{func.__module__}.{func.__qualname__}"
+            hist = self.histogram(span_name)
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    start = perf_counter_ns()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        hist.observe_ns(perf_counter_ns() - start)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    hist.observe_ns(perf_counter_ns() - start)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: h.to_dict() for name, h in list(self._histograms.items()) if h.sum_ns}
+
+    def summary(self, extra_snapshots: Optional[List[Dict[str, Dict[str, Any]]]] = None) -> Dict[str, Dict[str, Any]]:
+        """p50/p95/p99 par span, en fusionnant éventuellement d'autres process."""
+        merged: Dict[str, Histogram] = {}
+        for snap in [self.snapshot()] + list(extra_snapshots or []):
+            for name, data in snap.items():
+                merged.setdefault(name, Histogram(name)).merge(data)
+        return {name: merged[name].summary() for name in sorted(merged)}
+
+    def reset(self) -> None:
+        # Remise à zéro en place: les décorateurs gardent une référence directe
+        for hist in list(self._histograms.values()):
+            hist.clear()
+
+    def flush_to_redis(self, client, source: Optional[str] = None, ttl_s: int = 3600) -> None:
+        """Publie le snapshot du process dans Redis (lu par /api/perf)."""
+        snap = self.snapshot()
+        if not snap:
+            return
+        source = source or f"{socket.gethostname()}:{os.getpid()}"
+        client.setex(f"{REDIS_KEY_PREFIX}{source}", ttl_s, json.dumps(snap))
+
+
+# Instance globale
+perf = PerfRegistry()
+span = perf.span
+timed = perf.timed
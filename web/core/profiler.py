@@ -0,0 +1,187 @@
+"""Profiler par échantillonnage et moniteur de lag de la boucle asyncio.
+
+Opt-in via PROFILER_ENABLED=1. Deux outils:
+
+- SamplingProfiler: un thread relève la pile du thread principal et de
+  celui de la boucle N fois par seconde pendant une durée donnée, puis
+  produit un fichier "collapsed stacks" (format flamegraph.pl / speedscope).
+- LoopLagMonitor: la boucle met à jour un heartbeat, un thread chien de
+  garde vérifie qu'il avance. Si la boucle est bloquée plus longtemps que le
+  seuil, le chien de garde capture la pile pendant le blocage: on voit
+  directement le callback ou la coroutine fautive.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from web.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") in ("1", "true", "True")
+PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "60"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Chemins courts: web/core/x.py plutôt que le chemin absolu
+    for marker in ("/web/", "\\web\\", "site-packages/", "site-packages\\"):
+        idx = filename.rfind(marker)
+        if idx >= 0:
+            filename = filename[idx + 1:]
+            break
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def format_stack(frame, max_depth: int = 128) -> List[str]:
+    """Pile racine -> feuille sous forme de labels."""
+    stack = []
+    while frame is not None and len(stack) < max_depth:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    """Échantillonne des piles de threads et agrège en collapsed stacks."""
+
+    def __init__(self, thread_ids: Dict[str, int], rate_hz: float = 100.0) -> None:
+        self.thread_ids = thread_ids
+        self.interval = 1.0 / max(1.0, min(rate_hz, 1000.0))
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+
+    def sample_once(self) -> None:
+        frames = sys._current_frames()
+        for label, tid in self.thread_ids.items():
+            frame = frames.get(tid)
+            if frame is None:
+                continue
+            self.samples[";".join([label] + format_stack(frame))] += 1
+        self.sample_count += 1
+
+    def run(self, seconds: float) -> None:
+        """Bloquant: à appeler dans un thread dédié."""
+        deadline = time.monotonic() + seconds
+        next_tick = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            self.sample_once()
+            next_tick += self.interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+
+    def collapsed(self) -> str:
+        """Une ligne "frame;frame;frame count" par pile distincte."""
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+class LoopLagMonitor:
+    """Détecte les callbacks qui bloquent la boucle au-delà d'un seuil."""
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_THRESHOLD_MS, max_events: int = 200) -> None:
+        self.threshold_s = threshold_ms / 1000.0
+        self.tick_s = min(0.05, self.threshold_s / 2)
+        self.events: deque = deque(maxlen=max_events)
+        self.max_lag_ms = 0.0
+        self.blocked_count = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def loop_thread_id(self) -> Optional[int]:
+        return self._loop_thread_id
+
+    async def _beat(self) -> None:
+        while not self._stop.is_set():
+            expected = time.monotonic() + self.tick_s
+            await asyncio.sleep(self.tick_s)
+            now = time.monotonic()
+            lag_ms = max(0.0, (now - expected) * 1000.0)
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        captured_for = None
+        while not self._stop.wait(self.tick_s):
+            blocked_s = time.monotonic() - self._heartbeat
+            if blocked_s < self.threshold_s + self.tick_s:
+                captured_for = None
+                continue
+            # Une seule capture par blocage (même heartbeat)
+            if captured_for == self._heartbeat:
+                continue
+            captured_for = self._heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            self.blocked_count += 1
+            self.events.append({
+                "at": datetime.now().isoformat(),
+                "blocked_ms": round(blocked_s * 1000.0, 1),
+                "stack": format_stack(frame) if frame is not None else [],
+            })
+            logger.warning(f"Boucle asyncio bloquée depuis {blocked_s * 1000.0:.0f} ms")
+
+    def start(self) -> None:
+        """A appeler depuis la boucle à surveiller."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold_s * 1000.0,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "blocked_count": self.blocked_count,
+            "events": list(self.events),
+        }
+
+
+# Instances globales (le moniteur n'est démarré que si PROFILER_ENABLED)
+loop_lag_monitor = LoopLagMonitor()
+_profile_lock = threading.Lock()
+
+
+async def profile_process(seconds: float, rate_hz: float) -> SamplingProfiler:
+    """Échantillonne le thread principal et celui de la boucle pendant `seconds`.
+
+    Lève RuntimeError si un profil est déjà en cours.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("Un profil est déjà en cours")
+    try:
+        threads = {"main": threading.main_thread().ident}
+        loop_tid = threading.get_ident()
+        if loop_tid != threads["main"]:
+            threads["loop"] = loop_tid
+        profiler = SamplingProfiler(threads, rate_hz=rate_hz)
+        await asyncio.to_thread(profiler.run, min(seconds, PROFILER_MAX_SECONDS))
+        return profiler
+    finally:
+        _profile_lock.release()
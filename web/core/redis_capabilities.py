@@ -0,0 +1,156 @@
+"""Détection des capacités du serveur Redis (modules, version).
+
+Le probe tourne au démarrage puis périodiquement (TTL). En cas d'erreur
+réseau on garde le dernier résultat connu et on réessaie avec un backoff
+exponentiel, au lieu de figer "pas de TimeSeries" pour toute la vie du process.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import redis
+
+from web.config.metrics_config import REDIS_CONFIG, REDIS_CAPS_CONFIG
+from web.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Versions minimales (format MODULE LIST: 10600 = 1.6.0)
+TS_GROUPBY_MIN_VERSION = 10600
+
+
+def _parse_version(raw: str) -> tuple:
+    """Convertit "7.2.4" en (7, 2, 4). Retourne () si illisible."""
+    try:
+        return tuple(int(p) for p in str(raw).split(".")[:3])
+    except Exception:
+        return ()
+
+
+def _parse_modules(raw) -> Dict[str, int]:
+    """Normalise la réponse MODULE LIST en dict {nom_minuscule: version}.
+
+    Selon la version de redis-py on reçoit une liste de dicts ou une liste
+    plate [name, x, ver, y, ...].
+    """
+    modules: Dict[str, int] = {}
+    for mod in raw or []:
+        if isinstance(mod, dict):
+            name = mod.get("name")
+            ver = mod.get("ver", 0)
+        else:
+            items = list(mod)
+            pairs = dict(zip(items[0::2], items[1::2]))
+            name = pairs.get("name")
+            ver = pairs.get("ver", 0)
+        if isinstance(name, bytes):
+            name = name.decode()
+        if not name:
+            continue
+        try:
+            modules[str(name).lower()] = int(ver)
+        except Exception:
+            modules[str(name).lower()] = 0
+    return modules
+
+
+class RedisCapabilities:
+    """Cache des capacités Redis avec TTL et backoff."""
+
+    def __init__(self, ttl_s: Optional[int] = None, backoff_max_s: Optional[int] = None) -> None:
+        self.ttl_s = ttl_s if ttl_s is not None else REDIS_CAPS_CONFIG["ttl_s"]
+        self.backoff_initial_s = REDIS_CAPS_CONFIG["backoff_initial_s"]
+        self.backoff_max_s = backoff_max_s if backoff_max_s is not None else REDIS_CAPS_CONFIG["backoff_max_s"]
+        self._lock = threading.Lock()
+        self._caps: Optional[Dict[str, Any]] = None
+        self._next_probe = 0.0
+        self._backoff = self.backoff_initial_s
+        self._last_error: Optional[str] = None
+        # True quand la boucle de fond tourne: les lectures ne font plus d'I/O
+        self._background = False
+
+    def probe(self) -> Dict[str, Any]:
+        """Interroge Redis (INFO server + MODULE LIST) et met à jour le cache."""
+        try:
+            client = redis.Redis(**REDIS_CONFIG)
+            info = client.info("server")
+            try:
+                modules = _parse_modules(client.module_list())
+            except redis.ResponseError:
+                # MODULE LIST interdit (ACL) ou serveur sans modules
+                modules = {}
+            caps = self._build(info.get("redis_version", ""), modules)
+            with self._lock:
+                self._caps = caps
+                self._next_probe = time.monotonic() + self.ttl_s
+                self._backoff = self.backoff_initial_s
+                self._last_error = None
+            return caps
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+                self._next_probe = time.monotonic() + self._backoff
+                retry_in = self._backoff
+                self._backoff = min(self._backoff * 2, self.backoff_max_s)
+            logger.warning(f"Probe capacités Redis échoué (retry dans {retry_in}s): {e}")
+            return self.snapshot(refresh=False)
+
+    def _build(self, version: str, modules: Dict[str, int]) -> Dict[str, Any]:
+        ts_ver = modules.get("timeseries")
+        json_ver = modules.get("rejson") or modules.get("json")
+        return {
+            "server_version": version,
+            "server_version_tuple": _parse_version(version),
+            "modules": modules,
+            "timeseries": ts_ver is not None,
+            "timeseries_version": ts_ver,
+            "json": json_ver is not None,
+            "json_version": json_ver,
+            # Chemins rapides disponibles
+            "ts_madd": ts_ver is not None,
+            "ts_mrange_groupby": ts_ver is not None and ts_ver >= TS_GROUPBY_MIN_VERSION,
+            "probed_at": time.time(),
+        }
+
+    def snapshot(self, refresh: bool = True) -> Dict[str, Any]:
+        """Retourne les capacités connues.
+
+        - refresh=True: relance un probe synchrone si le TTL (ou le backoff) est écoulé.
+          Utile hors de l'app web (worker Celery, scripts) où la boucle de fond ne tourne pas.
+          Ignoré quand la boucle de fond est active.
+        """
+        if refresh and not self._background and time.monotonic() >= self._next_probe:
+            return self.probe()
+        with self._lock:
+            caps = dict(self._caps) if self._caps else self._build("", {})
+            caps["stale"] = time.monotonic() >= self._next_probe
+            caps["last_error"] = self._last_error
+            return caps
+
+    def supports(self, feature: str) -> bool:
+        """Raccourci: supports("timeseries"), supports("ts_madd"), ..."""
+        return bool(self.snapshot().get(feature, False))
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        """Boucle de re-probe pour l'app web (le probe bloquant part dans un thread)."""
+        self._background = True
+        try:
+            while stop_event is None or not stop_event.is_set():
+                if time.monotonic() >= self._next_probe:
+                    await asyncio.to_thread(self.probe)
+                delay = max(0.5, self._next_probe - time.monotonic())
+                try:
+                    if stop_event is None:
+                        await asyncio.sleep(delay)
+                    else:
+                        await asyncio.wait_for(stop_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._background = False
+
+
+# Instance globale
+redis_capabilities = RedisCapabilities()
@@ -4,13 +4,13 @@ import time
 import redis
 
 from web.config.metrics_config import REDIS_CONFIG
+from web.core.redis_capabilities import redis_capabilities
 
 # Helpers simples autour de RedisTimeSeries et Redis Streams
 # Objectif: garder un code lisible et réutilisable pour produire/consommer
 # des métriques et lire des séries temporelles.
-
-# Cache de disponibilité du module RedisTimeSeries
-_TS_AVAILABLE = None
+# Les capacités du serveur (modules, versions) viennent de redis_capabilities:
+# chaque helper choisit le chemin le plus rapide disponible.
 
 
 def get_redis_client():
@@ -27,23 +27,12 @@ def get_redis_client():
 
 
 def has_timeseries():
-    """Retourne True si le module RedisTimeSeries est disponible."""
-    global _TS_AVAILABLE
-    if _TS_AVAILABLE is not None:
-        return _TS_AVAILABLE
-    try:
-        client = get_redis_client()
-        modules = client.execute_command("MODULE", "LIST")
-        found = False
-        for mod in modules:
-            if "timeseries" in str(mod).lower():
-                found = True
-                break
-        _TS_AVAILABLE = found
-        return found
-    except Exception:
-        _TS_AVAILABLE = False
-        return False
+    """Retourne True si le module RedisTimeSeries est disponible.
+
+    Lecture du cache de capacités (re-probé selon le TTL), plus de faux
+    négatif figé après une erreur transitoire.
+    """
+    return redis_capabilities.supports("timeseries")
 
 
 def ts_create(
@@ -126,6 +115,53 @@ def ts_add(
         raise
 
 
+def ts_madd(samples, labels_by_key=None, retention_ms_if_create: Optional[int] = None):
+    """Ajoute plusieurs points en un aller-retour.
+
+    - samples: liste de (key, value) ou (key, timestamp_ms, value).
+    - labels_by_key: labels à poser si une série doit être créée.
+    Utilise TS.MADD si disponible, sinon un pipeline de TS.ADD.
+    Retourne le nombre de points écrits.
+    """
+    if not samples or not has_timeseries():
+        return 0
+    labels_by_key = labels_by_key or {}
+    now_ms = int(time.time() * 1000)
+    normalized = []
+    for sample in samples:
+        if len(sample) == 2:
+            normalized.append((sample[0], now_ms, sample[1]))
+        else:
+            normalized.append((sample[0], sample[1] if sample[1] is not None else now_ms, sample[2]))
+
+    client = get_redis_client()
+    if redis_capabilities.supports("ts_madd"):
+        args = ["TS.MADD"]
+        for key, ts, value in normalized:
+            args.extend([key, ts, value])
+        replies = client.execute_command(*args)
+    else:
+        pipe = client.pipeline(transaction=False)
+        for key, ts, value in normalized:
+            pipe.execute_command("TS.ADD", key, ts, value)
+        replies = pipe.execute(raise_on_error=False)
+
+    # Les séries absentes reviennent en erreur: création lazy puis réécriture
+    written = 0
+    missing = []
+    for sample, reply in zip(normalized, replies):
+        if isinstance(reply, Exception):
+            if "does not exist" in str(reply):
+                missing.append(sample)
+            continue
+        written += 1
+    for key, ts, value in missing:
+        ts_create(key, labels=labels_by_key.get(key), retention_ms=retention_ms_if_create)
+        client.execute_command("TS.ADD", key, ts, value)
+        written += 1
+    return written
+
+
 def ts_alter(key, labels=None):
     """Modifie les labels d'une série existante avec TS.ALTER.
     
@@ -241,15 +277,20 @@ def ts_mrange(
     filters,
     aggregation: Optional[str] = None,
     bucket_ms: Optional[int] = None,
+    groupby: Optional[str] = None,
+    reduce: str = "avg",
 ):
     """Lit plusieurs séries par labels avec TS.MRANGE.
 
     - filters: liste de filtres label=value (ex: ["metric=cpu.usage"]).
     - aggregation/bucket_ms optionnels.
+    - groupby/reduce: regroupe les séries par label (ex: groupby="metric", reduce="avg").
+      GROUPBY côté serveur si la version du module le permet, sinon regroupement en Python.
     Retourne une liste d'objets: {key, labels, points}.
     """
     if not has_timeseries():
         return []
+    server_groupby = bool(groupby) and redis_capabilities.supports("ts_mrange_groupby")
     client = get_redis_client()
     args = ["TS.MRANGE", from_ts, to_ts]
     if aggregation and bucket_ms:
@@ -261,6 +302,8 @@ def ts_mrange(
         args.extend(filters)
     else:
         args.append(str(filters))
+    if server_groupby:
+        args.extend(["GROUPBY", groupby, "REDUCE", reduce])
 
     try:
         raw = client.execute_command(*args)
@@ -278,6 +321,38 @@ def ts_mrange(
         labels = {k: v for k, v in labels_list}
         points = [(int(ts), float(val)) for ts, val in samples]
         result.append({"key": key, "labels": labels, "points": points})
+    if groupby and not server_groupby:
+        return _group_series(result, groupby, reduce)
     return result
 
 
+_REDUCERS = {
+    "sum": sum,
+    "avg": lambda vals: sum(vals) / len(vals),
+    "min": min,
+    "max": max,
+    "count": len,
+}
+
+
+def _group_series(series, groupby, reduce):
+    """Equivalent client de GROUPBY/REDUCE pour les vieux modules TimeSeries."""
+    reducer = _REDUCERS.get(reduce, _REDUCERS["avg"])
+    groups = {}
+    for serie in series:
+        value = serie["labels"].get(groupby)
+        if value is None:
+            continue
+        group = groups.setdefault(value, {"sources": [], "by_ts": {}})
+        group["sources"].append(serie["key"])
+        for ts, val in serie["points"]:
+            group["by_ts"].setdefault(ts, []).append(val)
+    result = []
+    for value, group in groups.items():
+        points = [(ts, float(reducer(vals))) for ts, vals in sorted(group["by_ts"].items())]
+        result.append({
+            "key": f"{groupby}={value}",
+            "labels": {groupby: value, "__reducer__": reduce, "__source__": ",".join(group["sources"])},
+            "points": points,
+        })
+    return result
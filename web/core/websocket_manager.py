@@ -7,33 +7,84 @@ from typing import Dict, Set, Any
 from datetime import datetime
 
 import redis
+import redis.asyncio as aioredis
 import socketio
 from socketio import AsyncServer, AsyncNamespace
 
-from web.config.metrics_config import REDIS_CONFIG
+from web.config.metrics_config import REDIS_CONFIG, WS_CLUSTER_CONFIG, WS_PUBSUB_CONFIG
 from web.config.logging_config import get_logger
+from web.core.metrics_push import FULL_ROOM, MetricsDeltaPublisher
+from web.core.perf import span
+from web.core.ws_cluster import ClusterRedisManager, LeaderLease, PresenceRegistry, worker_id
+from web.core.ws_fanout import Broadcaster, as_json_text, ws_json
 
 logger = get_logger(__name__)
 
+# Canal Redis -> (namespace, event) en plus de l'event global redis_<canal>
+NAMESPACE_EVENTS = {
+    "cluster:metrics": ("/monitoring", "cluster_metrics"),
+    "cluster:health": ("/health", "health_update"),
+    "cluster:alerts": ("/monitoring", "alerts_update"),
+    # Fin d'une tâche lancée par l'API ({"task", "task_id", "status", ...})
+    "celery:tasks": ("/monitoring", "task_completed"),
+}
+
 
 class WebSocketManager:
     """Gestionnaire central pour les connexions WebSocket."""
     
     def __init__(self):
+        # Multi-workers: rooms et emits partagés via Redis, un seul abonné cluster:*
+        self.cluster = WS_CLUSTER_CONFIG["enabled"]
+        self.worker_id = worker_id()
+        client_manager = None
+        if self.cluster:
+            client_manager = ClusterRedisManager(
+                WS_CLUSTER_CONFIG["redis_url"], WS_CLUSTER_CONFIG["manager_channel"], on_relay=self._enqueue
+            )
         self.sio = AsyncServer(
             cors_allowed_origins="*",
             async_mode="asgi",
             logger=False,
             engineio_logger=False,
             allow_headers=["*"],
-            transports=["websocket", "polling"]
+            # Sans sessions collantes, le long-polling ne survit pas à plusieurs workers
+            transports=["websocket"] if self.cluster else ["websocket", "polling"],
+            json=ws_json,
+            client_manager=client_manager
         )
         self.app = None
         self.redis_client = redis.Redis(**REDIS_CONFIG)
+        self.async_redis = None
         self.pubsub = None
-        self.connected_clients: Set[str] = set()
+        self.presence = PresenceRegistry(
+            WS_CLUSTER_CONFIG["presence_prefix"], self.worker_id, WS_CLUSTER_CONFIG["leader_ttl_s"]
+        )
+        # Clients de ce processus (la présence Redis couvre tous les workers)
+        self.connected_clients: Set[str] = self.presence.local
+        self.lease = LeaderLease(
+            WS_CLUSTER_CONFIG["leader_key"], self.worker_id, WS_CLUSTER_CONFIG["leader_ttl_s"]
+        )
+        self._cluster_task = None
         self.namespaces = {}
         
+        # Relais pub/sub: une file bornée et un worker de diffusion par canal
+        self.channels = list(WS_PUBSUB_CONFIG["channels"])
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._fanout_tasks = []
+        self._listener_task = None
+        self._backoff = WS_PUBSUB_CONFIG["backoff_initial_s"]
+        self.pubsub_stats = {"received": 0, "dispatched": 0, "dropped": 0, "restarts": 0}
+        
+        # Diffusion encodée une fois, clients lents sautés
+        self.broadcaster = Broadcaster(self.sio, max_backlog=WS_PUBSUB_CONFIG["client_max_backlog"])
+        
+        # Push différentiel des métriques pour les clients abonnés sur /monitoring
+        self.metrics_push = MetricsDeltaPublisher(
+            self.sio, "/monitoring", keyframe_every=WS_PUBSUB_CONFIG["keyframe_every"],
+            emit=self.broadcaster.emit
+        )
+        
     def init_app(self, app):
         """Initialiser l'application WebSocket avec FastAPI."""
         self.app = socketio.ASGIApp(self.sio, app)
@@ -44,7 +95,7 @@ class WebSocketManager:
         """Configurer les namespaces WebSocket."""
         try:
             # Namespace pour le monitoring du cluster
-            monitoring_ns = MonitoringNamespace("/monitoring")
+            monitoring_ns = MonitoringNamespace("/monitoring", self.metrics_push)
             self.sio.register_namespace(monitoring_ns)
             self.namespaces["monitoring"] = monitoring_ns
             
@@ -63,7 +114,8 @@ class WebSocketManager:
         @self.sio.event
         async def connect(sid, environ):
             """Event appelé lors d'une connexion."""
-            self.connected_clients.add(sid)
+            await self.presence.add(sid)
+            await self.metrics_push.join_full(sid, "/")
             await self.sio.emit("connection_confirmed", {
                 "sid": sid,
                 "timestamp": datetime.now().isoformat()
@@ -72,90 +124,199 @@ class WebSocketManager:
         @self.sio.event
         async def disconnect(sid):
             """Event appelé lors d'une déconnexion."""
-            self.connected_clients.discard(sid)
+            await self.presence.discard(sid)
     
     async def start_redis_subscriber(self):
-        """Démarrer l'abonnement Redis pour recevoir les événements."""
-        self.pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
-        
-        # S'abonner aux canaux Redis pour le monitoring et Celery
-        self.pubsub.subscribe(
-            "cluster:metrics",
-            "cluster:health",
-            "cluster:alerts",
-            "celery:metrics"
-        )
-        
-        # Boucle pour écouter les messages Redis
-        asyncio.create_task(self._redis_listener())
-        
+        """Démarrer le relais Redis pub/sub -> WebSocket (listener supervisé + diffusion).
+
+        En multi-workers, seul le détenteur du bail écoute cluster:* et relaie
+        aux autres via le manager socket.io; chaque worker diffuse à ses clients.
+        """
+        if self._fanout_tasks:
+            return
+        self.async_redis = aioredis.Redis(**REDIS_CONFIG)
+        coalesce = set(WS_PUBSUB_CONFIG["coalesce_channels"])
+        for channel in self.channels:
+            size = 1 if channel in coalesce else WS_PUBSUB_CONFIG["queue_size"]
+            self._queues[channel] = asyncio.Queue(maxsize=size)
+            self._fanout_tasks.append(asyncio.create_task(self._fanout_worker(channel)))
+        if self.cluster:
+            self.lease.client = self.async_redis
+            self.presence.client = self.async_redis
+            self._cluster_task = asyncio.create_task(self._cluster_heartbeat())
+        else:
+            self._start_listener()
+
+    def _start_listener(self):
+        if self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._supervise_listener())
+
+    async def _stop_listener(self):
+        task, self._listener_task = self._listener_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _cluster_heartbeat(self):
+        """Renouvelle présence et bail; prend ou lâche l'abonnement cluster:*."""
+        while True:
+            try:
+                await self.presence.refresh()
+                if await self.lease.acquire_or_renew():
+                    if self._listener_task is None:
+                        logger.info(f"Worker {self.worker_id} élu relais des canaux cluster:*")
+                        self._start_listener()
+                elif self._listener_task is not None:
+                    logger.info(f"Worker {self.worker_id} n'est plus relais, désabonnement")
+                    await self._stop_listener()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Bail non confirmé: mieux vaut aucun relais que deux
+                logger.error(f"Heartbeat WebSocket en échec: {e}")
+                self.lease.is_leader = False
+                await self._stop_listener()
+            await asyncio.sleep(WS_CLUSTER_CONFIG["heartbeat_s"])
+
+    async def stop_redis_subscriber(self):
+        """Arrêter le listener, le heartbeat et les workers de diffusion."""
+        tasks = [t for t in [self._cluster_task, self._listener_task] + self._fanout_tasks if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._cluster_task = None
+        self._listener_task = None
+        self._fanout_tasks = []
+        if self.async_redis is not None:
+            if self.cluster:
+                await self.lease.release()
+                await self.presence.clear()
+                self.lease.client = None
+                self.presence.client = None
+            close = getattr(self.async_redis, "aclose", None) or self.async_redis.close
+            await close()
+            self.async_redis = None
+
+    async def count_connected_clients(self) -> int:
+        """Clients connectés, tous workers confondus en mode multi-workers."""
+        try:
+            return await self.presence.count()
+        except Exception as e:
+            logger.warning(f"Comptage de présence impossible: {e}")
+            return len(self.connected_clients)
+
+    async def _supervise_listener(self):
+        """Relance le listener après une erreur, avec backoff exponentiel."""
+        while True:
+            try:
+                await self._redis_listener()
+                logger.warning("Abonnement Redis terminé, reprise")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erreur dans le listener Redis (reprise dans {self._backoff:.1f}s): {e}")
+            self.pubsub_stats["restarts"] += 1
+            await asyncio.sleep(self._backoff)
+            self._backoff = min(self._backoff * 2, WS_PUBSUB_CONFIG["backoff_max_s"])
+
     async def _redis_listener(self):
-        """Écouter les messages Redis et les diffuser via WebSocket."""
+        """Écouter les messages Redis (itérateur asynchrone) et les répartir par canal."""
+        pubsub = self.async_redis.pubsub(ignore_subscribe_messages=True)
+        self.pubsub = pubsub
         try:
-            while True:
-                message = self.pubsub.get_message(timeout=1.0)
-                if message:
-                    # Ne traiter que les messages userland
-                    if message.get("type") != "message":
-                        await asyncio.sleep(0)
-                        continue
+            await pubsub.subscribe(*self.channels)
+            # Abonnement établi: le prochain incident repart du backoff initial
+            self._backoff = WS_PUBSUB_CONFIG["backoff_initial_s"]
+            async for message in pubsub.listen():
+                # Ne traiter que les messages userland
+                if message.get("type") == "message":
+                    if self.cluster:
+                        await self.sio.manager.relay(message)
+                    self._enqueue(message)
+        finally:
+            self.pubsub = None
+            try:
+                close = getattr(pubsub, "aclose", None) or pubsub.close
+                await close()
+            except Exception:
+                pass
 
-                    channel = message.get("channel")
-                    if isinstance(channel, (bytes, bytearray)):
-                        channel = channel.decode("utf-8", errors="ignore")
+    def _enqueue(self, message: Dict[str, Any]):
+        """Empile un message dans la file de son canal (le plus ancien saute si pleine)."""
+        queue = self._queues.get(message.get("channel"))
+        if queue is None:
+            return
+        self.pubsub_stats["received"] += 1
+        if queue.full():
+            # Client lent: seul l'état le plus récent compte pour le dashboard
+            queue.get_nowait()
+            self.pubsub_stats["dropped"] += 1
+        queue.put_nowait(message)
 
-                    data_raw = message.get("data")
-                    # Convertir en dict si possible
-                    if isinstance(data_raw, (bytes, bytearray)):
-                        data_raw = data_raw.decode("utf-8", errors="ignore")
-                    if isinstance(data_raw, str):
-                        try:
-                            data = json.loads(data_raw)
-                        except Exception:
-                            data = {"message": data_raw}
-                    elif isinstance(data_raw, dict):
-                        data = data_raw
-                    else:
-                        data = {"data": data_raw}
+    async def _fanout_worker(self, channel: str):
+        """Diffuse les messages d'un canal dans l'ordre d'arrivée."""
+        queue = self._queues[channel]
+        while True:
+            message = await queue.get()
+            try:
+                await self._dispatch_message(message)
+                self.pubsub_stats["dispatched"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erreur de diffusion WebSocket ({channel}): {e}")
 
-                    # Diffuser l'événement aux clients connectés
-                    if isinstance(channel, str) and channel:
-                        # 1) Event global (compat)
-                        event_name = f"redis_{channel.replace(':', '_')}"
-                        await self.sio.emit(event_name, data)
+    def get_pubsub_stats(self) -> Dict[str, Any]:
+        """Compteurs du relais pub/sub et profondeur des files."""
+        return {
+            **self.pubsub_stats,
+            "running": self._listener_task is not None and not self._listener_task.done(),
+            "worker": self.worker_id,
+            "leader": self.lease.is_leader if self.cluster else True,
+            "queue_depth": {channel: queue.qsize() for channel, queue in self._queues.items()},
+            "fanout": self.broadcaster.get_stats(),
+            "relay": getattr(self.sio.manager, "relay_stats", None),
+        }
 
-                        # 2) Event vers namespaces dédiés
-                        if channel == "cluster:metrics":
-                            # Monitoring namespace
-                            try:
-                                await self.sio.emit("cluster_metrics", data, namespace="/monitoring")
-                            except Exception:
-                                pass
-                        elif channel == "cluster:health":
-                            # Health namespace
-                            try:
-                                await self.sio.emit("health_update", data, namespace="/health")
-                            except Exception:
-                                pass
-                        elif channel == "cluster:alerts":
-                            # Monitoring namespace
-                            try:
-                                await self.sio.emit("alerts_update", data, namespace="/monitoring")
-                            except Exception:
-                                pass
-                    
-                await asyncio.sleep(0.1)
-                
-        except Exception as e:
-            logger.error(f"Erreur dans le listener Redis: {e}")
-            await asyncio.sleep(5)
-            # Redémarrer le listener en cas d'erreur
-            asyncio.create_task(self._redis_listener())
+    async def _dispatch_message(self, message: Dict[str, Any]):
+        """Relaie un message pub/sub aux clients WebSocket.
+
+        Le JSON reçu de Redis part tel quel (aucun décodage); seul le push
+        différentiel de cluster:metrics le décode, et seulement s'il a des abonnés.
+        """
+        channel = message.get("channel")
+        if isinstance(channel, (bytes, bytearray)):
+            channel = channel.decode("utf-8", errors="ignore")
+        if not isinstance(channel, str) or not channel:
+            return
+        payload = as_json_text(message.get("data"))
+
+        async with span("ws.fanout"):
+            # Payload complet: pour cluster:metrics seulement les clients hors push différentiel
+            room = FULL_ROOM if channel == "cluster:metrics" else None
+
+            # 1) Event global (compat)
+            await self.broadcaster.emit_raw(f"redis_{channel.replace(':', '_')}", payload, to=room)
+
+            # 2) Event vers le namespace dédié
+            target = NAMESPACE_EVENTS.get(channel)
+            if target is not None:
+                namespace, event = target
+                await self.broadcaster.emit_raw(event, payload, namespace=namespace, to=room)
+
+            if channel == "cluster:metrics":
+                try:
+                    await self.metrics_push.publish(payload)
+                except Exception as e:
+                    logger.error(f"Erreur du push différentiel: {e}")
     
     async def publish_event(self, channel: str, data: Dict[str, Any]):
         """Publier un événement sur Redis."""
         try:
-            self.redis_client.publish(channel, json.dumps(data))
+            if self.async_redis is not None:
+                await self.async_redis.publish(channel, json.dumps(data))
+            else:
+                self.redis_client.publish(channel, json.dumps(data))
         except Exception as e:
             logger.error(f"Erreur lors de la publication sur Redis: {e}")
     
@@ -170,12 +331,15 @@ class WebSocketManager:
 class MonitoringNamespace(AsyncNamespace):
     """Namespace WebSocket pour le monitoring du cluster."""
     
-    def __init__(self, namespace):
+    def __init__(self, namespace, metrics_push: MetricsDeltaPublisher = None):
         super().__init__(namespace)
         self.logger = get_logger(__name__)
+        self.metrics_push = metrics_push
         
     async def on_connect(self, sid, environ):
         """Appelé lors de la connexion au namespace."""
+        if self.metrics_push is not None:
+            await self.metrics_push.join_full(sid, self.namespace)
         await self.emit("monitoring_connected", {
             "namespace": "/monitoring",
             "timestamp": datetime.now().isoformat()
@@ -192,8 +356,26 @@ class MonitoringNamespace(AsyncNamespace):
         
     async def on_disconnect(self, sid):
         """Appelé lors de la déconnexion du namespace."""
-        pass
+        if self.metrics_push is not None:
+            self.metrics_push.forget(sid)
         
+    async def on_subscribe_metrics(self, sid, data):
+        """Abonnement au push différentiel: {"nodes": [...], "metrics": [...]} (vide = tout)."""
+        if self.metrics_push is None:
+            return
+        data = data or {}
+        await self.metrics_push.subscribe(sid, nodes=data.get("nodes"), metrics=data.get("metrics"))
+    
+    async def on_metrics_ack(self, sid, data):
+        """Le client a appliqué le snapshot `seq`: les prochains deltas partent de là."""
+        if self.metrics_push is not None and isinstance(data, dict):
+            self.metrics_push.ack(sid, data.get("seq"))
+    
+    async def on_metrics_resync(self, sid, data):
+        """Base perdue côté client: renvoyer un keyframe."""
+        if self.metrics_push is not None:
+            await self.metrics_push.send_keyframe(sid)
+    
     async def on_request_cluster_status(self, sid, data):
         """Demande l'état du cluster."""
         try:
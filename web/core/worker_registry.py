@@ -8,6 +8,10 @@ import time
 from datetime import datetime, timedelta
 from enum import Enum
 
+# Métriques étendues du collecteur reprises par WorkerInfo (absentes = 0)
+EXTENDED_METRICS = ("load1", "load_per_core", "net_rx_bps", "net_tx_bps", "net_usage",
+                    "disk_read_bps", "disk_write_bps", "psi_cpu", "psi_memory", "psi_io")
+
 class WorkerStatus(Enum):
     UNKNOWN = "unknown"
     READY = "ready"
@@ -25,6 +29,18 @@ class WorkerInfo:
         self.memory_usage: float = 0.0
         self.disk_usage: float = 0.0
         self.temperature: Optional[float] = None
+        self.load1: float = 0.0
+        self.load_per_core: float = 0.0
+        self.net_rx_bps: float = 0.0
+        self.net_tx_bps: float = 0.0
+        # % du débit réseau utilisé (sens le plus chargé)
+        self.net_usage: float = 0.0
+        self.disk_read_bps: float = 0.0
+        self.disk_write_bps: float = 0.0
+        # PSI: % du temps où des tâches attendent CPU, mémoire, I/O
+        self.psi_cpu: float = 0.0
+        self.psi_memory: float = 0.0
+        self.psi_io: float = 0.0
         self.active_jobs: int = 0
         self.total_jobs: int = 0
         self.successful_jobs: int = 0
@@ -43,12 +59,16 @@ class WorkerInfo:
         return (time.time() - self.last_heartbeat_s) < timeout_s
 
     def update_metrics(self, cpu_usage: float, memory_usage: float, 
-                      disk_usage: float, temperature: Optional[float] = None) -> None:
-        """Met à jour les métriques du worker."""
+                      disk_usage: float, temperature: Optional[float] = None,
+                      **extended: float) -> None:
+        """Met à jour les métriques du worker (extended: clés de EXTENDED_METRICS)."""
         self.cpu_usage = cpu_usage
         self.memory_usage = memory_usage
         self.disk_usage = disk_usage
         self.temperature = temperature
+        for key in EXTENDED_METRICS:
+            if key in extended:
+                setattr(self, key, float(extended[key] or 0.0))
         
         # Calculer le score de performance
         self.performance_score = self._calculate_performance_score()
@@ -59,6 +79,8 @@ class WorkerInfo:
         cpu_score = 1.0 - (self.cpu_usage / 100.0)
         memory_score = 1.0 - (self.memory_usage / 100.0)
         disk_score = 1.0 - (self.disk_usage / 100.0)
+        network_score = 1.0 - min(self.net_usage, 100.0) / 100.0
+        pressure_score = 1.0 - min(max(self.psi_cpu, self.psi_memory, self.psi_io), 100.0) / 100.0
         
         # Score basé sur le taux de succès
         success_rate = 1.0
@@ -66,10 +88,16 @@ class WorkerInfo:
             success_rate = self.successful_jobs / self.total_jobs
         
         # Score composite
-        return (cpu_score * 0.3 + memory_score * 0.3 + disk_score * 0.2 + success_rate * 0.2)
+        return (cpu_score * 0.25 + memory_score * 0.2 + disk_score * 0.1 + network_score * 0.15 +
+                pressure_score * 0.1 + success_rate * 0.2)
+
+    def record_job_start(self) -> None:
+        """Compte un job envoyé au worker (en cours jusqu'à record_job_result)."""
+        self.active_jobs += 1
 
     def record_job_result(self, success: bool) -> None:
         """Enregistre le résultat d'un job."""
+        self.active_jobs = max(0, self.active_jobs - 1)
         self.total_jobs += 1
         if success:
             self.successful_jobs += 1
@@ -91,6 +119,7 @@ class WorkerInfo:
             "memory_usage": self.memory_usage,
             "disk_usage": self.disk_usage,
             "temperature": self.temperature,
+            **{key: getattr(self, key) for key in EXTENDED_METRICS},
             "active_jobs": self.active_jobs,
             "total_jobs": self.total_jobs,
             "successful_jobs": self.successful_jobs,
@@ -140,7 +169,13 @@ class WorkerRegistry:
             memory_usage = metrics.get("memory_usage", 0.0)
             disk_usage = metrics.get("disk_usage", 0.0)
             temperature = metrics.get("temperature")
-            self._workers[host].update_metrics(cpu_usage, memory_usage, disk_usage, temperature)
+            extended = {key: metrics[key] for key in EXTENDED_METRICS if key in metrics}
+            self._workers[host].update_metrics(cpu_usage, memory_usage, disk_usage, temperature, **extended)
+
+    def record_job_start(self, host: str) -> None:
+        """Compte un job envoyé à un worker."""
+        if host in self._workers:
+            self._workers[host].record_job_start()
 
     def record_job_result(self, host: str, success: bool) -> None:
         """Enregistre le résultat d'un job pour un worker."""
@@ -0,0 +1,174 @@
+"""Serveur socket.io réparti sur plusieurs workers uvicorn.
+
+- ClusterRedisManager: manager socket.io adossé à Redis (rooms et emits
+  partagés entre processus), qui transporte aussi les messages cluster:*
+  relayés par le leader;
+- LeaderLease: bail Redis (SET NX PX) désignant le seul processus abonné
+  aux canaux cluster:*;
+- PresenceRegistry: sids connectés par worker, dans une clé Redis qui
+  expire si le worker meurt.
+
+Chaque worker diffuse à ses propres clients (Broadcaster, push
+différentiel): le leader ne fait que recevoir et relayer le JSON brut.
+"""
+
+import os
+import pickle
+import socket
+from typing import Any, Callable, Dict, Optional, Set
+
+import socketio
+
+from web.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def worker_id() -> str:
+    """Identifiant du processus courant (hôte:pid)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ClusterRedisManager(socketio.AsyncRedisManager):
+    """AsyncRedisManager avec une méthode "relay" pour les messages pub/sub."""
+
+    def __init__(self, url: str, channel: str, on_relay: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 **kwargs) -> None:
+        super().__init__(url, channel=channel, **kwargs)
+        self.on_relay = on_relay
+        self.relay_stats = {"published": 0, "received": 0}
+
+    async def relay(self, message: Dict[str, Any]) -> None:
+        """Transmet un message cluster:* (JSON brut) aux autres workers."""
+        await self._publish({
+            "method": "relay",
+            "channel": message.get("channel"),
+            "data": message.get("data"),
+            "host_id": self.host_id,
+        })
+        self.relay_stats["published"] += 1
+
+    def _decode(self, message: Any) -> Any:
+        if isinstance(message, dict):
+            return message
+        # socket.io >= 5.12 publie en JSON, les versions précédentes en pickle
+        codec = getattr(self, "json", None)
+        try:
+            if codec is not None:
+                return codec.loads(message)
+            return pickle.loads(message)
+        except Exception:
+            return None
+
+    async def _listen(self):
+        # Décodé une seule fois: la boucle de base accepte un dict tel quel
+        async for message in super()._listen():
+            data = self._decode(message)
+            if isinstance(data, dict) and data.get("method") == "relay":
+                if data.get("host_id") != self.host_id and self.on_relay is not None:
+                    self.relay_stats["received"] += 1
+                    self.on_relay({"type": "message", "channel": data.get("channel"), "data": data.get("data")})
+                continue
+            yield data if data is not None else message
+
+
+class LeaderLease:
+    """Bail exclusif dans Redis, renouvelé tant que le processus est vivant."""
+
+    _RENEW = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+    _RELEASE = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, key: str, owner: str, ttl_s: float, client=None) -> None:
+        self.key = key
+        self.owner = owner
+        self.ttl_s = ttl_s
+        self.client = client
+        self.is_leader = False
+
+    async def acquire_or_renew(self) -> bool:
+        ttl_ms = int(self.ttl_s * 1000)
+        if self.is_leader:
+            self.is_leader = bool(await self.client.eval(self._RENEW, 1, self.key, self.owner, ttl_ms))
+            if not self.is_leader:
+                logger.warning(f"Bail {self.key} perdu par {self.owner}")
+        if not self.is_leader:
+            self.is_leader = bool(await self.client.set(self.key, self.owner, nx=True, px=ttl_ms))
+        return self.is_leader
+
+    async def release(self) -> None:
+        if self.is_leader and self.client is not None:
+            try:
+                await self.client.eval(self._RELEASE, 1, self.key, self.owner)
+            except Exception as e:
+                logger.warning(f"Libération du bail {self.key} impossible: {e}")
+        self.is_leader = False
+
+    async def current(self) -> Optional[str]:
+        return await self.client.get(self.key) if self.client is not None else None
+
+
+class PresenceRegistry:
+    """Clients connectés: ensemble local + copie Redis par worker."""
+
+    def __init__(self, prefix: str, owner: str, ttl_s: float, client=None) -> None:
+        self.prefix = prefix
+        self.key = f"{prefix}{owner}"
+        self.ttl_s = ttl_s
+        self.client = client
+        self.local: Set[str] = set()
+
+    async def add(self, sid: str) -> None:
+        self.local.add(sid)
+        await self._write(lambda pipe: pipe.sadd(self.key, sid))
+
+    async def discard(self, sid: str) -> None:
+        self.local.discard(sid)
+        await self._write(lambda pipe: pipe.srem(self.key, sid))
+
+    async def _write(self, op: Callable) -> None:
+        if self.client is None:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            op(pipe)
+            pipe.expire(self.key, int(self.ttl_s) + 1)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Présence WebSocket non mise à jour: {e}")
+
+    async def refresh(self) -> None:
+        """Réécrit l'ensemble (rattrape les écritures perdues) et repousse l'expiration."""
+        if self.client is None:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self.key)
+        if self.local:
+            pipe.sadd(self.key, *self.local)
+            pipe.expire(self.key, int(self.ttl_s) + 1)
+        await pipe.execute()
+
+    async def clear(self) -> None:
+        if self.client is not None:
+            try:
+                await self.client.delete(self.key)
+            except Exception:
+                pass
+
+    async def count(self) -> int:
+        """Clients connectés sur tous les workers vivants."""
+        if self.client is None:
+            return len(self.local)
+        keys = [key async for key in self.client.scan_iter(match=f"{self.prefix}*", count=100)]
+        if not keys:
+            return 0
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.scard(key)
+        return sum(await pipe.execute())
+
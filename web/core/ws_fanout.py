@@ -0,0 +1,114 @@
+"""Diffusion socket.io encodée une seule fois.
+
+python-socketio encode le payload à chaque emit puis crée une tâche par
+destinataire. Ici:
+
+- le payload est sérialisé une fois (orjson si disponible) ou relayé tel
+  quel quand il arrive déjà en JSON depuis Redis (aucun json.loads);
+- le paquet socket.io (EVENT, protocole v5) est construit une fois par
+  namespace puis posé directement dans la file engine.io de chaque client;
+- un client dont la file engine.io dépasse `max_backlog` paquets est sauté:
+  il recevra la trame suivante, la plus récente, au lieu d'accumuler.
+"""
+
+import json
+from typing import Any, Dict, Iterable, Optional, Union
+
+from engineio import packet as eio_packet
+
+from web.config.logging_config import get_logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+logger = get_logger(__name__)
+
+
+class _OrjsonModule:
+    """Module json compatible socket.io / engine.io (AsyncServer(json=...))."""
+
+    @staticmethod
+    def dumps(obj: Any, *args, **kwargs) -> str:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(data: Union[str, bytes], *args, **kwargs) -> Any:
+        return orjson.loads(data)
+
+
+# Module json à passer à AsyncServer
+ws_json = _OrjsonModule if orjson is not None else json
+
+
+def dumps(data: Any) -> str:
+    return ws_json.dumps(data)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return ws_json.loads(data)
+
+
+def as_json_text(raw: Any) -> str:
+    """Texte JSON relayable tel quel depuis un message Redis.
+
+    Les publishers du projet envoient des objets JSON: on se contente de
+    regarder le premier caractère. Un texte non JSON est enveloppé comme
+    le faisait l'ancien listener ({"message": ...}).
+    """
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode("utf-8", errors="ignore")
+    if isinstance(raw, str):
+        head = raw.lstrip()[:1]
+        if head in ("{", "["):
+            return raw
+        return dumps({"message": raw})
+    if isinstance(raw, dict):
+        return dumps(raw)
+    return dumps({"data": raw})
+
+
+def encode_event(namespace: str, event: str, payload_json: str) -> str:
+    """Paquet socket.io EVENT: 2[/ns,]["event",<payload>]."""
+    prefix = "2" if namespace in (None, "/") else f"2{namespace},"
+    return f'{prefix}[{dumps(event)},{payload_json}]'
+
+
+class Broadcaster:
+    """Émission vers une room ou une liste de sids avec un seul encodage."""
+
+    def __init__(self, sio, max_backlog: int = 8) -> None:
+        self.sio = sio
+        self.max_backlog = max_backlog
+        self.stats = {"frames": 0, "sent": 0, "coalesced": 0}
+
+    def _backlogged(self, eio_sid: str) -> bool:
+        socket = getattr(self.sio.eio, "sockets", {}).get(eio_sid)
+        queue = getattr(socket, "queue", None)
+        return queue is not None and queue.qsize() >= self.max_backlog
+
+    async def emit_raw(self, event: str, payload_json: str, namespace: str = "/",
+                       to: Optional[Union[str, Iterable[str]]] = None) -> int:
+        """Diffuse un payload déjà encodé en JSON. Retourne le nombre d'envois."""
+        pkt = eio_packet.Packet(eio_packet.MESSAGE, encode_event(namespace, event, payload_json))
+        if to is not None and not isinstance(to, str):
+            to = list(to)
+        sent = 0
+        for _sid, eio_sid in self.sio.manager.get_participants(namespace, to):
+            if self._backlogged(eio_sid):
+                self.stats["coalesced"] += 1
+                continue
+            await self.sio.eio.send_packet(eio_sid, pkt)
+            sent += 1
+        self.stats["frames"] += 1
+        self.stats["sent"] += sent
+        return sent
+
+    async def emit(self, event: str, data: Any, namespace: str = "/",
+                   to: Optional[Union[str, Iterable[str]]] = None) -> int:
+        """Comme sio.emit (sans callback), payload encodé une fois."""
+        return await self.emit_raw(event, dumps(data), namespace=namespace, to=to)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "encoder": "orjson" if orjson is not None else "json"}
@@ -18,10 +18,13 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8085"))
     debug = os.getenv("DEBUG", "false").lower() == "true"
+    # Plusieurs workers: socket.io passe par Redis (voir WS_CLUSTER_CONFIG)
+    workers = 1 if debug else int(os.getenv("WS_WORKERS", "1"))
     
     print(f"🚀 Démarrage de DispyCluster Web Interface")
     print(f"📍 URL: http://{host}:{port}")
     print(f"🔧 Mode debug: {debug}")
+    print(f"👷 Workers: {workers}")
     
     # Démarrer le serveur avec l'app Socket.IO (factory)
     uvicorn.run(
@@ -29,6 +32,7 @@ if __name__ == "__main__":
         host=host,
         port=port,
         reload=debug,
+        workers=workers,
         log_level="info" if not debug else "debug",
         factory=True
     )
\ No newline at end of file
@@ -109,7 +109,12 @@ if (!window.App.initSockets) {
             }
             if (!this.sockets.monitoring) {
                 this.sockets.monitoring = io('/monitoring');
-                this.sockets.monitoring.on('connect', () => window.App.logger.debug('[App.js] SOCKET MONITORING CONNECT'));
+                this.sockets.monitoring.on('connect', () => {
+                    window.App.logger.debug('[App.js] SOCKET MONITORING CONNECT');
+                    // Push différentiel: keyframe puis deltas sur la sélection (vide = tout)
+                    this.sockets.monitoring.emit('subscribe_metrics', this.metricsSelection || {});
+                });
+                this.sockets.monitoring.on('metrics_delta', (msg) => this.applyMetricsMessage(msg));
                 this.sockets.monitoring.on('cluster_metrics', (data) => {
                     window.App.logger.debug('[App.js] EVENT cluster_metrics (monitoring) RECU', data);
                     this.state.lastClusterMetrics = data;
@@ -122,6 +127,11 @@ if (!window.App.initSockets) {
                     window.App.cache.save(window.App.cache.keys.alerts, data);
                     document.dispatchEvent(new CustomEvent('app:alerts_update', { detail: data }));
                 });
+                // Fin d'une tâche lancée par l'API (ex: POST /api/metrics/refresh -> task_id)
+                this.sockets.monitoring.on('task_completed', (data) => {
+                    window.App.logger.debug('[App.js] EVENT task_completed (monitoring) RECU', data);
+                    document.dispatchEvent(new CustomEvent('app:task_completed', { detail: data }));
+                });
             }
             if (!this.sockets.health) {
                 this.sockets.health = io('/health');
@@ -136,6 +146,42 @@ if (!window.App.initSockets) {
         } catch (e) {
             window.App.logger.error('[App.js] Init sockets error', e);
         }
+        },
+        // Restreint le push aux nœuds / métriques affichés (listes vides = tout)
+        subscribeMetrics(nodes, metrics) {
+            this.metricsSelection = { nodes: nodes || [], metrics: metrics || [] };
+            if (this.sockets.monitoring && this.sockets.monitoring.connected) {
+                this.sockets.monitoring.emit('subscribe_metrics', this.metricsSelection);
+            }
+        },
+        // Reconstruit l'état complet depuis un keyframe ou un delta, puis acquitte
+        applyMetricsMessage(msg) {
+            if (!msg || typeof msg.seq !== 'number') return;
+            const ring = this.metricsRing || (this.metricsRing = new Map());
+            let state;
+            if (msg.t === 'k') {
+                const { t, seq, ...full } = msg;
+                state = full;
+            } else {
+                const base = ring.get(msg.base);
+                if (!base) {
+                    this.sockets.monitoring.emit('metrics_resync', {});
+                    return;
+                }
+                const { t, seq, base: _b, cluster_stats, nodes, gone, ...meta } = msg;
+                state = { ...base, ...meta, cluster_stats: { ...base.cluster_stats, ...(cluster_stats || {}) }, nodes: { ...base.nodes } };
+                Object.entries(nodes || {}).forEach(([name, fields]) => {
+                    state.nodes[name] = { ...(state.nodes[name] || {}), ...fields };
+                });
+                (gone || []).forEach((name) => { delete state.nodes[name]; });
+            }
+            ring.set(msg.seq, state);
+            while (ring.size > 8) ring.delete(ring.keys().next().value);
+            this.sockets.monitoring.emit('metrics_ack', { seq: msg.seq });
+
+            this.state.lastClusterMetrics = state;
+            window.App.cache.save(window.App.cache.keys.cluster, state);
+            document.dispatchEvent(new CustomEvent('app:cluster_metrics', { detail: state }));
         }
     });
 }
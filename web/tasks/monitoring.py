@@ -3,12 +3,24 @@ from web.celery_app import celery_app
 import httpx
 import asyncio
 import json
+import os
+import re
+import time
 import redis
-from typing import Dict, List, Any
-from web.config.metrics_config import NODES, REDIS_CONFIG, METRICS_CONFIG
+from typing import Dict, List, Any, Optional
+from web.config.metrics_config import (NODES, REDIS_CONFIG, METRICS_CONFIG, COLLECTOR_CONFIG, NODE_METRICS_CONFIG,
+                                       ADAPTIVE_SAMPLING_CONFIG, MONITORING_CONFIG)
+from web.core.adaptive_sampling import AdaptiveCadence, DeadBand
+from web.core.agent_ingest import AgentIngest
+from web.core.alert_rules import AlertEngine
+from web.core.cluster_stats import ClusterSnapshot
+from web.core.collector_loop import collector_loop
+from web.core.cpu_counters import CPU_METRIC, CounterRateEngine, CpuRateEngine, parse_cpu_sample
 from web.config.logging_config import get_logger
 from web.core.metrics_history import history_manager
-from web.core.redis_ts import xadd, ts_add
+from web.core.job_store import job_store
+from web.core.redis_ts import xadd, ts_madd
+from web.core.perf import perf, span, timed
 
 # Configuration du logger
 logger = get_logger(__name__)
@@ -16,105 +28,301 @@ logger = get_logger(__name__)
 # Client Redis configuré
 redis_client = redis.Redis(**REDIS_CONFIG)
 
-# Cache pour les mesures CPU précédentes (nécessaire pour calculer l'utilisation)
-cpu_prev_cache = {}
+# Hash des statistiques d'exécution du collecteur
+COLLECTOR_STATS_KEY = "celery:collector"
+
+# Fin des tâches lancées à la demande (relayé en WebSocket: task_completed)
+TASK_EVENTS_CHANNEL = "celery:tasks"
+
+# Compteurs CPU du scrape précédent, par nœud (nécessaires pour calculer l'utilisation)
+cpu_rates = CpuRateEngine(COLLECTOR_CONFIG["cpu_saturation_pct"])
+# Idem pour les débits réseau/disque et la pression (PSI)
+node_rates = CounterRateEngine()
+
+# Intervalle par nœud (les cycles beat ne scrapent que les nœuds à échéance)
+# et filtre des points d'historique
+cadence = AdaptiveCadence(**ADAPTIVE_SAMPLING_CONFIG)
+dead_band = DeadBand(**ADAPTIVE_SAMPLING_CONFIG)
+
+# Dernier point de chaque nœud: agrégat du cluster sans relire Redis
+cluster_snapshot = ClusterSnapshot(METRICS_CONFIG["cache_ttl"])
+
+# Règles d'alerte évaluées à chaque point reçu (transitions publiées sur cluster:alerts)
+alert_engine = AlertEngine(MONITORING_CONFIG["alert_rules"])
+
+# Trames des agents de nœud (Stream agent:metrics): ces nœuds ne sont pas scrapés
+agent_ingest = AgentIngest(known_nodes=lambda: NODES)
+
+# Compteurs node_exporter convertis en débits: métrique -> (clé, facteur)
+# PSI: secondes d'attente par seconde, en % du temps
+RATE_COUNTERS = {
+    "node_network_receive_bytes_total": ("net_rx_bps", 1.0),
+    "node_network_transmit_bytes_total": ("net_tx_bps", 1.0),
+    "node_disk_read_bytes_total": ("disk_read_bps", 1.0),
+    "node_disk_written_bytes_total": ("disk_write_bps", 1.0),
+    "node_pressure_cpu_waiting_seconds_total": ("psi_cpu", 100.0),
+    "node_pressure_memory_waiting_seconds_total": ("psi_memory", 100.0),
+    "node_pressure_io_waiting_seconds_total": ("psi_io", 100.0),
+}
+_RATE_PREFIXES = ("node_network_", "node_disk_", "node_pressure_")
+# Partitions exclues des compteurs disque (le disque entier les compte déjà)
+DISK_PARTITION = re.compile(NODE_METRICS_CONFIG["disk_partition"])
+
+# Séries partagées ts:<série> (moyenne du cluster), lues par la page monitoring
+SHARED_TS_SERIES = {
+    "cpu_usage": "cpu.usage",
+    "memory_usage": "memory.usage",
+    "disk_usage": "disk.usage",
+    "temperature": "temperature",
+}
+
+# Métriques étendues: écrites en TimeSeries par hôte (ts:<série>:host:<nœud>)
+EXTENDED_TS_SERIES = {
+    "load1": "load.1m",
+    "net_rx_bps": "net.rx_bps",
+    "net_tx_bps": "net.tx_bps",
+    "net_usage": "net.usage",
+    "disk_read_bps": "disk.read_bps",
+    "disk_write_bps": "disk.write_bps",
+    "psi_cpu": "psi.cpu",
+    "psi_memory": "psi.memory",
+    "psi_io": "psi.io",
+}
 
 @celery_app.task
-def collect_metrics():
-    """Collecte optimisée des métriques avec cache Redis."""
+def collect_metrics(notify: bool = False):
+    """Collecte optimisée des métriques avec cache Redis.
+
+    notify: publie la fin de la tâche sur celery:tasks (rafraîchissement
+    demandé par l'API, pas les collectes planifiées).
+    """
+    outcome = _collect_once()
+    if notify:
+        _publish_task_event("collect_metrics", collect_metrics.request.id, outcome)
+    return outcome
+
+def _collect_once() -> Dict[str, Any]:
+    started = time.perf_counter()
     try:
-        # Exécuter la collecte asynchrone
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(_collect_metrics_async())
-        loop.close()
+        # Boucle et connexions persistantes du processus
+        result = collector_loop.run(_collect_metrics_async())
         
+        duration_s = time.perf_counter() - started
+        _record_collector_run(duration_s, result.get("nodes_processed", 0), ok=True,
+                              nodes_timed_out=result.get("nodes_timed_out", 0))
+        perf.observe("collect.cycle", duration_s)
+        _flush_perf()
         return {
             "status": "collected",
             "timestamp": datetime.utcnow().isoformat(),
                 "nodes_processed": result.get("nodes_processed", 0),
+                "nodes_timed_out": result.get("nodes_timed_out", 0),
+                "nodes_skipped": result.get("nodes_skipped", 0),
+                "nodes_pushed": result.get("nodes_pushed", 0),
+                "cycle_ms": round(duration_s * 1000, 1),
+                "fetch_ms": result.get("fetch_ms"),
                 "cache_updated": result.get("cache_updated", False)
             }
     except Exception as e:
         logger.error(f"Erreur collecte: {e}")
+        _record_collector_run(time.perf_counter() - started, 0, ok=False)
         return {
             "status": "error",
             "timestamp": datetime.utcnow().isoformat(),
             "error": str(e)
         }
 
+def _publish_task_event(task: str, task_id: str, outcome: Dict[str, Any]) -> None:
+    try:
+        redis_client.publish(TASK_EVENTS_CHANNEL, json.dumps({"task": task, "task_id": task_id, **outcome}))
+    except Exception as e:
+        logger.warning(f"Publication de fin de tâche {task} échouée: {e}")
+
+def _flush_perf() -> None:
+    """Publie les histogrammes du worker pour /api/perf (process web)."""
+    try:
+        perf.flush_to_redis(redis_client, source=f"celery:{os.getpid()}")
+    except Exception as e:
+        logger.debug(f"Snapshot perf non publié: {e}")
+
+def _record_collector_run(duration_s: float, nodes_processed: int, ok: bool, nodes_timed_out: int = 0) -> None:
+    """Trace la dernière exécution du collecteur (lue par /metrics)."""
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hincrby(COLLECTOR_STATS_KEY, "runs_total", 1)
+        if ok:
+            pipe.hset(COLLECTOR_STATS_KEY, mapping={
+                "last_duration_s": duration_s,
+                "last_nodes_processed": nodes_processed,
+                "last_nodes_timed_out": nodes_timed_out,
+                "last_success_ts": time.time(),
+            })
+        else:
+            pipe.hincrby(COLLECTOR_STATS_KEY, "errors_total", 1)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Stats collecteur non enregistrées: {e}")
+
 async def _collect_metrics_async():
     """Collecte asynchrone des métriques depuis node_exporter."""
-    results = {"nodes_processed": 0, "cache_updated": False}
+    results = {"nodes_processed": 0, "nodes_timed_out": 0, "cache_updated": False}
     
-    async with httpx.AsyncClient(timeout=METRICS_CONFIG["node_exporter_timeout"]) as client:
-        # Collecter les métriques de tous les nœuds en parallèle
-        tasks = [_collect_node_metrics(client, node) for node in NODES]
-        node_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Traiter les résultats et mettre à jour le cache
-        for i, result in enumerate(node_results):
-            if isinstance(result, Exception):
-                continue
-                
-            if result and result.get("metrics"):
-                node = NODES[i]
-                # Stocker les métriques individuelles (cache actuel)
-                redis_client.setex(
-                    f"metrics:{node}", 
-                    METRICS_CONFIG["cache_ttl"], 
-                    json.dumps(result["metrics"])
-                )
-                
-                # Stocker dans l'historique
-                history_manager.store_metrics_point(node, result["metrics"])
-
-                # Publier dans Redis Streams pour ingestion TimeSeries
-                try:
-                    metrics = result["metrics"]
-                    labels = {"host": node}
-                    if "cpu_usage" in metrics:
-                        xadd("metrics:ingest", {"metric": "cpu.usage", "value": str(metrics["cpu_usage"]), "labels": json.dumps(labels)}, maxlen_approx=200000)
-                        # Ecriture directe TS (en parallèle du Stream)
-                        # Série globale pour compatibilité
-                        ts_add("ts:cpu.usage", float(metrics["cpu_usage"]), labels_if_create={"metric": "cpu.usage", "host": "all"})
-                        # Série par hôte pour multi-séries
-                        ts_key_per_host = f"ts:cpu.usage:host:{node}"
-                        ts_add(ts_key_per_host, float(metrics["cpu_usage"]), labels_if_create={"metric": "cpu.usage", "host": node})
-                    if "memory_usage" in metrics:
-                        xadd("metrics:ingest", {"metric": "memory.usage", "value": str(metrics["memory_usage"]), "labels": json.dumps(labels)}, maxlen_approx=200000)
-                        ts_add("ts:memory.usage", float(metrics["memory_usage"]), labels_if_create={"metric": "memory.usage", "host": node})
-                    if "disk_usage" in metrics:
-                        xadd("metrics:ingest", {"metric": "disk.usage", "value": str(metrics["disk_usage"]), "labels": json.dumps(labels)}, maxlen_approx=200000)
-                        ts_add("ts:disk.usage", float(metrics["disk_usage"]), labels_if_create={"metric": "disk.usage", "host": node})
-                    if "temperature" in metrics and metrics["temperature"] is not None:
-                        xadd("metrics:ingest", {"metric": "temperature", "value": str(metrics["temperature"]), "labels": json.dumps(labels)}, maxlen_approx=200000)
-                        ts_add("ts:temperature", float(metrics["temperature"]), labels_if_create={"metric": "temperature", "host": node})
-                except Exception as stream_err:
-                    logger.warning(f"Publication Streams métriques échouée pour {node}: {stream_err}")
-                
-                results["nodes_processed"] += 1
-        
-        # Mettre à jour les métriques agrégées
-        if results["nodes_processed"] > 0:
-            _update_aggregated_metrics()
-            results["cache_updated"] = True
+    # Trames poussées par les agents depuis le cycle précédent
+    pushed = await _poll_agents()
+    results["nodes_pushed"] = len(pushed)
+    
+    # Nœuds à échéance (cadence adaptative) et nœuds avec un job en cours, hors nœuds servis par un agent
+    busy = await busy_nodes()
+    now = time.monotonic()
+    # Demi-intervalle de tolérance: le cycle beat suivant arrive un peu avant l'échéance
+    nodes = [node for node in NODES
+             if not agent_ingest.is_live(node, now)
+             and (node in busy or cadence.is_due(node, now, tolerance_s=cadence.min_interval_s / 2))]
+    results["nodes_skipped"] = len(NODES) - len(nodes) - len(pushed)
+    
+    # Client keep-alive partagé par les cycles (pas de fermeture ici)
+    client = collector_loop.client()
+    # Tous les nœuds en parallèle; au-delà de la deadline du cycle, les retardataires sont annulés
+    tasks = [asyncio.ensure_future(_collect_node_metrics(client, node)) for node in nodes]
+    node_results = []
+    fetch_started = time.perf_counter()
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=COLLECTOR_CONFIG["cycle_deadline_s"])
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            results["nodes_timed_out"] = len(pending)
+            logger.warning(f"Collecte: {len(pending)} nœuds hors délai ({COLLECTOR_CONFIG['cycle_deadline_s']} s)")
+        node_results = [
+            task.exception() or task.result() if task in done else None
+            for task in tasks
+        ]
+    results["fetch_ms"] = round((time.perf_counter() - fetch_started) * 1000, 1)
+    
+    batch = {nodes[i]: result["metrics"] for i, result in enumerate(node_results)
+             if result and not isinstance(result, Exception) and result.get("metrics")}
+    # Un nœud en échec reste à échéance: réessayé au cycle suivant
+    for node, metrics in batch.items():
+        cadence.observe(node, metrics, busy=node in busy)
+    results["nodes_processed"] = store_metrics_batch({**pushed, **batch})
+    results["cache_updated"] = results["nodes_processed"] > 0
     
     return results
 
-async def _collect_node_metrics(client: httpx.AsyncClient, node: str) -> Dict[str, Any]:
-    """Collecte les métriques d'un nœud spécifique."""
+async def _poll_agents() -> Dict[str, Dict[str, Any]]:
+    """Dernière trame de chaque agent arrivée dans le Stream (vide si désactivé)."""
+    if not agent_ingest.enabled:
+        return {}
+    try:
+        await agent_ingest.poll_stream()
+    except Exception as e:
+        logger.warning(f"Stream des agents de nœud non lu: {e}")
+    return agent_ingest.drain()
+
+async def busy_nodes() -> set:
+    """Nœuds avec un job en cours (vide si le store des jobs est indisponible)."""
+    if not ADAPTIVE_SAMPLING_CONFIG["busy_from_jobs"]:
+        return set()
     try:
-        # Vérifier la santé du nœud d'abord
-        health_url = f"http://{node}:{METRICS_CONFIG['node_exporter_port']}/"
-        response = await client.get(health_url)
+        return await job_store.running_nodes()
+    except Exception as e:
+        logger.debug(f"Jobs en cours non lus: {e}")
+        return set()
+
+def store_metrics_batch(batch: Dict[str, Dict[str, Any]]) -> int:
+    """Ecrit un lot {nœud: métriques}: cache, historique, Streams, TimeSeries, agrégat.
+
+    Partagé par la tâche collect_metrics et le service de collecte
+    (web.collector). Le cache est écrit à chaque fois; historique, Streams
+    et TimeSeries seulement si le point sort de la bande morte. Rend le
+    nombre de nœuds écrits.
+    """
+    # Points TimeSeries du lot, envoyés en un seul TS.MADD
+    ts_samples = []
+    ts_labels = {}
+    written = 0
+    # Changements d'état des alertes déclenchés par le lot
+    transitions = []
+    _restore_alerts()
+    
+    for node, metrics in batch.items():
+        with span("collect.redis_flush"):
+            # Stocker les métriques individuelles (cache actuel)
+            redis_client.setex(
+                f"metrics:{node}", 
+                METRICS_CONFIG["cache_ttl"], 
+                json.dumps(metrics)
+            )
+        cluster_snapshot.update(node, metrics)
+        transitions.extend(alert_engine.observe(node, metrics))
+        written += 1
         
-        if response.status_code != 200:
-            return None
+        # Valeurs à peine changées depuis le dernier point: pas d'historique
+        if not dead_band.should_store(node, metrics):
+            continue
         
-        # Récupérer les métriques
+        with span("collect.redis_flush"):
+            # Stocker dans l'historique
+            history_manager.store_metrics_point(node, metrics)
+
+        # Publier dans Redis Streams pour ingestion TimeSeries
+        try:
+            labels = {"host": node}
+            if "cpu_usage" in metrics:
+                xadd("metrics:ingest", {"metric": "cpu.usage", "value": str(metrics["cpu_usage"]), "labels": json.dumps(labels)}, maxlen_approx=200000)
+                # Ecriture directe TS (en parallèle du Stream), groupée en fin de cycle.
+                # Séries par hôte ici: dans un TS.MADD tous les points ont le même
+                # timestamp, une série partagée (ts:cpu.usage) ne garderait que le dernier
+                # nœud. Les séries partagées reçoivent la moyenne du cluster (plus bas).
+                _queue_ts_sample(ts_samples, ts_labels, f"ts:cpu.usage:host:{node}", metrics["cpu_usage"], {"metric": "cpu.usage", "host": node})
+            if "memory_usage" in metrics:
+                xadd("metrics:ingest", {"metric": "memory.usage", "value": str(metrics["memory_usage"]), "labels": json.dumps(labels)}, maxlen_approx=200000)
+                _queue_ts_sample(ts_samples, ts_labels, f"ts:memory.usage:host:{node}", metrics["memory_usage"], {"metric": "memory.usage", "host": node})
+            if "disk_usage" in metrics:
+                xadd("metrics:ingest", {"metric": "disk.usage", "value": str(metrics["disk_usage"]), "labels": json.dumps(labels)}, maxlen_approx=200000)
+                _queue_ts_sample(ts_samples, ts_labels, f"ts:disk.usage:host:{node}", metrics["disk_usage"], {"metric": "disk.usage", "host": node})
+            if "temperature" in metrics and metrics["temperature"] is not None:
+                xadd("metrics:ingest", {"metric": "temperature", "value": str(metrics["temperature"]), "labels": json.dumps(labels)}, maxlen_approx=200000)
+                _queue_ts_sample(ts_samples, ts_labels, f"ts:temperature:host:{node}", metrics["temperature"], {"metric": "temperature", "host": node})
+            # Métriques étendues: TimeSeries seulement (même TS.MADD), pas de message Stream
+            for key, series in EXTENDED_TS_SERIES.items():
+                if metrics.get(key) is not None:
+                    _queue_ts_sample(ts_samples, ts_labels, f"ts:{series}:host:{node}", metrics[key], {"metric": series, "host": node})
+        except Exception as stream_err:
+            logger.warning(f"Publication Streams métriques échouée pour {node}: {stream_err}")
+    
+    # Mettre à jour les métriques agrégées
+    aggregated = _update_aggregated_metrics() if written > 0 else None
+    if aggregated is not None:
+        # Séries partagées (graphiques du dashboard): un point par cycle, moyenne des nœuds en ligne
+        distribution = aggregated["cluster_stats"]["distribution"]
+        for field, series in SHARED_TS_SERIES.items():
+            if field in distribution:
+                _queue_ts_sample(ts_samples, ts_labels, f"ts:{series}", distribution[field]["mean"], {"metric": series, "host": "all"})
+    
+    try:
+        with span("collect.ts_madd"):
+            ts_madd(ts_samples, labels_by_key=ts_labels)
+    except Exception as ts_err:
+        logger.warning(f"Ecriture TimeSeries groupée échouée: {ts_err}")
+    
+    # Puis les alertes
+    evaluate_alerts(transitions, aggregated)
+    return written
+
+def _queue_ts_sample(samples, labels_by_key, key, value, labels):
+    """Ajoute un point au lot TimeSeries du cycle."""
+    samples.append((key, float(value)))
+    labels_by_key.setdefault(key, labels)
+
+@timed("collect.node")
+async def _collect_node_metrics(client: httpx.AsyncClient, node: str) -> Dict[str, Any]:
+    """Collecte les métriques d'un nœud spécifique (une requête: /metrics répond = nœud en ligne)."""
+    try:
         metrics_url = f"http://{node}:{METRICS_CONFIG['node_exporter_port']}/metrics"
-        response = await client.get(metrics_url)
+        # Borne totale par nœud (le timeout httpx ne couvre que chaque opération réseau)
+        response = await asyncio.wait_for(client.get(metrics_url), COLLECTOR_CONFIG["timeout_s"])
         
         if response.status_code == 200:
             metrics = _parse_node_exporter_metrics(response.text, node)
@@ -125,27 +333,55 @@ async def _collect_node_metrics(client: httpx.AsyncClient, node: str) -> Dict[st
     except Exception:
         return None
 
+@timed("collect.parse_exporter")
 def _parse_node_exporter_metrics(metrics_text: str, node: str) -> Dict[str, Any]:
     """Parse les métriques node_exporter et calcule les valeurs."""
     metrics = {}
     lines = metrics_text.strip().split('\n')
     
-    # Variables pour le calcul CPU
-    cpu_user = 0
-    cpu_system = 0
-    cpu_idle = 0
+    # Compteurs CPU: tous les cœurs et tous les modes
+    cpu_samples = []
+    # Compteurs à convertir en débits, un par interface/disque retenu (<clé>:<device>)
+    counters = {}
+    net_speed = 0.0
     
     for line in lines:
         if line.startswith('#') or not line.strip():
             continue
             
         # CPU usage
-        if 'node_cpu_seconds_total' in line and 'mode="user"' in line:
-            cpu_user = float(line.split()[-1])
-        elif 'node_cpu_seconds_total' in line and 'mode="system"' in line:
-            cpu_system = float(line.split()[-1])
-        elif 'node_cpu_seconds_total' in line and 'mode="idle"' in line:
-            cpu_idle = float(line.split()[-1])
+        if line.startswith(CPU_METRIC):
+            sample = parse_cpu_sample(line)
+            if sample is not None:
+                cpu_samples.append(sample)
+        
+        # Load average
+        elif line.startswith(('node_load1 ', 'node_load5 ', 'node_load15 ')):
+            name, _, value = line.partition(' ')
+            metrics[name[5:]] = float(value)
+        
+        # Réseau, disque, pression
+        elif line.startswith(_RATE_PREFIXES):
+            series, _, value = line.rpartition(' ')
+            name, _, labels = series.partition('{')
+            if name == 'node_network_speed_bytes':
+                if not _excluded_device(labels, NODE_METRICS_CONFIG["net_exclude"]):
+                    net_speed += max(0.0, float(value))
+                continue
+            rate = RATE_COUNTERS.get(name)
+            if rate is None:
+                continue
+            if name.startswith('node_disk_'):
+                excluded = labels and _excluded_device(labels, NODE_METRICS_CONFIG["disk_exclude"], DISK_PARTITION)
+            else:
+                excluded = labels and _excluded_device(labels, NODE_METRICS_CONFIG["net_exclude"])
+            if excluded:
+                continue
+            key, factor = rate
+            device = _device_label(labels)
+            if device is not None:
+                key = f"{key}:{device}"
+            counters[key] = counters.get(key, 0.0) + float(value) * factor
         
         # Memory
         elif 'node_memory_MemTotal_bytes' in line:
@@ -173,23 +409,21 @@ def _parse_node_exporter_metrics(metrics_text: str, node: str) -> Dict[str, Any]
     if 'temperature' not in metrics:
         metrics['temperature'] = None
     
-    # Calculer l'utilisation CPU
-    if node in cpu_prev_cache:
-        prev = cpu_prev_cache[node]
-        cpu_usage = _calculate_cpu_usage(
-            cpu_user, cpu_system, cpu_idle,
-            prev.get('cpu_user', 0), prev.get('cpu_system', 0), prev.get('cpu_idle', 0)
-        )
-        metrics['cpu_usage'] = cpu_usage
-    else:
-        metrics['cpu_usage'] = 0
+    # Calculer l'utilisation CPU (0 au premier scrape, pas de delta)
+    rates = cpu_rates.update(node, cpu_samples)
+    metrics['cpu_usage'] = 0
+    if rates:
+        metrics.update(rates)
     
-    # Mettre à jour le cache CPU
-    cpu_prev_cache[node] = {
-        'cpu_user': cpu_user,
-        'cpu_system': cpu_system,
-        'cpu_idle': cpu_idle
-    }
+    # Charge par cœur, débits et part du réseau utilisée (sens le plus chargé)
+    if 'load1' in metrics and cpu_samples:
+        metrics['load_per_core'] = metrics['load1'] / (max(sample[0] for sample in cpu_samples) + 1)
+    rates = node_rates.update(node, counters)
+    if rates:
+        metrics.update(rates)
+        capacity = net_speed or NODE_METRICS_CONFIG["net_capacity_bps"]
+        busiest = max(rates.get('net_rx_bps', 0.0), rates.get('net_tx_bps', 0.0))
+        metrics['net_usage'] = min(100.0, busiest / capacity * 100) if capacity > 0 else 0.0
     
     # Calculer l'utilisation mémoire
     if 'memory_total' in metrics and 'memory_available' in metrics:
@@ -207,149 +441,137 @@ def _parse_node_exporter_metrics(metrics_text: str, node: str) -> Dict[str, Any]
     
     return metrics
 
-def _calculate_cpu_usage(user, system, idle, prev_user, prev_system, prev_idle):
-    """Calcule l'utilisation CPU basée sur les mesures précédentes."""
+def _device_label(labels: str) -> Optional[str]:
+    """Valeur du label device="..." (None si absent)."""
+    start = labels.find('device="')
+    if start < 0:
+        return None
+    return labels[start + 8:labels.find('"', start + 8)]
+
+def _excluded_device(labels: str, prefixes, pattern: Optional["re.Pattern"] = None) -> bool:
+    """Vrai si le label device="..." commence par un des préfixes exclus (ou correspond à pattern)."""
+    device = _device_label(labels)
+    if device is None:
+        return False
+    return device.startswith(prefixes) or (pattern is not None and pattern.match(device) is not None)
+
+@timed("collect.aggregate_publish")
+def _update_aggregated_metrics() -> Optional[Dict[str, Any]]:
+    """Publie l'agrégat du cluster (cluster:metrics) et la santé; rend l'agrégat.
+
+    Calculé sur les derniers points en mémoire (cluster_snapshot), sans
+    relire metrics:<nœud>; document sérialisé une fois, écrit et publié
+    en un aller-retour Redis.
+    """
     try:
-        user_diff = user - prev_user
-        system_diff = system - prev_system
-        idle_diff = idle - prev_idle
+        if not cluster_snapshot.seeded:
+            # Processus qui démarre: nœuds pas encore scrapés ici repris du cache
+            cluster_snapshot.seed(NODES, redis_client.mget([f"metrics:{node}" for node in NODES]))
+        aggregated = cluster_snapshot.aggregate(NODES)
+        payload = json.dumps(aggregated)
         
-        total_diff = user_diff + system_diff + idle_diff
-        if total_diff > 0:
-            return ((user_diff + system_diff) / total_diff) * 100
-        return 0
-    except:
-        return 0
-
-def _update_aggregated_metrics():
-    """Met à jour les métriques agrégées dans Redis."""
-    try:
-        aggregated = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "nodes": {},
-            "cluster_stats": {
-                "total_nodes": len(NODES),
-                "online_nodes": 0,
-                "avg_cpu": 0,
-                "avg_memory": 0,
-                "avg_temperature": 0
-            }
+        pipe = redis_client.pipeline(transaction=False)
+        # Stocker dans Redis (metrics agrégées) et publier sur pub/sub cluster:metrics
+        pipe.setex("cluster:metrics", METRICS_CONFIG["aggregated_ttl"], payload)
+        pipe.publish("cluster:metrics", payload)
+
+        # Santé globale sur cluster:health
+        total_nodes = aggregated["cluster_stats"]["total_nodes"]
+        online_nodes = aggregated["cluster_stats"]["online_nodes"]
+        down_nodes = max(total_nodes - online_nodes, 0)
+        if down_nodes == 0 and total_nodes > 0:
+            overall_status = "healthy"
+        elif down_nodes <= total_nodes // 2:
+            overall_status = "warning"
+        else:
+            overall_status = "critical"
+        health_data = {
+            "timestamp": aggregated["timestamp"],
+            "overall_status": overall_status,
+            "nodes_online": online_nodes,
+            "nodes_total": total_nodes,
+            "issues": [] if overall_status == "healthy" else [f"{down_nodes} nœuds hors ligne"]
         }
+        pipe.publish("cluster:health", json.dumps(health_data))
+
+        pipe.execute()
+        return aggregated
         
-        total_cpu = 0
-        total_memory = 0
-        total_temp = 0
-        online_count = 0
-        
-        for node in NODES:
-            node_data = redis_client.get(f"metrics:{node}")
-            if node_data:
-                metrics = json.loads(node_data)
-                aggregated["nodes"][node] = metrics
-                
-                if metrics.get("cpu_usage", 0) > 0:
-                    online_count += 1
-                    total_cpu += metrics.get("cpu_usage", 0)
-                    total_memory += metrics.get("memory_usage", 0)
-                    if "temperature" in metrics:
-                        total_temp += metrics["temperature"]
-        
-        # Calculer les moyennes
-        if online_count > 0:
-            aggregated["cluster_stats"]["online_nodes"] = online_count
-            aggregated["cluster_stats"]["avg_cpu"] = total_cpu / online_count
-            aggregated["cluster_stats"]["avg_memory"] = total_memory / online_count
-            aggregated["cluster_stats"]["avg_temperature"] = total_temp / online_count
-        
-        # Stocker dans Redis (metrics agrégées)
-        payload = json.dumps(aggregated)
-        redis_client.setex("cluster:metrics", METRICS_CONFIG["aggregated_ttl"], payload)
-        
-        # Publier sur pub/sub cluster:metrics
-        try:
-            redis_client.publish("cluster:metrics", payload)
-        except Exception as pub_err:
-            logger.warning(f"Publication pub/sub cluster:metrics échouée: {pub_err}")
+    except Exception as e:
+        logger.warning(f"Publication de l'agrégat du cluster échouée: {e}")
+        return None
 
-        # Calculer et publier la santé globale sur cluster:health
-        try:
-            total_nodes = aggregated["cluster_stats"].get("total_nodes", 0)
-            online_nodes = aggregated["cluster_stats"].get("online_nodes", 0)
-            down_nodes = max(total_nodes - online_nodes, 0)
-            if down_nodes == 0 and total_nodes > 0:
-                overall_status = "healthy"
-            elif down_nodes <= total_nodes // 2:
-                overall_status = "warning"
+def evaluate_alerts(transitions: Optional[List[Dict[str, Any]]] = None,
+                    aggregated: Optional[Dict[str, Any]] = None) -> int:
+    """Règles du cluster et d'absence, puis publication des seules transitions sur cluster:alerts.
+
+    transitions: celles des règles par nœud du lot qui vient d'être écrit.
+    Appelée aussi sans lot (aucun nœud ne répond): les règles d'absence
+    tournent quand même. Rend le nombre de transitions publiées.
+    """
+    transitions = list(transitions or [])
+    try:
+        _restore_alerts()
+        if aggregated is not None:
+            transitions += alert_engine.observe_cluster(aggregated["cluster_stats"])
+        transitions += alert_engine.check_absent(NODES)
+        if not transitions:
+            return 0
+        key = MONITORING_CONFIG["alerts_key"]
+        pipe = redis_client.pipeline(transaction=False)
+        for alert in transitions:
+            if alert["state"] == "firing":
+                pipe.hset(key, alert["id"], json.dumps(alert))
             else:
-                overall_status = "critical"
-
-            health_data = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "overall_status": overall_status,
-                "nodes_online": online_nodes,
-                "nodes_total": total_nodes,
-                "issues": [] if overall_status == "healthy" else [f"{down_nodes} nœuds hors ligne"]
-            }
-            redis_client.publish("cluster:health", json.dumps(health_data))
-        except Exception as pub_err:
-            logger.warning(f"Publication pub/sub cluster:health échouée: {pub_err}")
+                pipe.hdel(key, alert["id"])
+        active = alert_engine.active()
+        pipe.publish("cluster:alerts", json.dumps({
+            "timestamp": datetime.utcnow().isoformat(),
+            "transitions": transitions,
+            "active_alerts": active,
+            "alert_count": len(active)
+        }))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Publication pub/sub cluster:alerts échouée: {e}")
+    return len(transitions)
 
-        # Générer et publier des alertes sur cluster:alerts
-        try:
-            alerts = []
-            # Seuils simples
-            cpu_avg = aggregated["cluster_stats"].get("avg_cpu", 0)
-            mem_avg = aggregated["cluster_stats"].get("avg_memory", 0)
-            if cpu_avg > 90:
-                alerts.append({"id": "high_cpu_avg", "type": "warning", "message": f"CPU moyenne élevée: {cpu_avg:.1f}%"})
-            if mem_avg > 90:
-                alerts.append({"id": "high_memory_avg", "type": "warning", "message": f"Mémoire moyenne élevée: {mem_avg:.1f}%"})
-
-            # Alertes par nœud (exemple température > 80C)
-            for node, metrics in aggregated.get("nodes", {}).items():
-                temp = metrics.get("temperature", 0)
-                if temp and temp > 80:
-                    alerts.append({"id": f"high_temp_{node}", "type": "critical", "message": f"{node}: Température élevée ({temp:.1f}°C)"})
-
-            alerts_payload = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "active_alerts": alerts,
-                "alert_count": len(alerts)
-            }
-            redis_client.publish("cluster:alerts", json.dumps(alerts_payload))
-        except Exception as pub_err:
-            logger.warning(f"Publication pub/sub cluster:alerts échouée: {pub_err}")
-        
-    except Exception:
-        pass
+def _restore_alerts() -> None:
+    """Processus qui démarre: reprend les alertes actives publiées (pas de second firing)."""
+    if alert_engine.restored:
+        return
+    try:
+        stored = redis_client.hvals(MONITORING_CONFIG["alerts_key"])
+        alert_engine.restore(json.loads(raw) for raw in stored)
+    except Exception as e:
+        logger.debug(f"Alertes actives non rechargées: {e}")
+
+def cached_metrics_from(aggregated_data, node_values: List[Any]) -> Dict[str, Any]:
+    """Payload de get_cached_metrics: l'agrégat s'il existe, sinon les nœuds (valeurs MGET sur NODES)."""
+    if aggregated_data:
+        return json.loads(aggregated_data)
+    
+    # Fallback vers les métriques individuelles
+    metrics = {node: json.loads(data) for node, data in zip(NODES, node_values) if data}
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "nodes": metrics,
+        "cluster_stats": {
+            "total_nodes": len(NODES),
+            "online_nodes": len(metrics),
+            "avg_cpu": 0,
+            "avg_memory": 0,
+            "avg_temperature": 0
+        }
+    }
 
 @celery_app.task
 def get_cached_metrics():
     """Récupère les métriques depuis le cache Redis."""
     try:
-        # Métriques agrégées
         aggregated_data = redis_client.get("cluster:metrics")
-        if aggregated_data:
-            return json.loads(aggregated_data)
-        
-        # Fallback vers les métriques individuelles
-        metrics = {}
-        for node in NODES:
-            node_data = redis_client.get(f"metrics:{node}")
-            if node_data:
-                metrics[node] = json.loads(node_data)
-        
-        return {
-            "timestamp": datetime.utcnow().isoformat(),
-            "nodes": metrics,
-            "cluster_stats": {
-                "total_nodes": len(NODES),
-                "online_nodes": len(metrics),
-                "avg_cpu": 0,
-                "avg_memory": 0,
-                "avg_temperature": 0
-            }
-        }
+        node_values = [] if aggregated_data or not NODES else redis_client.mget([f"metrics:{node}" for node in NODES])
+        return cached_metrics_from(aggregated_data, node_values)
         
     except Exception:
         return {
@@ -77,6 +77,8 @@ class ClusterView:
                     node_metrics = self.redis_client.get(f"metrics:{node}")
                     if node_metrics:
                         metrics = json.loads(node_metrics)
+                        # Le dispatcher choisit sur ces métriques (réseau, PSI...)
+                        self.worker_registry.set_metrics(node, metrics)
                         cpu = metrics.get("cpu_usage", 0.0)
                         memory = metrics.get("memory_usage", 0.0)
                         temp = metrics.get("temperature", 0.0)
@@ -13,6 +13,11 @@ from web.core.worker_registry import WorkerRegistry, WorkerStatus
 from web.core.task_queue import TaskQueue
 from web.core.dispatcher import Dispatcher
 from web.core.fault_tolerance import FaultToleranceManager
+from web.core.alert_rules import load_rules
+from web.config.metrics_config import MONITORING_CONFIG
+
+# Règle -> "type" d'anomalie publié avant le moteur de règles (clients existants)
+ANOMALY_TYPES = {"high_cpu": "high_cpu_usage", "high_memory": "high_memory_usage"}
 
 class MonitoringView:
     def __init__(self, cluster_view):
@@ -26,6 +31,10 @@ class MonitoringView:
         # Historique des métriques
         self.metrics_history = []
         self.alerts_history = []
+        
+        # Seuils par nœud des règles d'alerte (mêmes valeurs que le collecteur)
+        self.node_thresholds = [rule for rule in load_rules(MONITORING_CONFIG["alert_rules"])
+                                if rule.scope == "node" and rule.type == "threshold"]
 
     async def get_comprehensive_metrics(self) -> Dict[str, Any]:
         """Métriques complètes du cluster."""
@@ -141,23 +150,16 @@ class MonitoringView:
         for host in self.worker_registry.all_hosts():
             worker_info = self.worker_registry.get(host)
             if worker_info:
-                # CPU élevé
-                if worker_info.cpu_usage > 90:
-                    anomalies.append({
-                        "type": "high_cpu_usage",
-                        "node": host,
-                        "severity": "warning",
-                        "message": f"CPU usage élevé: {worker_info.cpu_usage:.1f}%"
-                    })
-                
-                # Mémoire élevée
-                if worker_info.memory_usage > 90:
-                    anomalies.append({
-                        "type": "high_memory_usage",
-                        "node": host,
-                        "severity": "warning",
-                        "message": f"Mémoire usage élevé: {worker_info.memory_usage:.1f}%"
-                    })
+                # Règles de seuil du collecteur, sur la valeur instantanée (sans for_s)
+                for rule in self.node_thresholds:
+                    value = getattr(worker_info, rule.metric, None)
+                    if rule.check(value):
+                        anomalies.append({
+                            "type": ANOMALY_TYPES.get(rule.name, rule.name),
+                            "node": host,
+                            "severity": rule.severity,
+                            "message": rule.format(host, value)
+                        })
                 
                 # Taux de succès faible
                 if worker_info.total_jobs > 10 and worker_info.successful_jobs / worker_info.total_jobs < 0.7: